@@ -0,0 +1,213 @@
+"""
+Búsqueda retroactiva en ediciones pasadas del Diario Oficial.
+
+El sitio permite consultar la edición de una fecha con el parámetro ?f=AAAA-M-D.
+El backfill recorre un rango de fechas con un número acotado de descargas
+simultáneas y un intervalo mínimo entre ediciones para no saturar el sitio del
+gobierno. El resultado de cada fecha se guarda en disco conforme avanza, de
+modo que una ejecución interrumpida se reanuda donde se quedó y las fechas ya
+revisadas con los mismos términos no se vuelven a descargar.
+
+Uso: python backfill.py 2025-01-01 2025-06-30
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from gazette_cache import get_data_dir
+from http_client import RateLimiter
+
+# Estados de una fecha que ya no es necesario volver a revisar
+_DONE_STATUSES = ("found", "not_found", "no_pdf")
+
+
+def parse_date(value):
+    """Convierte "AAAA-MM-DD" en date"""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def date_range(start, end):
+    """
+    Fechas entre start y end (ambas incluidas)
+
+    Returns:
+        list: Objetos date en orden
+    """
+    if end < start:
+        raise ValueError(f"Rango de fechas inválido: {start} > {end}")
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def dated_url(diario_url, day):
+    """URL de la edición de una fecha (el sitio usa el formato AAAA-M-D)"""
+    return f"{diario_url}?f={day.year}-{day.month}-{day.day}"
+
+
+def summarize_edition(edition):
+    """
+    Resumen persistible de una edición procesada (sin el contenido de los PDFs)
+
+    Returns:
+        dict: Estado, fecha publicada y coincidencias de cada PDF
+    """
+    return {
+        "status": "found" if edition["found"] else "not_found",
+        "fecha_consulta": edition["fecha_consulta"].strip(),
+        "pdfs": [
+            {
+                "filename": pdf["filename"],
+                "sha256": pdf["sha256"],
+                "total_pages": pdf["total_pages"],
+                "matches": {term: pages for term, pages in pdf["matches"].items() if pages},
+            }
+            for pdf in edition["pdfs"]
+        ],
+        "errors": edition["errors"],
+    }
+
+
+class Backfill:
+    """Procesa un rango de fechas con concurrencia acotada y puntos de control en disco"""
+
+    def __init__(self, scrape_day, terms, concurrency=None, delay_seconds=None, state_path=None,
+                 checkpoint_every=None):
+        """
+        Args:
+            scrape_day: Función que recibe un date y devuelve el resumen de esa edición
+            terms: Términos vigilados (una fecha se revisa de nuevo si faltan términos)
+            concurrency: Ediciones procesadas a la vez (opcional, default: BACKFILL_CONCURRENCY)
+            delay_seconds: Intervalo mínimo entre ediciones (opcional, default: BACKFILL_DELAY_SECONDS)
+            state_path: Archivo con los resultados por fecha (opcional)
+            checkpoint_every: Fechas procesadas entre cada guardado (opcional)
+        """
+        if concurrency is None:
+            concurrency = int(os.getenv("BACKFILL_CONCURRENCY", "2"))
+        if delay_seconds is None:
+            delay_seconds = float(os.getenv("BACKFILL_DELAY_SECONDS", "2"))
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "backfill.json")
+        if checkpoint_every is None:
+            checkpoint_every = int(os.getenv("BACKFILL_CHECKPOINT_EVERY", "10"))
+
+        self.scrape_day = scrape_day
+        self.terms = list(terms)
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(delay_seconds)
+        self.state_path = state_path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._lock = threading.Lock()
+        self._pending_saves = 0
+        self.results = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.results, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def is_done(self, day):
+        """Indica si una fecha ya se revisó con todos los términos actuales"""
+        record = self.results.get(day.isoformat())
+        if not record or record.get("status") not in _DONE_STATUSES:
+            return False
+        # Si falló algún PDF de la edición se vuelve a intentar
+        if record.get("errors"):
+            return False
+        return set(self.terms) <= set(record.get("terms", []))
+
+    def _process(self, day):
+        self.rate_limiter.wait()
+        try:
+            record = self.scrape_day(day)
+        except Exception as e:
+            print(f"Error en el backfill del {day.isoformat()}: {e}")
+            record = {"status": "error", "error": str(e)}
+        record["terms"] = self.terms
+
+        with self._lock:
+            self.results[day.isoformat()] = record
+            self._pending_saves += 1
+            if self._pending_saves >= self.checkpoint_every:
+                self._save_state()
+                self._pending_saves = 0
+        return record
+
+    def run(self, start, end):
+        """
+        Revisa todas las fechas del rango que falten
+
+        Args:
+            start: Primera fecha (date)
+            end: Última fecha (date, incluida)
+
+        Returns:
+            dict: Resumen con fechas procesadas, omitidas, con error y con coincidencias
+        """
+        days = date_range(start, end)
+        pending = [day for day in days if not self.is_done(day)]
+        print(f"Backfill {start.isoformat()} a {end.isoformat()}: {len(pending)} de {len(days)} fecha(s) por revisar")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                # Cada hilo recibe una copia del contexto (trabajo y métricas de la ejecución actual)
+                futures = [executor.submit(contextvars.copy_context().run, self._process, day) for day in pending]
+                records = [future.result() for future in futures]
+        finally:
+            with self._lock:
+                self._save_state()
+                self._pending_saves = 0
+
+        found = {}
+        for day in days:
+            record = self.results.get(day.isoformat(), {})
+            if record.get("status") == "found":
+                matches = {}
+                for pdf in record["pdfs"]:
+                    for term, pages in pdf["matches"].items():
+                        matches.setdefault(term, []).append({"filename": pdf["filename"], "pages": pages})
+                found[day.isoformat()] = matches
+
+        return {
+            "status": "success",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": len(days),
+            "processed": len(pending),
+            "skipped": len(days) - len(pending),
+            "errors": sum(1 for record in records if record["status"] == "error"),
+            "found": found,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca los términos vigilados en ediciones pasadas del diario")
+    parser.add_argument("start", type=parse_date, help="Primera fecha (AAAA-MM-DD)")
+    parser.add_argument("end", type=parse_date, help="Última fecha (AAAA-MM-DD)")
+    parser.add_argument("--concurrency", type=int, help="Ediciones procesadas a la vez")
+    parser.add_argument("--delay", type=float, help="Segundos mínimos entre ediciones")
+    args = parser.parse_args()
+
+    # Importación diferida: telegram_bot también importa este módulo
+    import telegram_bot
+
+    summary = telegram_bot.run_backfill(args.start, args.end, args.concurrency, args.delay)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
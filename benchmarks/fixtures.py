@@ -0,0 +1,149 @@
+"""
+Datos de prueba: PDFs sintéticos y la página del diario oficial.
+
+Los PDFs se generan con texto de relleno parecido al de un diario (varias
+líneas por página, contenido comprimido con FlateDecode como los PDFs reales)
+y con los términos buscados en las páginas indicadas. La página del diario se
+arma a partir de una copia guardada en benchmarks/data/diario_oficial.html,
+cambiando la fecha y los enlaces a los PDFs.
+"""
+
+import os
+import random
+import zlib
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_WORDS = (
+    "acuerdo aviso edicto notario público licitación secretaría gobierno estado yucatán "
+    "mérida municipio ayuntamiento expediente juicio sucesorio intestamentario juzgado "
+    "primero segundo civil familiar oralidad convocatoria decreto artículo fracción "
+    "reglamento ley dirección general concesión predio tablaje catastral número calle "
+    "colonia fraccionamiento por medio del presente se hace saber que ante esta notaría "
+    "compareció el señor la señora con domicilio en a efecto de dar cumplimiento"
+).split()
+
+
+def _pdf_string(text):
+    """Escapa el texto para una cadena literal de PDF (latin-1)"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("latin-1", errors="replace")
+
+
+def build_pdf(page_texts, compress=False):
+    """
+    Construye un PDF mínimo con el texto indicado en cada página
+
+    Args:
+        page_texts: Texto de cada página; los saltos de línea separan renglones
+        compress: Comprimir el contenido de las páginas con FlateDecode
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Se completa al final con la lista de páginas
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in page_texts:
+        lines = b" Tj T* ".join(b"(%s)" % _pdf_string(line) for line in text.split("\n"))
+        stream = b"BT /F1 10 Tf 12 TL 50 760 Td %s Tj ET" % lines
+        if compress:
+            stream = zlib.compress(stream)
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+        else:
+            objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(output)
+
+
+def gazette_page_texts(pages, hits=None, lines_per_page=60, seed=0):
+    """
+    Texto de relleno de un diario con términos en páginas específicas
+
+    Args:
+        pages: Número de páginas
+        hits: Mapa número de página -> texto que aparece en esa página (opcional)
+        lines_per_page: Renglones por página (un diario real tiene entre 50 y 70)
+        seed: Semilla para que el corpus sea siempre el mismo
+
+    Returns:
+        list: Texto de cada página
+    """
+    rng = random.Random(seed)
+    hits = hits or {}
+    texts = []
+    for page_num in range(1, pages + 1):
+        lines = [" ".join(rng.choice(_WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        if page_num in hits:
+            lines[rng.randrange(lines_per_page)] = f"Se notifica a {hits[page_num]} para los efectos legales"
+        texts.append("\n".join(lines))
+    return texts
+
+
+def build_gazette_pdf(pages, hits=None, lines_per_page=60, seed=0):
+    """PDF sintético con el tamaño y la densidad de texto de un diario real"""
+    return build_pdf(gazette_page_texts(pages, hits, lines_per_page, seed), compress=True)
+
+
+def index_html(fecha, pdf_paths):
+    """
+    Página del diario oficial con la fecha y los enlaces indicados
+
+    Args:
+        fecha: Texto de la fecha publicada (p. ej. "Mérida, Yuc., Lunes 13 de octubre de 2025")
+        pdf_paths: Rutas de los PDFs de la edición (secciones y suplementos)
+
+    Returns:
+        bytes: HTML de la página
+    """
+    with open(os.path.join(DATA_DIR, "diario_oficial.html"), encoding="utf-8") as f:
+        template = f.read()
+
+    links = "\n".join(
+        f'            <li><a class="pdf" href="{path}" target="_blank">Sección {number}</a></li>'
+        for number, path in enumerate(pdf_paths, 1)
+    )
+    return template.replace("{{fecha}}", fecha).replace("{{enlaces}}", links).encode("utf-8")
+
+
+def edition_routes(diario_path, fecha, pdfs, pdf_dir="/docs/diario_oficial/diarios/2025"):
+    """
+    Rutas del servidor local para una edición con uno o varios PDFs
+
+    Args:
+        diario_path: Ruta de la página del diario (DIARIO_URL_PATH)
+        fecha: Texto de la fecha publicada
+        pdfs: Contenido de cada PDF de la edición
+
+    Returns:
+        dict: Mapa ruta -> (contenido, content-type) para GazetteServer
+    """
+    pdf_paths = [f"{pdf_dir}/diario_{number}.pdf" for number in range(1, len(pdfs) + 1)]
+    routes = {diario_path: (index_html(fecha, pdf_paths), "text/html; charset=utf-8")}
+    for path, content in zip(pdf_paths, pdfs):
+        routes[path] = (content, "application/pdf")
+    return routes
@@ -0,0 +1,79 @@
+"""
+Benchmark de la lectura de la página del diario (index_parser.py).
+
+Compara los extractores con la página guardada en benchmarks/data y con una
+versión más grande (la misma página con la tabla de ediciones anteriores
+repetida, parecida a la del sitio hacia fin de año). Mide el tiempo por
+lectura y la memoria máxima reservada con tracemalloc. tracemalloc sólo ve
+la memoria de Python: el árbol de lxml vive en C y no aparece en la cifra.
+
+Uso:
+    python -m benchmarks.index_parse
+    python -m benchmarks.index_parse --repeat 500
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import index_parser
+from benchmarks.fixtures import index_html
+
+FECHA = "Mérida, Yuc., Lunes 13 de octubre de 2025"
+PDF_PATHS = [f"/docs/diario_oficial/diarios/2025/diario_{number}.pdf" for number in range(1, 4)]
+
+
+def pages():
+    """Páginas de prueba: la guardada y una de unas 12 veces su tamaño"""
+    recorded = index_html(FECHA, PDF_PATHS)
+    start = recorded.index(b"<tbody>") + len(b"<tbody>")
+    end = recorded.index(b"</tbody>")
+    large = recorded[:start] + recorded[start:end] * 12 + recorded[end:]
+    return {"guardada": recorded, "grande": large}
+
+
+def measure(parser, content, repeat):
+    """
+    Tiempo promedio y memoria máxima de una lectura
+
+    Returns:
+        dict: ms por lectura y KB máximos reservados, o None si el extractor no está instalado
+    """
+    try:
+        index_parser._extract(parser, content, *index_parser.get_selectors())
+    except ImportError:
+        return None
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        index_parser._extract(parser, content, *index_parser.get_selectors())
+    elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+
+    tracemalloc.start()
+    index_parser._extract(parser, content, *index_parser.get_selectors())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": elapsed_ms, "peak_kb": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la lectura de la página del diario")
+    parser.add_argument("--repeat", type=int, default=200, help="Lecturas por medición (default: 200)")
+    args = parser.parse_args()
+
+    for page_name, content in pages().items():
+        print(f"Página {page_name} ({len(content) / 1024:.0f} KB)")
+        results = {name: measure(name, content, args.repeat) for name in index_parser.PARSERS}
+        baseline = results["html.parser"]
+        for name, result in results.items():
+            if result is None:
+                print(f"  {name:<12} no instalado")
+                continue
+            print(
+                f"  {name:<12} {result['ms']:7.3f} ms ({baseline['ms'] / result['ms']:4.1f}x)"
+                f"  memoria máx. {result['peak_kb']:7.0f} KB ({baseline['peak_kb'] / result['peak_kb']:4.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Benchmarks del pipeline sin red.
+
+Cada escenario levanta el servidor local con una edición sintética, ejecuta
+diario_scraping (o download_pdf) en un proceso aparte y mide:
+
+- latency_s: tiempo de punta a punta con la caché vacía
+- warm_latency_s: la misma ejecución otra vez (respuestas 304 y texto en caché)
+- pages_per_second: páginas procesadas por segundo en la ejecución en frío
+- peak_rss_mb / peak_child_rss_mb: memoria máxima del proceso y de los workers del pool
+
+Los resultados se comparan con benchmarks/baseline.json y el comando termina
+con código 1 si alguna métrica empeora más de la tolerancia.
+
+Los escenarios normales leen los PDFs con un solo proceso (PDF_WORKERS=1),
+así que la referencia vale en cualquier máquina; los escenarios *_parallel
+usan el pool de procesos de pdf_search con todas las CPUs y se omiten (con
+un aviso) en máquinas con menos de 2 CPUs, donde no habría paralelismo que medir.
+
+Uso:
+    python -m benchmarks.run                        # todos los escenarios
+    python -m benchmarks.run scrape_100p --tolerance 0.5
+    python -m benchmarks.run --repeat 3 --update-baseline  # registra la nueva referencia
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import build_gazette_pdf, edition_routes
+from benchmarks.server import GazetteServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+
+SEARCH_TERM = "koyoc novelo oliver"
+DIARIO_PATH = "/gobierno/diario_oficial.php"
+FECHA = "Mérida, Yuc., Lunes 13 de octubre de 2025"
+
+# Escenarios: tipo de ejecución, páginas de cada PDF de la edición, variables
+# de entorno adicionales y si usan el pool de procesos
+SCENARIOS = {
+    "scrape_10p": {"kind": "scrape", "pdfs": [10]},
+    "scrape_100p": {"kind": "scrape", "pdfs": [100]},
+    "scrape_500p": {"kind": "scrape", "pdfs": [500]},
+    "scrape_3_sections": {"kind": "scrape", "pdfs": [120, 40, 12]},
+    "download_500p": {"kind": "download", "pdfs": [500]},
+    "download_500p_stream": {"kind": "download", "pdfs": [500], "env": {"PDF_STREAMING": "true"}},
+    "scrape_500p_parallel": {"kind": "scrape", "pdfs": [500], "parallel": True},
+    "download_500p_stream_parallel": {
+        "kind": "download", "pdfs": [500], "env": {"PDF_STREAMING": "true"}, "parallel": True,
+    },
+}
+
+# El camino en paralelo de pdf_search necesita al menos dos procesos
+MIN_PARALLEL_CPUS = 2
+
+# Métricas comparadas con la referencia y si un valor mayor es mejor
+COMPARED_METRICS = {
+    "latency_s": False,
+    "warm_latency_s": False,
+    "pages_per_second": True,
+    "peak_rss_mb": False,
+}
+
+# Diferencias de tiempo por debajo de este umbral se consideran ruido
+MIN_SECONDS_DELTA = 0.05
+
+_RESULT_PREFIX = "BENCHMARK_RESULT "
+
+
+def skip_reason(name):
+    """Motivo para omitir un escenario en esta máquina, o None si se puede ejecutar"""
+    cpus = os.cpu_count() or 1
+    if SCENARIOS[name].get("parallel") and cpus < MIN_PARALLEL_CPUS:
+        return f"requiere al menos {MIN_PARALLEL_CPUS} CPUs para el camino en paralelo (esta máquina tiene {cpus})"
+    return None
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def run_scenario(name, latency=0.0):
+    """
+    Ejecuta un escenario en el proceso actual
+
+    Configura las variables de entorno antes de importar el bot, así que debe
+    llamarse en un proceso nuevo (ver main).
+
+    Returns:
+        dict: Métricas del escenario
+    """
+    scenario = SCENARIOS[name]
+    pdfs = [
+        build_gazette_pdf(pages, hits={max(1, pages // 2): SEARCH_TERM.upper()}, seed=number)
+        for number, pages in enumerate(scenario["pdfs"])
+    ]
+    total_pages = sum(scenario["pdfs"])
+
+    with tempfile.TemporaryDirectory() as data_dir, \
+            GazetteServer(edition_routes(DIARIO_PATH, FECHA, pdfs), latency=latency) as server:
+        os.environ.update({
+            "BASE_URL": server.base_url,
+            "DIARIO_URL_PATH": DIARIO_PATH,
+            "DATA_DIR": data_dir,
+            "SEARCH_TEXT": SEARCH_TERM,
+            "SUBSCRIPTIONS": "{}",
+            "TELEGRAM_CHAT_ID": "benchmark",
+            # 0: tantos procesos como CPUs (ver pdf_search._get_workers)
+            "PDF_WORKERS": "0" if scenario.get("parallel") else "1",
+        })
+        os.environ.update(scenario.get("env", {}))
+        import telegram_bot
+        from pdf_search import _get_workers, shutdown_pool
+
+        result = {
+            "scenario": name,
+            "pages": total_pages,
+            "pdf_bytes": sum(len(pdf) for pdf in pdfs),
+            "workers": _get_workers(),
+        }
+        try:
+            if scenario["kind"] == "scrape":
+                started = time.perf_counter()
+                _, edition = telegram_bot.diario_scraping()
+                result["latency_s"] = time.perf_counter() - started
+                if edition is None or not edition["found"]:
+                    raise RuntimeError(f"El escenario {name} no encontró el término de prueba")
+
+                started = time.perf_counter()
+                telegram_bot.diario_scraping()
+                result["warm_latency_s"] = time.perf_counter() - started
+            else:
+                pdf_path = next(path for path in server.routes if path.endswith(".pdf"))
+                started = time.perf_counter()
+                download = telegram_bot.download_pdf(pdf_path, server.base_url)
+                result["latency_s"] = time.perf_counter() - started
+                if download is None or not download[0]["found"]:
+                    raise RuntimeError(f"El escenario {name} no encontró el término de prueba")
+        finally:
+            shutdown_pool()
+
+    result["pages_per_second"] = total_pages / result["latency_s"]
+    result["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF)
+    result["peak_child_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def run_isolated(name, latency=0.0):
+    """Ejecuta un escenario en un proceso nuevo para medir su memoria por separado"""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--child", name, "--latency-ms", str(latency * 1000)],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(_RESULT_PREFIX):
+            return json.loads(line[len(_RESULT_PREFIX):])
+    raise RuntimeError(f"El escenario {name} falló:\n{completed.stdout[-2000:]}\n{completed.stderr[-2000:]}")
+
+
+def best_of(runs):
+    """Combina varias repeticiones de un escenario quedándose con el mejor valor de cada métrica"""
+    best = dict(runs[0])
+    for run in runs[1:]:
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric in run:
+                best[metric] = max(best[metric], run[metric]) if higher_is_better else min(best[metric], run[metric])
+    return best
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compara los resultados con la referencia
+
+    Args:
+        results: Mapa escenario -> métricas
+        baseline: Mapa escenario -> métricas de referencia
+        tolerance: Fracción de empeoramiento permitida (0.3 = 30%)
+
+    Returns:
+        list: Descripción de cada métrica que empeoró más de la tolerancia
+    """
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in metrics or metric not in reference:
+                continue
+            value, expected = metrics[metric], reference[metric]
+            if higher_is_better:
+                worse = value < expected * (1 - tolerance)
+            else:
+                worse = value > expected * (1 + tolerance)
+                if metric.endswith("_s") and value - expected < MIN_SECONDS_DELTA:
+                    worse = False
+            if worse:
+                regressions.append(f"{name}.{metric}: {value} (referencia: {expected})")
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["scenarios"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_baseline(results, path=BASELINE_PATH, skipped=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "scenarios": results,
+            # Escenarios sin referencia en esta máquina y el motivo
+            "skipped": skipped or {},
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline contra un sitio local")
+    parser.add_argument("scenarios", nargs="*", help=f"Escenarios a ejecutar (default: todos): {', '.join(SCENARIOS)}")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Empeoramiento permitido respecto a la referencia (default: 0.3)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latencia simulada por petición HTTP (default: 0)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones por escenario; se toma el mejor valor (default: 1)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Archivo de referencia")
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar los resultados como nueva referencia")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    if args.child:
+        print(_RESULT_PREFIX + json.dumps(run_scenario(args.child, latency)))
+        return
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Escenario desconocido: {', '.join(unknown)}")
+
+    results = {}
+    skipped = {}
+    for name in names:
+        reason = skip_reason(name)
+        if reason:
+            skipped[name] = reason
+            print(f"{name:<30} omitido: {reason}")
+            continue
+        results[name] = best_of([run_isolated(name, latency) for _ in range(max(1, args.repeat))])
+        metrics = results[name]
+        warm = f"{metrics['warm_latency_s']:.3f}s" if "warm_latency_s" in metrics else "-"
+        print(
+            f"{name:<30} {metrics['pages']:>4} pág.  frío {metrics['latency_s']:.3f}s  caliente {warm}"
+            f"  {metrics['pages_per_second']:.0f} pág/s  RSS {metrics['peak_rss_mb']} MB"
+            f" (workers {metrics['peak_child_rss_mb']} MB)"
+        )
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        for name in skipped:
+            baseline.pop(name, None)
+        save_baseline(baseline, args.baseline, skipped)
+        print(f"Referencia guardada en {args.baseline}")
+        return
+
+    regressions = find_regressions(results, load_baseline(args.baseline), args.tolerance)
+    if regressions:
+        print("Regresiones respecto a la referencia:")
+        for regression in regressions:
+            print(f"- {regression}")
+        sys.exit(1)
+    print("Sin regresiones respecto a la referencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Servidor HTTP local que sustituye al sitio del diario oficial.
+
+Sirve la página del diario y los PDFs desde memoria, con ETag y respuestas
+304 como el sitio real, para ejecutar las pruebas y los benchmarks sin red.
+"""
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GazetteServer:
+    """Sitio del diario en 127.0.0.1 con rutas fijas"""
+
+    def __init__(self, routes, latency=0.0):
+        """
+        Args:
+            routes: Mapa ruta -> (contenido en bytes, content-type)
+            latency: Segundos de espera antes de cada respuesta, para simular la red
+        """
+        self.routes = dict(routes)
+        self.latency = latency
+        self.requests = []
+        self._server = None
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                route = server.routes.get(self.path) or server.routes.get(self.path.split("?", 1)[0])
+                if route is None:
+                    server.requests.append((self.path, 404))
+                    self.send_error(404)
+                    return
+
+                body, content_type = route
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if self.headers.get("If-None-Match") == etag:
+                    server.requests.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                server.requests.append((self.path, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        """Inicia el servidor en un puerto libre, en un hilo aparte"""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,329 @@
+"""
+Comandos de Telegram para consultar el bot bajo demanda.
+
+Los mensajes entrantes llegan por webhook (POST /telegram/webhook) o, si no
+hay una URL pública, por long polling con getUpdates. Los comandos se
+responden con los datos ya procesados (el índice de búsqueda y el resumen de
+la última edición), sin volver a descargar el diario:
+
+- /buscar <texto>: páginas de diarios anteriores donde aparece el texto
+- /hoy: resultado de la última edición para los términos del chat
+- /suscribir <término>, /desuscribir <término>, /terminos
+
+Sólo responden los chats autorizados: los de TELEGRAM_ALLOWED_CHATS o, si no
+está definida, los configurados en el servidor (TELEGRAM_CHAT_ID y las llaves
+de SUBSCRIPTIONS). Un desconocido que encuentre el bot no puede agregar
+términos al autómata ni recibir los PDFs; TELEGRAM_ALLOWED_CHATS=* abre el
+bot a cualquier chat.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import pytz
+
+import http_client
+from backfill import summarize_edition
+from gazette_cache import get_data_dir
+from matcher import load_subscriptions as load_configured_subscriptions, normalize_text
+
+_HELP_TEXT = (
+    "🤖 Comandos disponibles:\n"
+    "/buscar <texto> - Busca el texto en los diarios ya procesados\n"
+    "/hoy - Resultado del diario más reciente para tus términos\n"
+    "/suscribir <término> - Vigila un término en los próximos diarios\n"
+    "/desuscribir <término> - Deja de vigilar un término\n"
+    "/terminos - Lista los términos que vigilas"
+)
+
+# Límite de Telegram para el texto de un mensaje
+_MAX_MESSAGE_LENGTH = 4096
+
+
+def parse_command(text):
+    """
+    Separa un comando de sus argumentos
+
+    Returns:
+        tuple: ("buscar", "juan perez") para "/buscar@MiBot juan perez", o (None, "") si no es un comando
+    """
+    if not text or not text.startswith("/"):
+        return None, ""
+    head, _, args = text.strip().partition(" ")
+    command = head[1:].split("@", 1)[0].lower()
+    return command, args.strip()
+
+
+def _last_edition_path():
+    return os.path.join(get_data_dir(), "last_edition.json")
+
+
+def save_last_edition(edition, path=None):
+    """Guarda el resumen de la última edición procesada para responder /hoy"""
+    if path is None:
+        path = _last_edition_path()
+
+    summary = summarize_edition(edition)
+    summary.update({
+        "gazette_date": edition["gazette_date"],
+        "date_now": edition["date_now"],
+        "terms": edition["terms"],
+    })
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_last_edition(path=None):
+    """Resumen de la última edición procesada, o None si aún no hay"""
+    if path is None:
+        path = _last_edition_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _truncate(text):
+    if len(text) <= _MAX_MESSAGE_LENGTH:
+        return text
+    return text[: _MAX_MESSAGE_LENGTH - 1] + "…"
+
+
+def get_allowed_chats():
+    """
+    Chats que pueden usar los comandos
+
+    TELEGRAM_ALLOWED_CHATS (IDs separados por comas, o "*" para cualquier
+    chat); sin ella, los chats configurados en el servidor. Las suscripciones
+    hechas con /suscribir no cuentan: un chat no se autoriza a sí mismo.
+
+    Returns:
+        list: IDs de chat (como texto), o ["*"]
+    """
+    raw = os.getenv("TELEGRAM_ALLOWED_CHATS", "")
+    allowed = [chat.strip() for chat in raw.split(",") if chat.strip()]
+    if allowed:
+        return allowed
+    return [chat_id for chat_id in load_configured_subscriptions(stored={}) if chat_id]
+
+
+class CommandHandler:
+    """Responde los comandos recibidos en los mensajes de Telegram"""
+
+    def __init__(self, search_index, store, load_subscriptions, last_edition_path=None, allowed_chats=None):
+        """
+        Args:
+            search_index: SearchIndex con los diarios procesados
+            store: SubscriptionStore para /suscribir y /desuscribir
+            load_subscriptions: Función que devuelve el mapa chat_id -> términos vigilados
+            last_edition_path: Archivo con el resumen de la última edición (opcional)
+            allowed_chats: Chats autorizados, "*" para cualquiera (opcional, default: get_allowed_chats())
+        """
+        if allowed_chats is None:
+            allowed_chats = get_allowed_chats()
+
+        self.search_index = search_index
+        self.store = store
+        self.load_subscriptions = load_subscriptions
+        self.last_edition_path = last_edition_path
+        # None: cualquier chat
+        self.allowed_chats = None if "*" in allowed_chats else set(allowed_chats)
+        self._commands = {
+            "start": self.help,
+            "ayuda": self.help,
+            "help": self.help,
+            "buscar": self.search,
+            "hoy": self.today,
+            "suscribir": self.subscribe,
+            "desuscribir": self.unsubscribe,
+            "terminos": self.list_terms,
+        }
+
+    def handle_update(self, update):
+        """
+        Procesa un update de Telegram
+
+        Returns:
+            dict: chat_id, command y text de la respuesta, o None si no hay que responder
+        """
+        message = update.get("message") or update.get("edited_message")
+        if not message or "chat" not in message:
+            return None
+
+        command, args = parse_command(message.get("text", ""))
+        if command is None:
+            return None
+
+        chat_id = str(message["chat"]["id"])
+        if self.allowed_chats is not None and chat_id not in self.allowed_chats:
+            print(f"Comando /{command} ignorado de un chat no autorizado: {chat_id}")
+            return {"chat_id": chat_id, "command": command, "text": "⛔ Este chat no está autorizado para usar el bot"}
+
+        handler = self._commands.get(command)
+        if handler is None:
+            text = f"Comando no reconocido: /{command}\n\n{_HELP_TEXT}"
+        else:
+            text = handler(chat_id, args)
+        return {"chat_id": chat_id, "command": command, "text": _truncate(text)}
+
+    def help(self, chat_id, args):
+        return _HELP_TEXT
+
+    def search(self, chat_id, args):
+        if not args:
+            return "Uso: /buscar <texto>"
+
+        limit = int(os.getenv("COMMAND_SEARCH_LIMIT", "10"))
+        hits = self.search_index.search(args, limit=limit)
+        if not hits:
+            return f"🔎 '{args}' no aparece en los diarios procesados"
+
+        lines = [f"🔎 {len(hits)} resultado(s) para '{args}':"]
+        for hit in hits:
+            lines.append(f"- {hit['gazette_date'] or 'sin fecha'} {hit['filename']} p. {hit['page']}: {hit['snippet']}")
+        return "\n".join(lines)
+
+    def today(self, chat_id, args):
+        edition = load_last_edition(self.last_edition_path)
+        if edition is None:
+            return "Todavía no se ha procesado ningún diario"
+
+        terms = self.load_subscriptions().get(chat_id, [])
+        if not terms:
+            return "No vigilas ningún término. Usa /suscribir <término>"
+
+        lines = [f"📰 {edition['fecha_consulta']} (revisado: {edition['date_now']})"]
+        timezone = os.getenv("TIMEZONE", "America/Merida")
+        if edition["gazette_date"] != datetime.now(pytz.timezone(timezone)).strftime("%Y-%m-%d"):
+            lines.append("⚠️ Es el último diario procesado; el de hoy aún no se ha revisado")
+
+        checked = {normalize_text(term) for term in edition["terms"]}
+        for term in terms:
+            key = normalize_text(term)
+            if key in checked:
+                found = []
+                for pdf in edition["pdfs"]:
+                    pages = sorted({
+                        page for matched, numbers in pdf["matches"].items()
+                        if normalize_text(matched) == key for page in numbers
+                    })
+                    if pages:
+                        found.append(f"{pdf['filename']} páginas {pages}")
+            else:
+                # Término agregado después de revisar la edición: se busca en el índice
+                hits = self.search_index.search(f'"{term}"', limit=50, since=edition["gazette_date"])
+                pages = {}
+                for hit in hits:
+                    if hit["gazette_date"] == edition["gazette_date"]:
+                        pages.setdefault(hit["filename"], []).append(hit["page"])
+                found = [f"{filename} páginas {sorted(numbers)}" for filename, numbers in pages.items()]
+
+            if found:
+                lines.append(f"✅ '{term}' encontrado en " + ", ".join(found))
+            else:
+                lines.append(f"❌ '{term}' NO encontrado")
+        return "\n".join(lines)
+
+    def subscribe(self, chat_id, args):
+        term = " ".join(args.split())
+        if len(normalize_text(term)) < 3:
+            return "Uso: /suscribir <término> (al menos 3 caracteres)"
+        if len(term) > 100:
+            return "El término es demasiado largo (máximo 100 caracteres)"
+
+        if term in self.load_subscriptions().get(chat_id, []) or not self.store.add(chat_id, term):
+            return f"Ya vigilas '{term}'"
+        return f"✅ Ahora vigilas '{term}'. Si ya apareció en diarios anteriores recibirás un resumen."
+
+    def unsubscribe(self, chat_id, args):
+        term = " ".join(args.split())
+        if not term:
+            return "Uso: /desuscribir <término>"
+        if self.store.remove(chat_id, term):
+            return f"Ya no vigilas '{term}'"
+        return f"No vigilabas '{term}' desde Telegram (los términos de la configuración del servidor no se pueden quitar aquí)"
+
+    def list_terms(self, chat_id, args):
+        terms = self.load_subscriptions().get(chat_id, [])
+        if not terms:
+            return "No vigilas ningún término. Usa /suscribir <término>"
+        return "📋 Términos vigilados:\n" + "\n".join(f"- {term}" for term in terms)
+
+
+class TelegramPoller:
+    """Recibe los mensajes con getUpdates (long polling) cuando no hay webhook"""
+
+    def __init__(self, bot_url, handle_update, timeout=None):
+        """
+        Args:
+            bot_url: URL base del bot (https://api.telegram.org/bot<token>)
+            handle_update: Función a ejecutar con cada update recibido
+            timeout: Segundos que Telegram mantiene abierta cada consulta (opcional, default: TELEGRAM_POLL_TIMEOUT)
+        """
+        if timeout is None:
+            timeout = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "30"))
+
+        self.bot_url = bot_url
+        self.handle_update = handle_update
+        self.timeout = timeout
+        self.offset = None
+        self._stop = threading.Event()
+
+    def poll_once(self):
+        """
+        Consulta los updates pendientes y los procesa
+
+        Returns:
+            int: Número de updates recibidos
+        """
+        params = {"timeout": self.timeout, "allowed_updates": json.dumps(["message", "edited_message"])}
+        if self.offset is not None:
+            params["offset"] = self.offset
+
+        # El timeout de lectura debe ser mayor que el de la consulta larga
+        connect_timeout, read_timeout = http_client.get_timeout()
+        response = http_client.request(
+            "GET", f"{self.bot_url}/getUpdates", params=params,
+            timeout=(connect_timeout, max(read_timeout, self.timeout + 10))
+        )
+        body = response.json()
+        if not body.get("ok"):
+            raise RuntimeError(body.get("description", "getUpdates falló"))
+
+        updates = body.get("result", [])
+        for update in updates:
+            # Confirmar el update aunque falle su procesamiento, para no repetirlo sin fin
+            self.offset = update["update_id"] + 1
+            try:
+                self.handle_update(update)
+            except Exception as e:
+                print(f"Error procesando el update {update['update_id']}: {e}")
+        return len(updates)
+
+    def run_forever(self):
+        """Ciclo principal del long polling"""
+        # getUpdates no funciona mientras haya un webhook configurado
+        try:
+            http_client.request("POST", f"{self.bot_url}/deleteWebhook")
+        except Exception as e:
+            print(f"Error eliminando el webhook: {e}")
+
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error consultando updates de Telegram: {e}")
+                self._stop.wait(5)
+
+    def stop(self):
+        """Detiene el long polling (tras la consulta en curso)"""
+        self._stop.set()
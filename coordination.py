@@ -0,0 +1,383 @@
+"""
+Coordinación entre varias réplicas del servicio.
+
+Con más de una réplica (p. ej. el autoescalado de Render) cada una tiene su
+propio scheduler y su propio vigilante, así que sin coordinación todas
+descargan el mismo diario a la misma hora y envían los mismos mensajes. Las
+réplicas se coordinan con leases (candados con vencimiento) en un almacén
+compartido:
+
+- Mientras una réplica ejecuta el reporte de una fuente tiene el lease
+  "report:<fuente>" y lo renueva; las demás omiten ese reporte.
+- Cada horario programado se reclama una sola vez ("schedule:<fuente>:<horario>@<momento>"),
+  así que aunque las réplicas despierten con segundos de diferencia sólo una lo ejecuta.
+- El último resultado de cada fuente y su huella se publican en el mismo
+  almacén, de donde los leen las demás réplicas (GET /report/latest).
+
+COORDINATION_BACKEND elige el almacén:
+
+- memory: dentro del proceso (default; una sola réplica, el comportamiento anterior)
+- sqlite: archivo SQLite en un disco compartido (COORDINATION_DB_PATH)
+- redis: servidor Redis (REDIS_URL, requiere `pip install redis`)
+
+Si el nodo que tiene un lease se cae sin liberarlo, el lease vence a los
+COORDINATION_LEASE_SECONDS y otra réplica puede tomarlo.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from gazette_cache import get_data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+"""
+
+
+def node_id():
+    """Identificador de esta réplica (NODE_ID, o el hostname y el PID)"""
+    return os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def get_lease_seconds():
+    """Vencimiento de los leases de ejecución; se renuevan a un tercio de este tiempo"""
+    return float(os.getenv("COORDINATION_LEASE_SECONDS", "300"))
+
+
+def get_claim_seconds():
+    """Tiempo durante el que se recuerda que una ejecución programada ya fue tomada"""
+    return float(os.getenv("COORDINATION_CLAIM_SECONDS", "43200"))
+
+
+class MemoryStore:
+    """Leases y resultados dentro del proceso (una sola réplica y pruebas)"""
+
+    def __init__(self):
+        self._leases = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name, owner, ttl):
+        """
+        Toma un lease si está libre o vencido
+
+        No es reentrante: si owner ya lo tiene devuelve False (para extenderlo está renew).
+
+        Returns:
+            bool: True si el lease quedó a nombre de owner
+        """
+        now = time.time()
+        with self._lock:
+            # Se olvidan los leases vencidos (los reclamos de horarios se acumulan)
+            for key in [key for key, (_, expires_at) in self._leases.items() if expires_at <= now]:
+                del self._leases[key]
+            if name in self._leases:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def renew(self, name, owner, ttl):
+        """Extiende un lease vigente de owner; False si ya no es suyo"""
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is None or current[0] != owner or current[1] <= now:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def release(self, name, owner):
+        """Libera un lease si todavía es de owner"""
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] == owner:
+                del self._leases[name]
+
+    def put_result(self, key, value, ttl=None):
+        """Guarda un resultado (serializable a JSON), opcionalmente con vencimiento"""
+        with self._lock:
+            self._results[key] = (json.dumps(value, ensure_ascii=False), time.time() + ttl if ttl else None)
+
+    def get_result(self, key):
+        """Resultado guardado, o None si no existe o ya venció"""
+        with self._lock:
+            stored = self._results.get(key)
+        if stored is None or (stored[1] is not None and stored[1] <= time.time()):
+            return None
+        return json.loads(stored[0])
+
+
+class SqliteStore:
+    """Leases y resultados en un archivo SQLite compartido por las réplicas"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Archivo de la base de datos (opcional, default: COORDINATION_DB_PATH o DATA_DIR/coordination.db)
+        """
+        if path is None:
+            path = os.getenv("COORDINATION_DB_PATH") or os.path.join(get_data_dir(), "coordination.db")
+
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Sin WAL: el modo WAL necesita memoria compartida y no funciona en discos de red
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Una conexión por operación: se usa desde varios hilos y procesos
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _execute(self, sql, params):
+        connection = self._connect()
+        try:
+            with connection:
+                return connection.execute(sql, params).rowcount
+        finally:
+            connection.close()
+
+    def acquire(self, name, owner, ttl):
+        """Toma un lease si está libre o vencido (un upsert condicional atómico); no es reentrante"""
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                # Se olvidan los leases vencidos (los reclamos de horarios se acumulan)
+                connection.execute("DELETE FROM leases WHERE expires_at <= ? AND name != ?", (now, name))
+                changed = connection.execute(
+                    """
+                    INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                    WHERE leases.expires_at <= ?
+                    """,
+                    (name, owner, now + ttl, now),
+                ).rowcount
+        finally:
+            connection.close()
+        return changed == 1
+
+    def renew(self, name, owner, ttl):
+        """Extiende un lease vigente de owner; False si ya no es suyo"""
+        now = time.time()
+        changed = self._execute(
+            "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ? AND expires_at > ?",
+            (now + ttl, name, owner, now),
+        )
+        return changed == 1
+
+    def release(self, name, owner):
+        """Libera un lease si todavía es de owner"""
+        self._execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def put_result(self, key, value, ttl=None):
+        """Guarda un resultado (serializable a JSON), opcionalmente con vencimiento"""
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO results (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now, now + ttl if ttl else None),
+        )
+
+    def get_result(self, key):
+        """Resultado guardado, o None si no existe o ya venció"""
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT value FROM results WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            connection.close()
+        return json.loads(row[0]) if row else None
+
+
+class RedisStore:
+    """Leases y resultados en Redis (SET NX con vencimiento y scripts de comparar y borrar)"""
+
+    # Renovar y liberar sólo si el lease sigue siendo del mismo dueño
+    _RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, url=None, prefix=None):
+        """
+        Args:
+            url: URL del servidor (opcional, default: REDIS_URL o redis://localhost:6379/0)
+            prefix: Prefijo de las llaves (opcional, default: COORDINATION_PREFIX o "telegram-bot:")
+        """
+        import redis
+
+        if url is None:
+            url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        if prefix is None:
+            prefix = os.getenv("COORDINATION_PREFIX", "telegram-bot:")
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def acquire(self, name, owner, ttl):
+        """Toma un lease si está libre (SET NX); no es reentrante"""
+        return bool(self._client.set(f"{self.prefix}lease:{name}", owner, nx=True, px=int(ttl * 1000)))
+
+    def renew(self, name, owner, ttl):
+        """Extiende un lease vigente de owner; False si ya no es suyo"""
+        return bool(self._client.eval(self._RENEW, 1, f"{self.prefix}lease:{name}", owner, int(ttl * 1000)))
+
+    def release(self, name, owner):
+        """Libera un lease si todavía es de owner"""
+        self._client.eval(self._RELEASE, 1, f"{self.prefix}lease:{name}", owner)
+
+    def put_result(self, key, value, ttl=None):
+        """Guarda un resultado (serializable a JSON), opcionalmente con vencimiento"""
+        self._client.set(
+            f"{self.prefix}result:{key}",
+            json.dumps(value, ensure_ascii=False),
+            px=int(ttl * 1000) if ttl else None,
+        )
+
+    def get_result(self, key):
+        """Resultado guardado, o None si no existe o ya venció"""
+        raw = self._client.get(f"{self.prefix}result:{key}")
+        return json.loads(raw) if raw else None
+
+
+_BACKENDS = {"memory": MemoryStore, "sqlite": SqliteStore, "redis": RedisStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Devuelve el almacén de coordinación configurado (COORDINATION_BACKEND), creándolo si es necesario"""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            backend = os.getenv("COORDINATION_BACKEND", "memory").lower()
+            if backend not in _BACKENDS:
+                raise ValueError(f"COORDINATION_BACKEND desconocido: {backend} (opciones: {', '.join(_BACKENDS)})")
+            _store = _BACKENDS[backend]()
+        return _store
+
+
+class Lease:
+    """
+    Lease renovable: mientras se tiene, ninguna otra réplica obtiene el mismo nombre
+
+    Se usa como context manager; `acquired` indica si se obtuvo. Un hilo lo
+    renueva cada tercio de su vencimiento hasta liberarlo, así que una
+    ejecución larga no lo pierde.
+
+    Cada Lease tiene su propio dueño (el nodo más un token aleatorio): dos
+    hilos del mismo proceso (p. ej. el scheduler y el vigilante) también se
+    excluyen entre sí, y liberar uno no libera el lease del otro.
+    """
+
+    def __init__(self, name, ttl=None, store=None, owner=None):
+        """
+        Args:
+            name: Nombre del lease (p. ej. "report:yucatan")
+            ttl: Vencimiento en segundos (opcional, default: COORDINATION_LEASE_SECONDS)
+            store: Almacén de coordinación (opcional, default: get_store())
+            owner: Dueño del lease (opcional, default: node_id() más un token único de este Lease)
+        """
+        self.name = name
+        self.ttl = ttl if ttl is not None else get_lease_seconds()
+        self.store = store if store is not None else get_store()
+        self.owner = owner or f"{node_id()}:{uuid.uuid4().hex}"
+        self.acquired = False
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def _renew_forever(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                renewed = self.store.renew(self.name, self.owner, self.ttl)
+            except Exception as e:
+                print(f"Error renovando el lease {self.name}: {e}")
+                continue
+            if not renewed:
+                print(f"Se perdió el lease {self.name}; otra réplica puede tomarlo")
+                return
+
+    def acquire(self):
+        """Intenta tomar el lease; True si se obtuvo (o si el almacén no responde)"""
+        try:
+            self.acquired = self.store.acquire(self.name, self.owner, self.ttl)
+        except Exception as e:
+            # Mejor un reporte duplicado que un diario sin revisar
+            print(f"Error tomando el lease {self.name}, se continúa sin coordinación: {e}")
+            self.acquired = True
+        if self.acquired:
+            self._stop.clear()
+            self._renewer = threading.Thread(target=self._renew_forever, daemon=True)
+            self._renewer.start()
+        return self.acquired
+
+    def release(self):
+        """Detiene la renovación y libera el lease"""
+        if not self.acquired:
+            return
+        self._stop.set()
+        self._renewer.join()
+        self.acquired = False
+        try:
+            self.store.release(self.name, self.owner)
+        except Exception as e:
+            # Si no se pudo liberar, vence solo
+            print(f"Error liberando el lease {self.name}: {e}")
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+
+def claim(name, ttl=None):
+    """
+    Reclama una ejecución única (p. ej. un horario programado): sólo la primera réplica la obtiene
+
+    El reclamo no se libera; vence a los COORDINATION_CLAIM_SECONDS. Si el
+    almacén no responde la ejecución se hace de todos modos.
+
+    Returns:
+        bool: True si esta réplica debe ejecutarla
+    """
+    try:
+        return get_store().acquire(name, node_id(), ttl if ttl is not None else get_claim_seconds())
+    except Exception as e:
+        print(f"Error reclamando {name}, se ejecuta sin coordinación: {e}")
+        return True
+
+
+def publish_result(key, value, ttl=None):
+    """Publica un resultado para las demás réplicas; un error del almacén no interrumpe el reporte"""
+    try:
+        get_store().put_result(key, value, ttl)
+    except Exception as e:
+        print(f"Error publicando el resultado {key}: {e}")
+
+
+def latest_result(key):
+    """Último resultado publicado con esa llave (por cualquier réplica), o None"""
+    try:
+        return get_store().get_result(key)
+    except Exception as e:
+        print(f"Error leyendo el resultado {key}: {e}")
+        return None
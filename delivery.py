@@ -0,0 +1,242 @@
+"""
+Envío de mensajes a Telegram para muchos chats a la vez.
+
+Todas las llamadas a la API de Telegram pasan por TelegramAPI, que respeta el
+límite global del bot y el de cada chat, espera lo indicado en retry_after
+cuando Telegram responde 429, reintenta los errores transitorios (conexión y
+5xx) y lleva métricas de los envíos. Un timeout de lectura no se reintenta:
+Telegram pudo haber recibido el mensaje y reenviarlo lo duplicaría. Las llamadas usan la sesión HTTP
+compartida, así que las conexiones a api.telegram.org se reutilizan.
+
+deliver_all reparte los envíos entre varios hilos: los mensajes de un mismo
+chat se envían en orden y los de chats distintos en paralelo. Los envíos con
+clave de deduplicación no se repiten si ya se hicieron hace poco (p. ej. si el
+horario programado y el modo de vigilancia detectan la misma edición).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import metrics
+
+# Caracteres con significado en el Markdown de Telegram (parse_mode=Markdown)
+_MARKDOWN_SPECIAL = "_*`["
+
+
+def escape_markdown(text):
+    """Escapa los caracteres especiales de Markdown para que se muestren tal cual"""
+    return "".join("\\" + char if char in _MARKDOWN_SPECIAL else char for char in text)
+
+
+class TelegramAPI:
+    """Cliente de la API de Telegram con límites de velocidad, reintentos y métricas"""
+
+    def __init__(self, global_rate=None, chat_interval=None, max_retries=None, backoff=None, dedup_seconds=None):
+        """
+        Args:
+            global_rate: Mensajes por segundo de todo el bot (opcional, default: TELEGRAM_GLOBAL_RATE)
+            chat_interval: Segundos mínimos entre mensajes a un mismo chat (opcional, default: TELEGRAM_CHAT_INTERVAL)
+            max_retries: Reintentos por mensaje (opcional, default: TELEGRAM_MAX_RETRIES)
+            backoff: Espera base entre reintentos en segundos (opcional, default: TELEGRAM_BACKOFF)
+            dedup_seconds: Tiempo durante el que no se repite un envío con la misma clave (opcional)
+        """
+        if global_rate is None:
+            global_rate = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+        if chat_interval is None:
+            chat_interval = float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1"))
+        if max_retries is None:
+            max_retries = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+        if backoff is None:
+            backoff = float(os.getenv("TELEGRAM_BACKOFF", "1"))
+        if dedup_seconds is None:
+            dedup_seconds = float(os.getenv("TELEGRAM_DEDUP_SECONDS", "3600"))
+
+        self.global_limiter = http_client.RateLimiter(1 / global_rate if global_rate > 0 else 0)
+        self.chat_interval = chat_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dedup_seconds = dedup_seconds
+        self._lock = threading.Lock()
+        self._chat_limiters = {}
+        self._recent = {}
+        self._metrics = {
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "deduplicated": 0,
+            "send_seconds": 0.0,
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._metrics[name] += value
+
+    def metrics(self):
+        """Copia de las métricas de envío"""
+        with self._lock:
+            return dict(self._metrics, send_seconds=round(self._metrics["send_seconds"], 3))
+
+    def _chat_limiter(self, chat_id):
+        with self._lock:
+            limiter = self._chat_limiters.get(chat_id)
+            if limiter is None:
+                limiter = self._chat_limiters[chat_id] = http_client.RateLimiter(self.chat_interval)
+            return limiter
+
+    def claim(self, key):
+        """
+        Reserva una clave de deduplicación
+
+        Returns:
+            bool: False si el mismo envío ya se hizo dentro de TELEGRAM_DEDUP_SECONDS
+        """
+        now = time.monotonic()
+        with self._lock:
+            for old_key in [old for old, sent_at in self._recent.items() if now - sent_at > self.dedup_seconds]:
+                del self._recent[old_key]
+            if key in self._recent:
+                self._metrics["deduplicated"] += 1
+                return False
+            self._recent[key] = now
+            return True
+
+    def release(self, key):
+        """Libera una clave cuyo envío falló, para que se pueda reintentar"""
+        with self._lock:
+            self._recent.pop(key, None)
+
+    def _wait_turn(self, chat_id):
+        self._chat_limiter(chat_id).wait()
+        self.global_limiter.wait()
+
+    def call(self, url, chat_id, data, files=None):
+        """
+        Hace una llamada a la API de Telegram respetando los límites
+
+        Args:
+            url: URL del método (p. ej. .../sendMessage)
+            chat_id: Chat destino (para el límite por chat)
+            data: Campos del formulario
+            files: Archivos a subir (opcional)
+
+        Returns:
+            dict: Respuesta JSON de Telegram (con "ok" en False si falló)
+        """
+        attempt = 0
+        while True:
+            self._wait_turn(chat_id)
+            # Los archivos abiertos se vuelven a leer desde el inicio en cada intento
+            for value in (files or {}).values():
+                if hasattr(value[1], "seek"):
+                    value[1].seek(0)
+
+            started = time.perf_counter()
+            try:
+                response = http_client.request("POST", url, data=data, files=files)
+            except requests.ConnectionError as e:
+                # Sólo si no hubo conexión (incluye ConnectTimeout); con un timeout de lectura
+                # (ReadTimeout no es ConnectionError) el envío pudo llegar y se da por fallido
+                if attempt >= self.max_retries:
+                    self._count("failed")
+                    raise
+                attempt += 1
+                self._count("retried")
+                print(f"Error de conexión con Telegram, reintento {attempt}: {e}")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+            except requests.RequestException:
+                self._count("failed")
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self._count("send_seconds", elapsed)
+                metrics.telegram_request_seconds.observe(elapsed, method=url.rsplit("/", 1)[-1])
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"ok": False, "error_code": response.status_code, "description": response.text[:200]}
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                # Telegram indica cuántos segundos esperar; se pausa todo el bot
+                retry_after = body.get("parameters", {}).get("retry_after", 1)
+                attempt += 1
+                self._count("rate_limited")
+                print(f"Telegram pidió esperar {retry_after}s (429)")
+                self.global_limiter.pause(retry_after)
+                continue
+
+            if response.status_code >= 500 and attempt < self.max_retries:
+                attempt += 1
+                self._count("retried")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+
+            self._count("sent" if body.get("ok") else "failed")
+            if not body.get("ok"):
+                print(f"Telegram rechazó el envío al chat {chat_id}: {body.get('description')}")
+            return body
+
+
+def deliver_all(tasks, concurrency=None):
+    """
+    Ejecuta los envíos de varios chats en paralelo, en orden dentro de cada chat
+
+    Args:
+        tasks: Mapa chat_id -> lista de funciones sin argumentos (cada una hace un envío)
+        concurrency: Chats atendidos a la vez (opcional, default: TELEGRAM_SEND_CONCURRENCY)
+
+    Returns:
+        dict: Mapa chat_id -> lista con el resultado o la excepción de cada envío
+    """
+    if concurrency is None:
+        concurrency = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "8"))
+
+    def run_chat(chat_tasks):
+        results = []
+        for task in chat_tasks:
+            try:
+                results.append(task())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    if not tasks:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(tasks)))) as executor:
+        futures = {chat_id: executor.submit(run_chat, chat_tasks) for chat_id, chat_tasks in tasks.items()}
+        return {chat_id: future.result() for chat_id, future in futures.items()}
+
+
+def collect_metrics():
+    """Contadores de envío del cliente compartido, para GET /metrics"""
+    counters = get_telegram_api().metrics()
+    send_seconds = counters.pop("send_seconds")
+    return [
+        ("telegram_messages_total", "counter", "Llamadas a Telegram por resultado",
+         [({"result": name}, value) for name, value in sorted(counters.items())]),
+        ("telegram_send_seconds_total", "counter", "Tiempo total esperando respuestas de Telegram",
+         [({}, send_seconds)]),
+    ]
+
+
+metrics.registry.add_collector(collect_metrics)
+
+_api = None
+_api_lock = threading.Lock()
+
+
+def get_telegram_api():
+    """Devuelve el cliente de Telegram compartido, creándolo si es necesario"""
+    global _api
+
+    with _api_lock:
+        if _api is None:
+            _api = TelegramAPI()
+        return _api
@@ -0,0 +1,93 @@
+"""
+Registro de los file_id de Telegram de los PDFs ya subidos.
+
+Telegram devuelve un file_id por cada documento enviado; con él se puede
+reenviar el mismo archivo a cualquier chat sin volver a subirlo. El reporte
+programado, /run-report y /send-pdf suelen enviar el mismo PDF del día varias
+veces, así que se guarda el file_id por hash del contenido (y por páginas, en
+el caso de los extractos) y los envíos siguientes son una llamada pequeña.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from gazette_cache import get_data_dir
+
+
+def document_key(sha256, pages=None):
+    """Clave de un documento: hash del PDF y, si es un extracto, sus páginas"""
+    if not pages:
+        return sha256
+    return f"{sha256}:{','.join(str(page) for page in pages)}"
+
+
+class FileIdStore:
+    """Mapa persistente clave del documento -> file_id de Telegram"""
+
+    def __init__(self, state_path=None, max_entries=None):
+        """
+        Args:
+            state_path: Archivo del registro (opcional, default: DATA_DIR/telegram_file_ids.json)
+            max_entries: Entradas que se conservan; se olvidan primero las más antiguas (opcional)
+        """
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "telegram_file_ids.json")
+        if max_entries is None:
+            max_entries = int(os.getenv("TELEGRAM_FILE_ID_MAX", "500"))
+
+        self.state_path = state_path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._file_ids = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._file_ids, f)
+        os.replace(tmp_path, self.state_path)
+
+    def get(self, key):
+        """Devuelve el file_id de un documento, o None si no se ha subido"""
+        with self._lock:
+            return self._file_ids.get(key)
+
+    def set(self, key, file_id):
+        """Registra el file_id de un documento recién subido"""
+        with self._lock:
+            self._file_ids.pop(key, None)
+            self._file_ids[key] = file_id
+            # Los diccionarios conservan el orden de inserción: los primeros son los más antiguos
+            for old_key in list(self._file_ids)[: max(0, len(self._file_ids) - self.max_entries)]:
+                del self._file_ids[old_key]
+            self._save_state()
+
+    def discard(self, key):
+        """Olvida un file_id que Telegram ya no acepta"""
+        with self._lock:
+            if self._file_ids.pop(key, None) is not None:
+                self._save_state()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_file_id_store():
+    """Devuelve el registro compartido, creándolo si es necesario"""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = FileIdStore()
+        return _store
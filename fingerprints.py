@@ -0,0 +1,217 @@
+"""
+Huellas de cada reporte y diferencias entre ejecuciones.
+
+Los horarios del día (y el modo de vigilancia) suelen procesar la misma
+edición varias veces. Cada reporte guarda una huella de lo que procesó: la
+huella de la página del diario, el hash de cada PDF, el hash del texto de
+cada página y las páginas donde apareció cada término. El siguiente reporte
+se compara con esa huella para avisar sólo de lo nuevo (otra edición, PDFs o
+páginas que cambiaron, coincidencias nuevas) y, si un PDF no cambió y los
+términos son los mismos, reutiliza su resultado sin volver a leerlo.
+
+La huella se guarda en DATA_DIR/last_run_fingerprint.json (una por fuente,
+ver sources.py).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from gazette_cache import get_data_dir
+
+
+def text_hash(text):
+    """Hash corto del texto de una página"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def build_fingerprint(edition):
+    """
+    Huella de una edición procesada
+
+    Args:
+        edition: Resultado consolidado de diario_scraping
+
+    Returns:
+        dict: Fecha publicada, huella de la página, términos buscados y por cada PDF
+              (por URL) su hash, páginas, hash del texto de cada página y coincidencias
+    """
+    return {
+        "created_at": time.time(),
+        "fecha_consulta": edition["fecha_consulta"].strip(),
+        "index_fingerprint": edition["index_fingerprint"],
+        "terms": sorted(edition["terms"]),
+        "pdfs": {
+            pdf["url"]: {
+                "sha256": pdf["sha256"],
+                "filename": pdf["filename"],
+                "total_pages": pdf["total_pages"],
+                "page_hashes": pdf["page_hashes"],
+                "matches": pdf["matches"],
+            }
+            for pdf in edition["pdfs"]
+        },
+    }
+
+
+def latest_fingerprint(*fingerprints):
+    """
+    La huella más reciente entre varias (p. ej. la local y la publicada por otra réplica)
+
+    Returns:
+        dict: Huella con el created_at mayor, o None si no hay ninguna
+    """
+    known = [fingerprint for fingerprint in fingerprints if fingerprint]
+    if not known:
+        return None
+    return max(known, key=lambda fingerprint: fingerprint.get("created_at", 0))
+
+
+def reusable_result(previous, url, sha256, terms):
+    """
+    Resultado guardado de un PDF que no cambió desde la última ejecución
+
+    Args:
+        previous: Huella de la ejecución anterior (o None)
+        url: URL del PDF
+        sha256: Hash del PDF descargado ahora
+        terms: Términos buscados ahora
+
+    Returns:
+        dict: Entrada del PDF en la huella anterior, o None si hay que buscar de nuevo
+    """
+    if not previous:
+        return None
+    entry = previous["pdfs"].get(url)
+    if not entry or entry["sha256"] != sha256 or sorted(entry["matches"]) != sorted(terms):
+        return None
+    return entry
+
+
+def diff_fingerprints(previous, current):
+    """
+    Cambios de una ejecución respecto a la anterior
+
+    Args:
+        previous: Huella anterior (o None si es la primera ejecución)
+        current: Huella de esta ejecución
+
+    Returns:
+        dict: new_edition, new_pdfs (URLs), new_pages (URL -> páginas cuyo texto cambió),
+              new_matches (término -> URL -> páginas nuevas) y changed
+    """
+    # La edición se identifica por la fecha publicada en la página, no por el día de la ejecución
+    new_edition = previous is None or previous["fecha_consulta"] != current["fecha_consulta"]
+
+    new_pdfs = []
+    new_pages = {}
+    new_matches = {}
+    for url, pdf in current["pdfs"].items():
+        before = None if new_edition else previous["pdfs"].get(url)
+        if before is None:
+            new_pdfs.append(url)
+        elif before["sha256"] != pdf["sha256"]:
+            known = set(before["page_hashes"])
+            pages = [number for number, digest in enumerate(pdf["page_hashes"], 1) if digest not in known]
+            if pages:
+                new_pages[url] = pages
+
+        for term, pages in pdf["matches"].items():
+            known_pages = set(before["matches"].get(term, [])) if before else set()
+            added = [page for page in pages if page not in known_pages]
+            if added:
+                new_matches.setdefault(term, {})[url] = added
+
+    return {
+        "new_edition": new_edition,
+        "new_pdfs": new_pdfs,
+        "new_pages": new_pages,
+        "new_matches": new_matches,
+        "changed": bool(new_edition or new_pdfs or new_pages or new_matches),
+    }
+
+
+def describe_diff(diff, current, terms):
+    """
+    Resumen de los cambios para un chat
+
+    Args:
+        diff: Resultado de diff_fingerprints (no debe ser una edición nueva)
+        current: Huella de esta ejecución
+        terms: Términos del chat
+
+    Returns:
+        str: Líneas con los PDFs y páginas nuevas y las coincidencias nuevas del chat
+    """
+    def name(url):
+        return current["pdfs"][url]["filename"]
+
+    lines = []
+    for url in diff["new_pdfs"]:
+        lines.append(f"PDF nuevo: {name(url)}")
+    for url, pages in diff["new_pages"].items():
+        lines.append(f"{name(url)} cambió - páginas nuevas o modificadas: {pages}")
+    for term in terms:
+        for url, pages in diff["new_matches"].get(term, {}).items():
+            lines.append(f"'{term}' encontrado en {name(url)}, páginas nuevas: {pages}")
+    return "\n".join(lines)
+
+
+class FingerprintStore:
+    """Huella del último reporte, persistida en disco"""
+
+    def __init__(self, state_path=None):
+        """
+        Args:
+            state_path: Archivo de la huella (opcional, default: DATA_DIR/last_run_fingerprint.json)
+        """
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "last_run_fingerprint.json")
+
+        self.state_path = state_path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Huella del último reporte, o None si todavía no hay ninguno"""
+        with self._lock:
+            try:
+                with open(self.state_path, encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+    def save(self, fingerprint):
+        """Reemplaza la huella guardada (escritura atómica)"""
+        with self._lock:
+            directory = os.path.dirname(self.state_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(fingerprint, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+
+
+# Almacenes por nombre de archivo (uno por fuente)
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_fingerprint_store(source=None):
+    """
+    Devuelve el almacén de huellas de una fuente, creándolo si es necesario
+
+    Args:
+        source: GazetteSource (opcional, default: la huella de siempre)
+    """
+    filename = "last_run_fingerprint.json"
+    if source is not None:
+        filename = source.state_name(filename)
+
+    with _stores_lock:
+        store = _stores.get(filename)
+        if store is None:
+            store = _stores[filename] = FingerprintStore(os.path.join(get_data_dir(), filename))
+        return store
@@ -0,0 +1,383 @@
+"""
+Caché en disco de los diarios descargados y de su texto extraído.
+
+Cada PDF se guarda una sola vez bajo su SHA-256 (direccionamiento por
+contenido) junto con el texto de sus páginas comprimido con gzip. Un índice
+asocia cada URL con su ETag, Last-Modified y hash, de modo que una ejecución
+sobre un diario sin cambios sólo cuesta una petición condicional y ningún
+parseo del PDF. El tamaño total está acotado y se desalojan primero las
+entradas usadas hace más tiempo (LRU).
+
+Los PDFs descargados a archivo (PDF_STREAMING) quedan fijados mientras se
+procesa su edición: el desalojo no los borra hasta que se liberan con
+unpin, aunque la caché exceda el máximo mientras tanto.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_data_dir():
+    """Directorio para los datos persistentes del bot (DATA_DIR, default: data)"""
+    return os.getenv("DATA_DIR", "data")
+
+
+class _PageWriter:
+    """Escribe el texto de las páginas de un PDF en un archivo temporal comprimido"""
+
+    def __init__(self, cache, sha256):
+        self._cache = cache
+        self._sha256 = sha256
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.directory, suffix=".tmp")
+        self._file = gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8")
+        self._pages = 0
+
+    def write(self, page_num, text):
+        """Agrega la siguiente página (deben llegar en orden)"""
+        if page_num != self._pages + 1:
+            raise ValueError(f"Página fuera de orden: {page_num}")
+        self._file.write(json.dumps(text, ensure_ascii=False) + "\n")
+        self._pages = page_num
+
+    def commit(self):
+        """Publica el archivo en la caché"""
+        self._file.close()
+        path = self._cache._pages_path(self._sha256)
+        os.replace(self._tmp_path, path)
+        self._cache._evict(keep=path)
+
+    def discard(self):
+        """Descarta lo escrito (p. ej. si la extracción se interrumpió)"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class GazetteCache:
+    """Caché LRU acotada de PDFs y texto por página, indexada por URL y SHA-256"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        """
+        Args:
+            directory: Directorio de la caché (opcional, default: CACHE_DIR o DATA_DIR/cache)
+            max_bytes: Tamaño máximo en bytes (opcional, default: CACHE_MAX_MB)
+        """
+        if directory is None:
+            directory = os.getenv("CACHE_DIR", os.path.join(get_data_dir(), "cache"))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        # Ruta -> número de usuarios que la fijaron (ver pin/unpin)
+        self._pinned = {}
+        self._index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _content_path(self, sha256, extension="pdf"):
+        return os.path.join(self.directory, f"{sha256}.{extension}")
+
+    def _pages_path(self, sha256):
+        return os.path.join(self.directory, f"{sha256}.pages.gz")
+
+    def _touch(self, path):
+        """Marca un archivo como usado recientemente (su mtime ordena el LRU)"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def get_entry(self, url):
+        """
+        Obtiene los metadatos guardados para una URL
+
+        Returns:
+            dict: etag, last_modified, sha256 y total_pages, o None si no hay entrada
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            return dict(entry) if entry else None
+
+    def conditional_headers(self, url):
+        """
+        Encabezados para una petición condicional a una URL ya descargada
+
+        Sólo se envían si el contenido sigue en la caché; de lo contrario un
+        304 no serviría de nada.
+
+        Returns:
+            dict: If-None-Match y/o If-Modified-Since
+        """
+        entry = self.get_entry(url)
+        if not entry or not os.path.exists(self._content_path(entry["sha256"], entry.get("extension", "pdf"))):
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_pdf(self, sha256):
+        """Devuelve el contenido de un PDF guardado, o None si fue desalojado"""
+        return self._load_content(sha256, "pdf")
+
+    def load(self, url):
+        """
+        Devuelve el último contenido guardado para una URL
+
+        Returns:
+            bytes: Contenido guardado, o None si no hay entrada o fue desalojado
+        """
+        entry = self.get_entry(url)
+        if not entry:
+            return None
+        return self._load_content(entry["sha256"], entry.get("extension", "pdf"))
+
+    def _load_content(self, sha256, extension):
+        path = self._content_path(sha256, extension)
+        if not self._touch(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def store_pdf(self, url, content, etag=None, last_modified=None):
+        """
+        Guarda un PDF descargado y actualiza la entrada de su URL
+
+        Args:
+            url: URL desde la que se descargó
+            content: Contenido del PDF en bytes
+            etag: Encabezado ETag de la respuesta (opcional)
+            last_modified: Encabezado Last-Modified de la respuesta (opcional)
+
+        Returns:
+            str: SHA-256 del contenido
+        """
+        return self.store(url, content, etag, last_modified, extension="pdf")
+
+    def store(self, url, content, etag=None, last_modified=None, extension="pdf"):
+        """
+        Guarda cualquier contenido descargado (PDF, HTML) y actualiza la entrada de su URL
+
+        Args:
+            url: URL desde la que se descargó
+            content: Contenido en bytes
+            etag: Encabezado ETag de la respuesta (opcional)
+            last_modified: Encabezado Last-Modified de la respuesta (opcional)
+            extension: Extensión del archivo en la caché (default: pdf)
+
+        Returns:
+            str: SHA-256 del contenido
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._content_path(sha256, extension)
+
+        with self._lock:
+            if not self._touch(path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            self._register(url, sha256, etag, last_modified, extension)
+
+        return sha256
+
+    def spool_file(self):
+        """
+        Crea un archivo temporal dentro de la caché para escribir una descarga
+
+        Returns:
+            tuple: (descriptor del archivo, ruta), como tempfile.mkstemp
+        """
+        return tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+
+    def store_file(self, url, tmp_path, sha256, etag=None, last_modified=None, extension="pdf", pin=False):
+        """
+        Guarda una descarga ya escrita en un archivo de spool_file, sin leerla a memoria
+
+        Args:
+            url: URL desde la que se descargó
+            tmp_path: Archivo temporal con el contenido (se mueve a la caché)
+            sha256: SHA-256 del contenido, calculado mientras se descargaba
+            etag: Encabezado ETag de la respuesta (opcional)
+            last_modified: Encabezado Last-Modified de la respuesta (opcional)
+            extension: Extensión del archivo en la caché (default: pdf)
+            pin: Fijar el archivo hasta que se libere con unpin (ver pin)
+
+        Returns:
+            str: Ruta del contenido en la caché
+        """
+        path = self._content_path(sha256, extension)
+
+        with self._lock:
+            if self._touch(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+            if pin:
+                self.pin(path)
+            self._register(url, sha256, etag, last_modified, extension)
+
+        return path
+
+    def content_path(self, url, pin=False):
+        """
+        Ruta del último contenido guardado para una URL
+
+        Args:
+            url: URL del contenido
+            pin: Fijar el archivo hasta que se libere con unpin (ver pin)
+
+        Returns:
+            str: Ruta del archivo, o None si no hay entrada o fue desalojado
+        """
+        with self._lock:
+            entry = self.get_entry(url)
+            if not entry:
+                return None
+            path = self._content_path(entry["sha256"], entry.get("extension", "pdf"))
+            if not self._touch(path):
+                return None
+            if pin:
+                self.pin(path)
+            return path
+
+    def pin(self, path):
+        """
+        Protege un archivo del desalojo (p. ej. un PDF que todavía se va a enviar)
+
+        Cada pin debe liberarse con un unpin; el archivo se puede desalojar
+        cuando ya nadie lo tiene fijado.
+        """
+        with self._lock:
+            self._pinned[path] = self._pinned.get(path, 0) + 1
+
+    def unpin(self, path):
+        """Libera un pin de pin(); al liberar el último se aplica el tamaño máximo"""
+        with self._lock:
+            count = self._pinned.get(path, 0) - 1
+            if count > 0:
+                self._pinned[path] = count
+                return
+            self._pinned.pop(path, None)
+            self._evict()
+
+    def _register(self, url, sha256, etag, last_modified, extension):
+        """Actualiza la entrada de una URL recién guardada y respeta el tamaño máximo"""
+        with self._lock:
+            previous = self._index.get(url, {})
+            self._index[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "sha256": sha256,
+                "extension": extension,
+                "total_pages": previous.get("total_pages") if previous.get("sha256") == sha256 else None,
+                "stored_at": time.time(),
+            }
+            self._save_index()
+            # El contenido recién guardado se conserva aunque por sí solo exceda el máximo
+            self._evict(keep=self._content_path(sha256, extension))
+
+    def has_pages(self, sha256):
+        """Indica si el texto de las páginas de un PDF está en la caché"""
+        return os.path.exists(self._pages_path(sha256))
+
+    def iter_pages(self, sha256):
+        """
+        Itera sobre el texto guardado de cada página sin descomprimirlo todo
+
+        Yields:
+            tuple: (número de página, texto)
+        """
+        path = self._pages_path(sha256)
+        self._touch(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for page_num, line in enumerate(f, 1):
+                yield page_num, json.loads(line)
+
+    def page_writer(self, sha256):
+        """Crea un escritor incremental para el texto de las páginas de un PDF"""
+        return _PageWriter(self, sha256)
+
+    def set_total_pages(self, url, total_pages):
+        """Registra el número de páginas del PDF asociado a una URL"""
+        with self._lock:
+            if url in self._index:
+                self._index[url]["total_pages"] = total_pages
+                self._save_index()
+
+    def _evict(self, keep=None):
+        """Elimina los archivos usados hace más tiempo hasta respetar el tamaño máximo"""
+        with self._lock:
+            files = []
+            total_size = 0
+            for name in os.listdir(self.directory):
+                if name == "index.json" or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total_size += stat.st_size
+                if path != keep and path not in self._pinned:
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+            if total_size <= self.max_bytes:
+                return
+
+            evicted = set()
+            for _, size, path in sorted(files):
+                if total_size <= self.max_bytes:
+                    break
+                os.remove(path)
+                total_size -= size
+                evicted.add(os.path.basename(path).split(".")[0])
+                print(f"Caché: desalojado {os.path.basename(path)}")
+
+            # Olvidar las URLs cuyo PDF ya no está en disco
+            stale = [
+                url for url, entry in self._index.items()
+                if entry["sha256"] in evicted
+                and not os.path.exists(self._content_path(entry["sha256"], entry.get("extension", "pdf")))
+            ]
+            for url in stale:
+                del self._index[url]
+            if stale:
+                self._save_index()
+
+
+def get_cache():
+    """Devuelve la caché compartida del proceso (se crea bajo demanda)"""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = GazetteCache()
+        return _cache
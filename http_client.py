@@ -0,0 +1,475 @@
+"""
+Cliente HTTP compartido para el scraper, la descarga de PDFs y Telegram.
+
+Todas las peticiones pasan por una sola sesión de requests con conexiones
+persistentes (keep-alive), timeouts configurables, reintentos con espera
+exponencial y compresión gzip. Las descargas del sitio del Diario Oficial
+usan peticiones condicionales (If-None-Match/If-Modified-Since) contra la
+caché en disco, así que una ejecución sin novedades sólo transfiere los
+encabezados de las respuestas 304.
+
+Los endpoints de FastAPI usan las variantes asíncronas (request_async,
+fetch_async) sobre un httpx.AsyncClient con la misma configuración, para no
+bloquear el event loop mientras se descargan o envían archivos.
+
+Las descargas de los diarios (fetch y fetch_async) abren como máximo
+HTTP_MAX_CONNECTIONS_PER_HOST conexiones a la vez con un mismo sitio, aunque
+varias fuentes o ediciones se procesen al mismo tiempo; el resto espera su
+turno en lugar de saturar al servidor.
+
+Con stream=True la descarga se escribe por bloques directamente a la caché en
+disco y se devuelve la ruta del archivo en lugar de los bytes, de modo que un
+PDF de cientos de MB no tiene que caber en memoria.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+_session = None
+_session_lock = threading.Lock()
+
+# Cliente asíncrono y el event loop al que pertenece
+_async_client = None
+_async_client_loop = None
+
+_RETRY_STATUS = (500, 502, 503, 504)
+
+# Tamaño de los bloques al descargar a archivo
+_CHUNK_SIZE = 256 * 1024
+
+# Descargas simultáneas por sitio (semáforos por host) para los hilos y para el event loop actual
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+_async_host_slots = {}
+_async_host_slots_loop = None
+
+
+def get_timeout():
+    """Timeout (conexión, lectura) en segundos para cada petición"""
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("HTTP_READ_TIMEOUT", "60")),
+    )
+
+
+def _build_session():
+    """Crea la sesión con pool de conexiones y política de reintentos"""
+    # Los reintentos por lectura/estado sólo aplican a métodos idempotentes;
+    # los errores de conexión se reintentan siempre (la petición no salió)
+    retries = Retry(
+        total=int(os.getenv("HTTP_RETRIES", "3")),
+        backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.5")),
+        status_forcelist=_RETRY_STATUS,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": os.getenv("HTTP_USER_AGENT", "telegram-bot-diario-oficial/1.0"),
+        "Accept-Encoding": "gzip, deflate",
+    })
+    return session
+
+
+def get_session():
+    """Devuelve la sesión HTTP compartida del proceso (se crea bajo demanda)"""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def request(method, url, **kwargs):
+    """Hace una petición con la sesión compartida y el timeout configurado"""
+    kwargs.setdefault("timeout", get_timeout())
+    return get_session().request(method, url, **kwargs)
+
+
+class RateLimiter:
+    """Garantiza un intervalo mínimo entre solicitudes hechas desde varios hilos"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Espera hasta el siguiente turno disponible"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Retrasa todos los turnos siguientes (p. ej. tras un 429 con retry_after)"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def get_host_limit():
+    """Descargas simultáneas permitidas con un mismo sitio (HTTP_MAX_CONNECTIONS_PER_HOST)"""
+    return max(1, int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4")))
+
+
+def host_slot(url):
+    """Semáforo de las descargas al host de una URL, compartido por todos los hilos"""
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(get_host_limit())
+        return slot
+
+
+def _async_host_slot(url):
+    """Semáforo de las descargas asíncronas al host de una URL (uno por event loop)"""
+    global _async_host_slots, _async_host_slots_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_host_slots_loop is not loop:
+        _async_host_slots = {}
+        _async_host_slots_loop = loop
+    host = urlsplit(url).netloc
+    slot = _async_host_slots.get(host)
+    if slot is None:
+        slot = _async_host_slots[host] = asyncio.Semaphore(get_host_limit())
+    return slot
+
+
+class _Spool:
+    """Archivo temporal de la caché donde se escribe una descarga mientras se calcula su hash"""
+
+    def __init__(self, cache):
+        fd, self.path = cache.spool_file()
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+def _store_spool(url, cache, spool, headers, extension):
+    """Mueve una descarga terminada a la caché y arma el resultado de fetch"""
+    spool.file.close()
+    sha256 = spool.digest.hexdigest()
+    path = cache.store_file(
+        url,
+        spool.path,
+        sha256,
+        etag=headers.get("ETag"),
+        last_modified=headers.get("Last-Modified"),
+        extension=extension,
+        pin=True,
+    )
+    metrics.record_download(extension, spool.size, not_modified=False)
+    return {
+        "content": None,
+        "path": path,
+        "sha256": sha256,
+        "not_modified": False,
+        "bytes": spool.size,
+    }
+
+
+def _cached_file(url, cache, extension):
+    """Resultado de fetch a archivo para una respuesta 304, o None si la copia fue desalojada"""
+    # El archivo queda fijado en la caché hasta que quien descargó lo libere (cache.unpin)
+    path = cache.content_path(url, pin=True)
+    entry = cache.get_entry(url)
+    if path is None:
+        return None
+    if entry is None:
+        cache.unpin(path)
+        return None
+
+    print(f"Sin cambios (304), usando copia en caché: {url}")
+    metrics.record_download(extension, 0, not_modified=True)
+    return {
+        "content": None,
+        "path": path,
+        "sha256": entry["sha256"],
+        "not_modified": True,
+        "bytes": 0,
+    }
+
+
+def _download_to_cache(url, cache, response, extension):
+    response.raise_for_status()
+    spool = _Spool(cache)
+    try:
+        for chunk in response.iter_content(_CHUNK_SIZE):
+            spool.write(chunk)
+    except BaseException:
+        spool.discard()
+        raise
+    return _store_spool(url, cache, spool, response.headers, extension)
+
+
+def fetch_to_file(url, cache, extension="pdf"):
+    """
+    Descarga una URL por bloques directamente a la caché, sin cargarla a memoria
+
+    El archivo queda fijado en la caché para que el desalojo no lo borre
+    mientras se usa; quien llama debe liberarlo con cache.unpin(path).
+
+    Returns:
+        dict: content (None), path del archivo en la caché, sha256, not_modified y bytes transferidos
+    """
+    # La conexión queda ocupada mientras se leen los bloques
+    with host_slot(url):
+        with request("GET", url, headers=cache.conditional_headers(url), stream=True) as response:
+            if response.status_code != 304:
+                return _download_to_cache(url, cache, response, extension)
+            result = _cached_file(url, cache, extension)
+            if result is not None:
+                return result
+
+        # La copia fue desalojada entre la petición y la lectura
+        with request("GET", url, stream=True) as response:
+            return _download_to_cache(url, cache, response, extension)
+
+
+def fetch(url, cache=None, extension="pdf", stream=False):
+    """
+    Descarga una URL con petición condicional contra la caché
+
+    Si el servidor responde 304 (sin cambios) se devuelve la copia guardada
+    sin transferir el cuerpo de nuevo.
+
+    Args:
+        url: URL absoluta a descargar
+        cache: GazetteCache donde se guardan las respuestas (opcional)
+        extension: Extensión con la que se guarda el contenido en la caché
+        stream: Escribir la descarga a la caché por bloques y devolver su ruta en lugar de los bytes (requiere cache).
+                El archivo queda fijado en la caché: quien llama debe liberarlo con cache.unpin(path)
+
+    Returns:
+        dict: content (o path si stream es True), sha256, not_modified y bytes transferidos
+    """
+    if stream:
+        if cache is None:
+            raise ValueError("La descarga a archivo requiere la caché")
+        return fetch_to_file(url, cache, extension)
+
+    with host_slot(url):
+        return _fetch(url, cache, extension)
+
+
+def _fetch(url, cache, extension):
+    headers = cache.conditional_headers(url) if cache else {}
+    response = request("GET", url, headers=headers)
+
+    if response.status_code == 304 and cache:
+        entry = cache.get_entry(url)
+        content = cache.load(url)
+        if content is not None:
+            print(f"Sin cambios (304), usando copia en caché: {url}")
+            metrics.record_download(extension, 0, not_modified=True)
+            return {
+                "content": content,
+                "sha256": entry["sha256"],
+                "not_modified": True,
+                "bytes": 0,
+            }
+
+        # La copia fue desalojada entre la petición y la lectura
+        response = request("GET", url)
+
+    response.raise_for_status()  # Lanza excepción si hay error HTTP
+    content = response.content
+
+    sha256 = None
+    if cache:
+        sha256 = cache.store(
+            url,
+            content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            extension=extension,
+        )
+
+    metrics.record_download(extension, len(content), not_modified=False)
+    return {
+        "content": content,
+        "sha256": sha256,
+        "not_modified": False,
+        "bytes": len(content),
+    }
+
+
+def get_async_client():
+    """Devuelve el cliente asíncrono del event loop actual (se crea bajo demanda)"""
+    global _async_client, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        connect_timeout, read_timeout = get_timeout()
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=int(os.getenv("HTTP_RETRIES", "3"))),
+            follow_redirects=True,
+            headers={
+                "User-Agent": os.getenv("HTTP_USER_AGENT", "telegram-bot-diario-oficial/1.0"),
+                "Accept-Encoding": "gzip, deflate",
+            },
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client():
+    """Cierra el cliente asíncrono (al detener la aplicación)"""
+    global _async_client, _async_client_loop
+
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+async def request_async(method, url, **kwargs):
+    """
+    Hace una petición asíncrona con el cliente compartido
+
+    Los errores de conexión se reintentan en el transporte; las respuestas
+    5xx de métodos idempotentes se reintentan aquí con espera exponencial.
+    """
+    client = get_async_client()
+    retries = int(os.getenv("HTTP_RETRIES", "3")) if method in ("GET", "HEAD") else 0
+    backoff = float(os.getenv("HTTP_BACKOFF", "0.5"))
+
+    for attempt in range(retries + 1):
+        response = await client.request(method, url, **kwargs)
+        if response.status_code not in _RETRY_STATUS or attempt == retries:
+            return response
+        await asyncio.sleep(backoff * (2 ** attempt))
+
+
+async def fetch_to_file_async(url, cache, extension="pdf"):
+    """Versión asíncrona de fetch_to_file"""
+    async with _async_host_slot(url):
+        return await _fetch_to_file_async(url, cache, extension)
+
+
+async def _fetch_to_file_async(url, cache, extension):
+    client = get_async_client()
+    headers = cache.conditional_headers(url)
+    retries = int(os.getenv("HTTP_RETRIES", "3"))
+    backoff = float(os.getenv("HTTP_BACKOFF", "0.5"))
+
+    for attempt in range(retries + 1):
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                result = await asyncio.to_thread(_cached_file, url, cache, extension)
+                if result is not None:
+                    return result
+                # La copia fue desalojada entre la petición y la lectura
+                headers = {}
+                continue
+
+            if response.status_code not in _RETRY_STATUS or attempt == retries:
+                response.raise_for_status()
+                # Los bloques se escriben en el event loop: son escrituras pequeñas a disco
+                spool = _Spool(cache)
+                try:
+                    async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                        spool.write(chunk)
+                except BaseException:
+                    spool.discard()
+                    raise
+                return await asyncio.to_thread(_store_spool, url, cache, spool, response.headers, extension)
+
+        await asyncio.sleep(backoff * (2 ** attempt))
+
+    raise httpx.HTTPError(f"No se pudo descargar {url}")
+
+
+async def fetch_async(url, cache=None, extension="pdf", stream=False):
+    """
+    Versión asíncrona de fetch: descarga condicional contra la caché
+
+    La lectura y escritura de la caché en disco se hacen en un hilo para no
+    bloquear el event loop con archivos de varios MB.
+
+    Returns:
+        dict: content (o path si stream es True), sha256, not_modified y bytes transferidos
+    """
+    if stream:
+        if cache is None:
+            raise ValueError("La descarga a archivo requiere la caché")
+        return await fetch_to_file_async(url, cache, extension)
+
+    async with _async_host_slot(url):
+        return await _fetch_async(url, cache, extension)
+
+
+async def _fetch_async(url, cache, extension):
+    headers = cache.conditional_headers(url) if cache else {}
+    response = await request_async("GET", url, headers=headers)
+
+    if response.status_code == 304 and cache:
+        entry = cache.get_entry(url)
+        content = await asyncio.to_thread(cache.load, url)
+        if content is not None:
+            print(f"Sin cambios (304), usando copia en caché: {url}")
+            metrics.record_download(extension, 0, not_modified=True)
+            return {
+                "content": content,
+                "sha256": entry["sha256"],
+                "not_modified": True,
+                "bytes": 0,
+            }
+
+        # La copia fue desalojada entre la petición y la lectura
+        response = await request_async("GET", url)
+
+    response.raise_for_status()  # Lanza excepción si hay error HTTP
+    content = response.content
+
+    sha256 = None
+    if cache:
+        sha256 = await asyncio.to_thread(
+            cache.store,
+            url,
+            content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            extension=extension,
+        )
+
+    metrics.record_download(extension, len(content), not_modified=False)
+    return {
+        "content": content,
+        "sha256": sha256,
+        "not_modified": False,
+        "bytes": len(content),
+    }
@@ -0,0 +1,158 @@
+"""
+Lectura de la página del diario oficial: fecha publicada y enlaces a los PDFs.
+
+De toda la página sólo interesan el título con la fecha y los enlaces a los
+PDFs, así que en lugar de construir el árbol completo con html.parser se usa
+el extractor más rápido disponible:
+
+- lxml: parser en C y consultas XPath sobre el árbol (requiere el extra `lxml`: `poetry install --extras lxml`)
+- strainer: BeautifulSoup con un SoupStrainer que sólo conserva los elementos buscados
+- html.parser: el árbol completo de BeautifulSoup (el comportamiento anterior)
+
+INDEX_PARSER elige el extractor (default: auto, lxml si está instalado). Si un
+extractor no está instalado o falla se intenta con el siguiente; una página
+sin título o sin enlaces (p. ej. antes de publicarse la edición) es un
+resultado válido y no se vuelve a leer con otro extractor. Los selectores se configuran
+con INDEX_TITLE_SELECTOR e INDEX_PDF_SELECTOR (o por fuente, ver sources.py)
+y admiten la forma simple `etiqueta.clase1.clase2`, suficiente para la página
+del diario.
+"""
+
+import os
+import re
+
+DEFAULT_TITLE_SELECTOR = "div.titulo.verde.mt-2"
+DEFAULT_PDF_SELECTOR = "a.pdf"
+
+# Orden de preferencia de los extractores
+PARSERS = ("lxml", "strainer", "html.parser")
+
+_SELECTOR_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?((?:\.[\w-]+)*)$")
+_CHARSET_RE = re.compile(rb"""charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+def parse_selector(selector):
+    """
+    Convierte un selector simple en etiqueta y clases
+
+    Args:
+        selector: Selector de la forma `etiqueta`, `.clase` o `etiqueta.clase1.clase2`
+
+    Returns:
+        tuple: (etiqueta en minúsculas o None, lista de clases)
+    """
+    match = _SELECTOR_RE.match(selector.strip())
+    if not match or not selector.strip():
+        raise ValueError(f"Selector no soportado (se espera etiqueta.clase): {selector!r}")
+    tag = match.group(1).lower() if match.group(1) else None
+    classes = [name for name in match.group(2).split(".") if name]
+    return tag, classes
+
+
+def get_selectors():
+    """Selectores del título y de los enlaces (INDEX_TITLE_SELECTOR, INDEX_PDF_SELECTOR)"""
+    return (
+        parse_selector(os.getenv("INDEX_TITLE_SELECTOR", DEFAULT_TITLE_SELECTOR)),
+        parse_selector(os.getenv("INDEX_PDF_SELECTOR", DEFAULT_PDF_SELECTOR)),
+    )
+
+
+def _unique(links):
+    # Sin repetir y en orden de aparición
+    unique = []
+    for link in links:
+        if link and link not in unique:
+            unique.append(link)
+    return unique
+
+
+def _xpath(selector):
+    tag, classes = selector
+    conditions = "".join(
+        f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]" for name in classes
+    )
+    return f"//{tag or '*'}{conditions}"
+
+
+def _extract_lxml(content, title_selector, pdf_selector):
+    import lxml.html
+
+    parser = None
+    if isinstance(content, bytes):
+        # Sin un charset declarado libxml2 supone latin-1; el sitio usa UTF-8
+        declared = _CHARSET_RE.search(content[:4096])
+        encoding = declared.group(1).decode("ascii") if declared else "utf-8"
+        parser = lxml.html.HTMLParser(encoding=encoding)
+    tree = lxml.html.fromstring(content, parser=parser)
+    titles = tree.xpath(_xpath(title_selector))
+    links = [element.get("href") for element in tree.xpath(_xpath(pdf_selector))]
+    return (titles[0].text_content() if titles else None), _unique(links)
+
+
+def _css(selector):
+    tag, classes = selector
+    return (tag or "") + "".join(f".{name}" for name in classes)
+
+
+def _extract_soup(content, title_selector, pdf_selector, strain):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    parse_only = None
+    if strain:
+        # Sólo se construyen los elementos con alguna de las clases buscadas
+        # (y sus descendientes); el resto de la página se descarta al leerla
+        names = [tag for tag, _ in (title_selector, pdf_selector)]
+        wanted = set(title_selector[1]) | set(pdf_selector[1])
+        parse_only = SoupStrainer(
+            name=None if None in names else sorted(set(names)),
+            attrs={"class": lambda value: value is not None and bool(wanted & set(value.split()))} if wanted else {},
+        )
+
+    soup = BeautifulSoup(content, "html.parser", parse_only=parse_only)
+    title = soup.select_one(_css(title_selector))
+    links = [element.get("href") for element in soup.select(_css(pdf_selector))]
+    return (title.text if title is not None else None), _unique(links)
+
+
+def _extract(name, content, title_selector, pdf_selector):
+    if name == "lxml":
+        return _extract_lxml(content, title_selector, pdf_selector)
+    return _extract_soup(content, title_selector, pdf_selector, strain=name == "strainer")
+
+
+def _parser_order(parser):
+    if parser == "auto":
+        return list(PARSERS)
+    if parser not in PARSERS:
+        raise ValueError(f"INDEX_PARSER desconocido: {parser} (opciones: auto, {', '.join(PARSERS)})")
+    return list(PARSERS[PARSERS.index(parser):])
+
+
+def extract_index(content, parser=None, selectors=None):
+    """
+    Extrae la fecha publicada y los enlaces a los PDFs de la página del diario
+
+    Args:
+        content: HTML de la página (bytes o str)
+        parser: Extractor a usar (opcional, default: INDEX_PARSER o auto)
+        selectors: Selectores (título, enlaces) ya convertidos con parse_selector
+                   (opcional, default: INDEX_TITLE_SELECTOR e INDEX_PDF_SELECTOR)
+
+    Returns:
+        dict: title (texto del título o None si no está), pdf_links y parser usado
+    """
+    if parser is None:
+        parser = os.getenv("INDEX_PARSER", "auto").lower()
+    title_selector, pdf_selector = selectors or get_selectors()
+
+    for name in _parser_order(parser):
+        try:
+            title, links = _extract(name, content, title_selector, pdf_selector)
+        except ImportError:
+            continue
+        except Exception as e:
+            print(f"Error leyendo la página del diario con {name}: {e}")
+            continue
+        return {"title": title, "pdf_links": links, "parser": name}
+
+    raise RuntimeError("No se pudo leer la página del diario con ningún extractor")
@@ -0,0 +1,179 @@
+"""
+Cola de trabajos en segundo plano para los endpoints de reporte.
+
+Cada POST encola un trabajo y regresa de inmediato su ID. Las solicitudes
+repetidas para el mismo diario mientras un trabajo sigue en curso se unen a
+ese trabajo (single-flight), y el número de trabajos ejecutándose a la vez
+está acotado por JOB_CONCURRENCY. Cada trabajo registra el tiempo de sus
+etapas (descarga, búsqueda, envío) para consultarlo en GET /jobs/{id}.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+# Trabajo en ejecución en el contexto actual (se propaga a tareas e hilos)
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class Job:
+    """Estado de un trabajo en segundo plano"""
+
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {}
+        self.result = None
+        self.error = None
+        self.task = None
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self):
+        """Representación JSON del trabajo para la API"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stages": dict(self.stages),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def stage(name):
+    """
+    Mide la duración de una etapa del pipeline y la registra en el trabajo actual
+
+    La duración también se agrega a las métricas (ver metrics.py), aun fuera
+    de un trabajo (p. ej. en el scheduler).
+    """
+    job = _current_job.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe_stage(name, elapsed)
+        if job is not None:
+            job.stages[name] = round(job.stages.get(name, 0) + elapsed, 4)
+
+
+class JobManager:
+    """Ejecuta trabajos con concurrencia acotada y une solicitudes duplicadas"""
+
+    def __init__(self, concurrency=None, history=None):
+        """
+        Args:
+            concurrency: Trabajos simultáneos (opcional, default: JOB_CONCURRENCY)
+            history: Trabajos terminados que se conservan (opcional, default: JOB_HISTORY)
+        """
+        if concurrency is None:
+            concurrency = int(os.getenv("JOB_CONCURRENCY", "2"))
+        if history is None:
+            history = int(os.getenv("JOB_HISTORY", "100"))
+
+        self.concurrency = max(1, concurrency)
+        self.history = history
+        self._semaphore = None
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._shared = {}
+
+    def _get_semaphore(self):
+        # El semáforo se crea dentro del event loop que lo usará
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def submit(self, kind, key, factory):
+        """
+        Encola un trabajo o devuelve el que ya está en curso para la misma clave
+
+        Args:
+            kind: Tipo de trabajo (p. ej. "run-report")
+            key: Clave del diario procesado (p. ej. la fecha)
+            factory: Función sin argumentos que devuelve la corrutina a ejecutar
+
+        Returns:
+            tuple: (Job, True si se unió a un trabajo existente)
+        """
+        existing = self._in_flight.get((kind, key))
+        if existing is not None and not existing.done:
+            return existing, True
+
+        job = Job(kind, key)
+        self._jobs[job.id] = job
+        self._in_flight[(kind, key)] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, factory))
+        self._prune()
+        return job, False
+
+    async def _run(self, job, factory):
+        async with self._get_semaphore():
+            job.status = "running"
+            job.started_at = time.time()
+            token = _current_job.set(job)
+            try:
+                with metrics.track_run(job.kind) as run:
+                    try:
+                        job.result = await factory()
+                        failed = isinstance(job.result, dict) and job.result.get("status") == "error"
+                        job.status = "failed" if failed else "succeeded"
+                    except Exception as e:
+                        print(f"Error en el trabajo {job.kind} ({job.id}): {e}")
+                        job.error = str(e)
+                        job.status = "failed"
+                    run["status"] = job.status
+            finally:
+                _current_job.reset(token)
+                job.finished_at = time.time()
+                if self._in_flight.get((job.kind, job.key)) is job:
+                    del self._in_flight[(job.kind, job.key)]
+        return job.result
+
+    async def shared(self, key, factory):
+        """
+        Ejecuta una sola vez una corrutina compartida entre trabajos simultáneos
+
+        Si otro trabajo ya está calculando el mismo resultado (p. ej. el
+        scraping del mismo diario) se espera ese cálculo en lugar de repetirlo.
+        """
+        task = self._shared.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._shared[key] = task
+            task.add_done_callback(lambda _: self._shared.pop(key, None))
+        return await asyncio.shield(task)
+
+    def is_shared(self, key):
+        """Indica si ya hay una corrutina compartida en curso para la clave"""
+        return key in self._shared
+
+    def get(self, job_id):
+        """Devuelve un trabajo por su ID, o None si no existe"""
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Olvida los trabajos terminados más antiguos por encima de JOB_HISTORY"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
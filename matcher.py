@@ -0,0 +1,216 @@
+"""
+Búsqueda simultánea de múltiples términos con un autómata Aho-Corasick.
+
+Todos los términos vigilados (de todos los suscriptores) se compilan en un
+solo autómata, de modo que cada página extraída se recorre una sola vez sin
+importar cuántos nombres, RFC o CURP se estén buscando. Tanto los términos
+como el texto se normalizan: sin acentos, sin distinguir mayúsculas y con los
+espacios y saltos de línea colapsados a un solo espacio. Por lo mismo, dos
+términos que sólo difieren en eso ("Ley" y "ley ") son el mismo término: se
+conserva la primera forma en que aparece.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from collections import deque
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Normaliza un texto para compararlo sin acentos, mayúsculas ni espacios repetidos
+
+    Args:
+        text: Texto a normalizar
+
+    Returns:
+        str: Texto normalizado (p. ej. "Koyoc  NOVELÓ\\n" -> "koyoc novelo")
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE_RE.sub(" ", without_accents.casefold()).strip()
+
+
+class TermMatcher:
+    """Autómata Aho-Corasick sobre los términos normalizados"""
+
+    def __init__(self, terms):
+        """
+        Args:
+            terms: Lista de términos a buscar (se ignoran los vacíos y los repetidos una vez normalizados)
+        """
+        self.terms = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        seen = set()
+        for term in terms:
+            normalized = normalize_text(term)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            self.terms.append(term)
+            self._add(normalized, term)
+
+        self._build_failure_links()
+
+    def _add(self, normalized, term):
+        """Agrega un término al trie"""
+        node = 0
+        for char in normalized:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(term)
+
+    def _build_failure_links(self):
+        """Calcula los enlaces de falla recorriendo el trie por niveles"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_terms(self, text):
+        """
+        Recorre el texto una sola vez y devuelve los términos que aparecen
+
+        Args:
+            text: Texto de una página (sin normalizar)
+
+        Returns:
+            set: Términos originales encontrados en el texto
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        node = 0
+
+        for char in normalize_text(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def scan_pages(self, pages):
+        """
+        Busca todos los términos en una secuencia de páginas
+
+        Args:
+            pages: Iterable de tuplas (número de página, texto)
+
+        Returns:
+            dict: Mapa término -> lista de páginas donde aparece
+        """
+        matches = {term: [] for term in self.terms}
+        for page_num, text in pages:
+            for term in self.find_terms(text):
+                matches[term].append(page_num)
+        return matches
+
+
+def split_terms(value):
+    """Separa una lista de términos delimitada por comas"""
+    return [term.strip() for term in value.split(",") if term.strip()]
+
+
+def _add_terms(chat_terms, terms, canonical):
+    """
+    Agrega términos a la lista de un chat sin repetirlos una vez normalizados
+
+    Cada término se guarda con la primera forma en que apareció en cualquier
+    chat (canonical: normalizado -> forma), la misma que usa el autómata, para
+    que los resultados se encuentren con la llave de cada chat.
+    """
+    for term in terms:
+        normalized = normalize_text(term)
+        if not normalized:
+            continue
+        term = canonical.setdefault(normalized, term.strip())
+        if term not in chat_terms:
+            chat_terms.append(term)
+
+
+def load_subscriptions(stored=None):
+    """
+    Obtiene los términos vigilados por cada chat
+
+    SUBSCRIPTIONS acepta un JSON {"chat_id": ["término", ...]}. El chat
+    principal (TELEGRAM_CHAT_ID) siempre vigila los términos de SEARCH_TEXT,
+    que puede contener varios términos separados por comas. A estos se suman
+    los términos agregados desde Telegram con /suscribir.
+
+    Args:
+        stored: Suscripciones hechas desde Telegram (opcional, default: las guardadas en DATA_DIR)
+
+    Returns:
+        dict: Mapa chat_id -> lista de términos
+    """
+    subscriptions = {}
+    canonical = {}
+
+    default_chat = os.getenv("TELEGRAM_CHAT_ID")
+    default_terms = []
+    # Los términos de SEARCH_TEXT fijan su forma aunque no haya chat principal (ver get_watched_terms)
+    _add_terms(default_terms, split_terms(os.getenv("SEARCH_TEXT", "koyoc novelo")), canonical)
+    if default_chat:
+        subscriptions[default_chat] = default_terms
+
+    raw = os.getenv("SUBSCRIPTIONS", "").strip()
+    if raw:
+        try:
+            configured = json.loads(raw)
+        except ValueError as e:
+            print(f"SUBSCRIPTIONS no es un JSON válido: {e}")
+            configured = {}
+        for chat_id, terms in configured.items():
+            if isinstance(terms, str):
+                terms = split_terms(terms)
+            _add_terms(subscriptions.setdefault(str(chat_id), []), terms, canonical)
+
+    if stored is None:
+        # Importación diferida: subscriptions también importa este módulo
+        from subscriptions import get_subscription_store
+        stored = get_subscription_store().all()
+    for chat_id, terms in stored.items():
+        _add_terms(subscriptions.setdefault(str(chat_id), []), terms, canonical)
+
+    return subscriptions
+
+
+def get_watched_terms(subscriptions=None):
+    """
+    Lista todos los términos vigilados sin repetir (una vez normalizados), en orden de aparición
+
+    Args:
+        subscriptions: Mapa chat_id -> términos (opcional, default: load_subscriptions())
+
+    Returns:
+        list: Términos a compilar en el autómata
+    """
+    if subscriptions is None:
+        subscriptions = load_subscriptions()
+
+    terms = []
+    canonical = {}
+    _add_terms(terms, split_terms(os.getenv("SEARCH_TEXT", "koyoc novelo")), canonical)
+    for chat_terms in subscriptions.values():
+        _add_terms(terms, chat_terms, canonical)
+    return terms
@@ -0,0 +1,327 @@
+"""
+Métricas del pipeline en formato de texto de Prometheus.
+
+Cada etapa medida con jobs.stage (descarga de la página, análisis del HTML,
+descarga y búsqueda de PDFs, actualización del índice, envío a Telegram) se
+registra en un histograma; además se cuentan los bytes descargados, las
+respuestas servidas desde la caché y el tiempo de extracción y búsqueda de
+cada página. GET /metrics expone todo para Prometheus y GET /status incluye
+un resumen con la duración de la última ejecución de cada tipo.
+
+Se implementa sin dependencias: sólo contadores e histogramas con etiquetas,
+que es lo que el bot necesita.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites de los histogramas en segundos
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+PAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Ejecución (reporte, trabajo) en curso en el contexto actual
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Contador acumulado, opcionalmente con etiquetas"""
+
+    type = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def inc(self, value=1, **labels):
+        """Suma value al contador de las etiquetas indicadas"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        """Valor actual del contador de las etiquetas indicadas"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Histograma con límites fijos, opcionalmente con etiquetas"""
+
+    type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        """Registra una observación"""
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(round(total, 6))}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Agrega métricas calculadas al momento de exponerlas
+
+        Args:
+            collector: Función sin argumentos que devuelve [(nombre, tipo, ayuda, [(etiquetas, valor)])]
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Error obteniendo métricas: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "gazette_stage_seconds", "Duración de cada etapa del pipeline", ("stage",)
+)
+page_extract_seconds = registry.histogram(
+    "gazette_page_extract_seconds", "Tiempo de extracción de texto por página", buckets=PAGE_BUCKETS
+)
+page_match_seconds = registry.histogram(
+    "gazette_page_match_seconds", "Tiempo de búsqueda de los términos por página", buckets=PAGE_BUCKETS
+)
+pages_total = registry.counter(
+    "gazette_pages_total", "Páginas procesadas según el origen del texto", ("source",)
+)
+downloaded_bytes = registry.counter(
+    "gazette_downloaded_bytes_total", "Bytes descargados del sitio del diario", ("kind",)
+)
+cache_lookups = registry.counter(
+    "gazette_cache_lookups_total", "Consultas a la caché (http: respuestas 304, text: texto ya extraído, ocr: páginas ya reconocidas)", ("cache", "result")
+)
+runs_total = registry.counter(
+    "gazette_runs_total", "Ejecuciones terminadas por tipo y estado", ("kind", "status")
+)
+run_seconds = registry.histogram(
+    "gazette_run_seconds", "Duración total de cada ejecución", ("kind",)
+)
+telegram_request_seconds = registry.histogram(
+    "telegram_request_seconds", "Duración de cada llamada a la API de Telegram", ("method",)
+)
+
+_last_runs = {}
+_last_runs_lock = threading.Lock()
+
+
+def _update_run(callback):
+    run = _current_run.get()
+    if run is not None:
+        with run["lock"]:
+            callback(run)
+
+
+def observe_stage(name, seconds):
+    """Registra la duración de una etapa en el histograma y en la ejecución actual"""
+    stage_seconds.observe(seconds, stage=name)
+
+    def add(run):
+        run["stages"][name] = round(run["stages"].get(name, 0) + seconds, 4)
+    _update_run(add)
+
+
+def record_download(kind, size, not_modified):
+    """Registra una descarga: bytes transferidos y si se sirvió desde la caché (304)"""
+    downloaded_bytes.inc(size, kind=kind)
+    cache_lookups.inc(cache="http", result="hit" if not_modified else "miss")
+
+    def add(run):
+        run["bytes_downloaded"] += size
+        run["http_cache_hits" if not_modified else "http_cache_misses"] += 1
+    _update_run(add)
+
+
+def record_pages(page_timings, match_seconds, from_cache):
+    """
+    Registra los tiempos por página de la búsqueda en un PDF
+
+    Args:
+        page_timings: Mapa página -> segundos de extracción
+        match_seconds: Mapa página -> segundos de búsqueda de los términos
+        from_cache: True si el texto se leyó de la caché en lugar de extraerse
+    """
+    if not from_cache:
+        for elapsed in page_timings.values():
+            page_extract_seconds.observe(elapsed)
+    for elapsed in match_seconds.values():
+        page_match_seconds.observe(elapsed)
+    pages_total.inc(len(page_timings), source="cache" if from_cache else "extracted")
+    cache_lookups.inc(cache="text", result="hit" if from_cache else "miss")
+
+    def add(run):
+        run["pages"] += len(page_timings)
+        run["text_cache_hits" if from_cache else "text_cache_misses"] += 1
+    _update_run(add)
+
+
+def record_ocr(from_cache):
+    """Registra una página escaneada: si su texto ya estaba reconocido o se pasó por OCR"""
+    cache_lookups.inc(cache="ocr", result="hit" if from_cache else "miss")
+
+    def add(run):
+        run["ocr_cache_hits" if from_cache else "ocr_pages"] += 1
+    _update_run(add)
+
+
+@contextmanager
+def track_run(kind, source=None):
+    """
+    Mide una ejecución completa (reporte programado, trabajo, backfill)
+
+    Las etapas, bytes y páginas registrados dentro del bloque (incluso en
+    tareas e hilos que copian el contexto) se acumulan en la ejecución, que
+    queda disponible en last_runs al terminar. Con source la última ejecución
+    se guarda por tipo y fuente (p. ej. "report:dof"), así los reportes de
+    cada diario no se reemplazan entre sí.
+    """
+    run = {
+        "kind": kind,
+        "source": source,
+        "status": "running",
+        "started_at": time.time(),
+        "finished_at": None,
+        "duration": None,
+        "stages": {},
+        "bytes_downloaded": 0,
+        "pages": 0,
+        "http_cache_hits": 0,
+        "http_cache_misses": 0,
+        "text_cache_hits": 0,
+        "text_cache_misses": 0,
+        "ocr_pages": 0,
+        "ocr_cache_hits": 0,
+        "lock": threading.Lock(),
+    }
+    token = _current_run.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+        # Quien mide la ejecución puede marcarla como fallida sin lanzar una excepción
+        if run["status"] == "running":
+            run["status"] = "succeeded"
+    except BaseException:
+        run["status"] = "failed"
+        raise
+    finally:
+        _current_run.reset(token)
+        run["duration"] = round(time.perf_counter() - started, 4)
+        run["finished_at"] = time.time()
+        run_seconds.observe(run["duration"], kind=kind)
+        runs_total.inc(kind=kind, status=run["status"])
+        with _last_runs_lock:
+            _last_runs[f"{kind}:{source}" if source else kind] = run
+
+
+def _hit_rate(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def summary():
+    """Resumen para GET /status: última ejecución de cada tipo (y fuente), bytes descargados y aciertos de caché"""
+    with _last_runs_lock:
+        runs = dict(_last_runs)
+
+    last_runs = {}
+    for key, run in runs.items():
+        with run["lock"]:
+            last_runs[key] = {name: value for name, value in run.items() if name != "lock"}
+            last_runs[key]["stages"] = dict(run["stages"])
+
+    cache = {}
+    for name in ("http", "text", "ocr"):
+        hits = cache_lookups.value(cache=name, result="hit")
+        misses = cache_lookups.value(cache=name, result="miss")
+        cache[name] = {"hits": hits, "misses": misses, "hit_rate": _hit_rate(hits, misses)}
+
+    return {
+        "last_runs": last_runs,
+        "bytes_downloaded": {kind: downloaded_bytes.value(kind=kind) for kind in ("html", "pdf")},
+        "cache": cache,
+    }
@@ -0,0 +1,168 @@
+"""
+Reconocimiento de texto (OCR) para las páginas escaneadas del diario.
+
+Algunas páginas del diario oficial son imágenes escaneadas y pypdf no obtiene
+texto de ellas, así que un nombre publicado en esas páginas nunca se
+encontraba. Con OCR_ENABLED=true, las páginas con menos de OCR_MIN_CHARS
+caracteres se pasan por Tesseract (pytesseract) usando las imágenes que
+contiene la página.
+
+El texto reconocido se guarda bajo el SHA-256 de las imágenes de la página en
+DATA_DIR/ocr, fuera de la caché LRU de PDFs, de modo que cada página se
+reconoce una sola vez aunque el PDF se desaloje de la caché o la misma página
+vuelva a publicarse en otro suplemento.
+
+pytesseract, Pillow y el programa tesseract (con el idioma de OCR_LANG) son
+opcionales; si faltan, el OCR queda desactivado con un aviso.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from gazette_cache import get_data_dir
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+# Resultado de la verificación del motor de OCR (None: sin verificar)
+_engine_available = None
+_engine_lock = threading.Lock()
+
+
+def ocr_enabled():
+    """Si el OCR está activado (OCR_ENABLED) y el motor está instalado"""
+    if os.getenv("OCR_ENABLED", "false").lower() != "true":
+        return False
+    return engine_available()
+
+
+def engine_available():
+    """Verifica una sola vez que pytesseract, Pillow y tesseract estén instalados"""
+    global _engine_available
+
+    with _engine_lock:
+        if _engine_available is None:
+            try:
+                import pytesseract
+                import PIL  # noqa: F401
+
+                version = pytesseract.get_tesseract_version()
+                print(f"OCR disponible: tesseract {version}")
+                _engine_available = True
+            except Exception as e:
+                print(f"OCR_ENABLED=true pero el motor de OCR no está disponible, se omite el OCR: {e}")
+                _engine_available = False
+        return _engine_available
+
+
+def get_language():
+    """Idiomas de Tesseract para el OCR (OCR_LANG, default: spa)"""
+    return os.getenv("OCR_LANG", "spa")
+
+
+def needs_ocr(text):
+    """Si una página tiene tan poco texto que probablemente es una imagen escaneada"""
+    min_chars = int(os.getenv("OCR_MIN_CHARS", "20"))
+    return len("".join(text.split())) < min_chars
+
+
+def page_images(page):
+    """
+    Imágenes de una página de pypdf, codificadas (PNG, JPEG, ...)
+
+    Returns:
+        list: Contenido de cada imagen en bytes; vacía si la página no tiene imágenes
+    """
+    try:
+        return [image.data for image in page.images]
+    except Exception as e:
+        print(f"No se pudieron leer las imágenes de la página: {e}")
+        return []
+
+
+def page_hash(images):
+    """SHA-256 de las imágenes de una página: identifica la página en la caché de OCR"""
+    digest = hashlib.sha256()
+    for data in images:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def recognize_images(images, lang):
+    """
+    Reconoce el texto de las imágenes de una página (se ejecuta en un proceso worker)
+
+    Args:
+        images: Contenido de cada imagen en bytes
+        lang: Idiomas de Tesseract (p. ej. "spa" o "spa+eng")
+
+    Returns:
+        tuple: (texto reconocido, segundos de OCR)
+    """
+    import pytesseract
+    from PIL import Image
+
+    started = time.perf_counter()
+    texts = []
+    try:
+        for data in images:
+            with Image.open(BytesIO(data)) as image:
+                texts.append(pytesseract.image_to_string(image, lang=lang))
+    except Exception as e:
+        # Algunas excepciones de pytesseract no se pueden serializar de vuelta
+        # desde el worker y dejarían el pool inutilizable
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return "\n".join(text.strip() for text in texts if text.strip()), time.perf_counter() - started
+
+
+class OcrCache:
+    """Texto reconocido por página, indexado por el hash de sus imágenes"""
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory: Directorio de la caché (opcional, default: DATA_DIR/ocr)
+        """
+        self.directory = directory or os.path.join(get_data_dir(), "ocr")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.txt.gz")
+
+    def get(self, digest):
+        """Texto reconocido de una página, o None si todavía no se ha reconocido"""
+        try:
+            with gzip.open(self._path(digest), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError) as e:
+            print(f"Error leyendo el texto de OCR {digest}: {e}")
+            return None
+
+    def set(self, digest, text):
+        """Guarda el texto reconocido de una página (escritura atómica)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(digest))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def get_ocr_cache():
+    """Devuelve la caché de OCR compartida, creándola si es necesario"""
+    global _ocr_cache
+
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OcrCache()
+        return _ocr_cache
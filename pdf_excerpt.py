@@ -0,0 +1,143 @@
+"""
+Extractos de PDFs con sólo las páginas donde se encontraron los términos.
+
+Un diario puede tener cientos de páginas aunque el término aparezca en una
+sola. En lugar de subir el PDF completo a Telegram (lento y a veces por encima
+del límite de 50 MB) se arma un PDF con la portada del diario, las páginas
+encontradas y, opcionalmente, algunas páginas de contexto alrededor de cada
+una. El extracto se escribe a un archivo temporal que sólo pasa a disco si
+crece demasiado, y se sube directamente desde ahí.
+"""
+
+import os
+import tempfile
+
+from pdf_search import open_reader
+
+
+def select_pages(found_pages, total_pages, context=None, cover=None):
+    """
+    Páginas que forman el extracto, en orden y sin repetir
+
+    Args:
+        found_pages: Páginas encontradas (numeradas desde 1)
+        total_pages: Páginas del PDF original
+        context: Páginas antes y después de cada página encontrada (opcional, default: PDF_CONTEXT_PAGES)
+        cover: Incluir la primera página como portada (opcional, default: PDF_EXCERPT_COVER)
+
+    Returns:
+        list: Números de página (desde 1)
+    """
+    if context is None:
+        context = int(os.getenv("PDF_CONTEXT_PAGES", "0"))
+    if cover is None:
+        cover = os.getenv("PDF_EXCERPT_COVER", "true").lower() == "true"
+
+    pages = set()
+    if cover and total_pages:
+        pages.add(1)
+    for page in found_pages:
+        start = max(1, page - context)
+        end = min(total_pages, page + context)
+        pages.update(range(start, end + 1))
+    return sorted(pages)
+
+
+def excerpt_filename(filename):
+    """Nombre del archivo del extracto a partir del nombre original"""
+    stem = filename[:-4] if filename.lower().endswith(".pdf") else filename
+    return f"{stem}_extracto.pdf"
+
+
+def build_excerpt(pdf_content, pages):
+    """
+    Arma un PDF sólo con las páginas indicadas
+
+    Cada página del extracto lleva un marcador con su número en el original.
+
+    Args:
+        pdf_content: Contenido del PDF original en bytes o la ruta del archivo
+        pages: Números de página a conservar (desde 1)
+
+    Returns:
+        SpooledTemporaryFile: Archivo con el extracto, posicionado al inicio
+    """
+    from pypdf import PdfWriter
+
+    reader, handle = open_reader(pdf_content)
+    try:
+        writer = PdfWriter()
+        for page_num in pages:
+            writer.add_page(reader.pages[page_num - 1])
+            writer.add_outline_item(f"Página {page_num}", len(writer.pages) - 1)
+
+        max_memory = int(float(os.getenv("PDF_EXCERPT_SPOOL_MB", "8")) * 1024 * 1024)
+        output = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        writer.write(output)
+    finally:
+        if handle is not None:
+            handle.close()
+    output.seek(0)
+    return output
+
+
+def pdf_source(pdf_data):
+    """Contenido del PDF en bytes o, si se descargó a archivo (PDF_STREAMING), su ruta en la caché"""
+    if pdf_data.get("pdf_content") is not None:
+        return pdf_data["pdf_content"]
+    return pdf_data["pdf_path"]
+
+
+def _full_document(pdf_data):
+    # Un PDF descargado a archivo se sube desde el disco, sin leerlo a memoria
+    if pdf_data.get("pdf_content") is not None:
+        return pdf_data["pdf_content"]
+    return open(pdf_data["pdf_path"], "rb")
+
+
+def excerpt_pages(pdf_data, found_pages):
+    """
+    Páginas del extracto a enviar, o None si se debe enviar el PDF completo
+
+    Con SEND_ONLY_MATCHING_PAGES=true se envía un extracto, salvo que abarque
+    todas las páginas del original.
+
+    Args:
+        pdf_data: Información del PDF (total_pages)
+        found_pages: Páginas con coincidencias
+
+    Returns:
+        list: Números de página del extracto, o None
+    """
+    if os.getenv("SEND_ONLY_MATCHING_PAGES", "false").lower() != "true" or not found_pages:
+        return None
+
+    pages = select_pages(found_pages, pdf_data["total_pages"])
+    if len(pages) >= pdf_data["total_pages"]:
+        return None
+    return pages
+
+
+def prepare_document(pdf_data, pages):
+    """
+    Arma el archivo a subir a Telegram: el PDF completo o un extracto de sus páginas
+
+    Si el extracto falla al armarse se envía el PDF completo.
+
+    Args:
+        pdf_data: Información del PDF (pdf_content o pdf_path, filename)
+        pages: Páginas del extracto (de excerpt_pages), o None para el PDF completo
+
+    Returns:
+        tuple: (contenido o archivo abierto a subir, nombre del archivo, páginas incluidas o None si es el PDF completo)
+    """
+    if not pages:
+        return _full_document(pdf_data), pdf_data["filename"], None
+
+    try:
+        excerpt = build_excerpt(pdf_source(pdf_data), pages)
+    except Exception as e:
+        print(f"Error armando el extracto de {pdf_data['filename']}, se envía el PDF completo: {e}")
+        return _full_document(pdf_data), pdf_data["filename"], None
+
+    return excerpt, excerpt_filename(pdf_data["filename"]), pages
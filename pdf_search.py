@@ -0,0 +1,360 @@
+"""
+Motor de búsqueda de texto en PDFs con extracción de páginas en paralelo.
+
+La extracción de texto con pypdf es la parte más costosa de cada reporte,
+así que las páginas se reparten en bloques entre un pool de procesos. Los
+resultados llegan página por página (en orden) sin acumular el texto completo
+del documento, y la búsqueda puede terminar en cuanto se localizan todos los
+términos cuando el llamador sólo necesita saber si aparecen o no.
+
+Las páginas escaneadas (casi sin texto) pasan por OCR en el mismo pool cuando
+OCR_ENABLED=true (ver ocr.py).
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from io import BytesIO
+
+import metrics
+import ocr
+from matcher import TermMatcher
+
+# Pools de procesos compartidos por número de workers (se crean bajo demanda)
+_pools = {}
+# Varios PDFs de una edición pueden procesarse a la vez desde distintos hilos
+_pool_lock = threading.Lock()
+
+
+def open_reader(pdf):
+    """
+    Abre un PDF dado como bytes o como ruta de un archivo
+
+    Con una ruta se pasa a pypdf el archivo abierto, que lee los objetos a
+    medida que los necesita; PdfReader(ruta) cargaría el archivo completo.
+
+    Args:
+        pdf: Contenido del PDF en bytes o ruta del archivo
+
+    Returns:
+        tuple: (PdfReader, archivo abierto que hay que cerrar o None)
+    """
+    # pypdf se importa aquí para no alargar el arranque del servidor
+    from pypdf import PdfReader
+
+    if isinstance(pdf, (bytes, bytearray)):
+        return PdfReader(BytesIO(pdf)), None
+
+    handle = open(pdf, "rb")
+    try:
+        return PdfReader(handle), handle
+    except Exception:
+        handle.close()
+        raise
+
+
+def _get_workers():
+    """Número de procesos para la extracción (PDF_WORKERS, default: núm. de CPUs)"""
+    workers = int(os.getenv("PDF_WORKERS", "0"))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _get_pool(workers):
+    """
+    Devuelve el pool de procesos compartido con ese número de workers, creándolo si es necesario
+
+    Cada número de workers tiene su propio pool: pedir otro tamaño no cierra
+    el pool que otro hilo está usando (sus tareas se cancelarían).
+    """
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
+
+
+def shutdown_pool():
+    """Cierra los pools de procesos compartidos"""
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+
+def _extract_page_range(pdf_path, start, end):
+    """
+    Extrae el texto de las páginas [start, end) dentro de un proceso worker
+
+    Cada tarea abre su propio lector y cierra el archivo al terminar: el
+    worker no mantiene abierto un PDF temporal que ya se borró (su espacio en
+    disco no se liberaría). Los bloques de PDF_PAGES_PER_TASK páginas
+    reparten el costo de leer la tabla de objetos del PDF.
+
+    Returns:
+        list: Tuplas (número de página, texto, segundos de extracción)
+    """
+    reader, handle = open_reader(pdf_path)
+    try:
+        pages = []
+        for index in range(start, end):
+            started = time.perf_counter()
+            try:
+                text = reader.pages[index].extract_text() or ""
+            except Exception as e:
+                print(f"Error extrayendo texto de la página {index + 1}: {e}")
+                text = ""
+            pages.append((index + 1, text, time.perf_counter() - started))
+        return pages
+    finally:
+        handle.close()
+
+
+def _iter_sequential(reader):
+    """Extrae las páginas una por una en el proceso actual"""
+    for page_num, page in enumerate(reader.pages, 1):
+        started = time.perf_counter()
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            print(f"Error extrayendo texto de la página {page_num}: {e}")
+            text = ""
+        yield page_num, text, time.perf_counter() - started
+
+
+def _iter_parallel(pdf_path, total_pages, workers):
+    """
+    Reparte bloques de páginas entre el pool y los entrega en orden
+
+    Sólo se mantienen en vuelo unos cuantos bloques por worker, de modo que
+    si el consumidor deja de iterar (corto circuito) no queda trabajo
+    pendiente para el resto del documento.
+    """
+    chunk_size = max(1, int(os.getenv("PDF_PAGES_PER_TASK", "8")))
+    max_in_flight = workers * 2
+    pool = _get_pool(workers)
+
+    ranges = [
+        (start, min(start + chunk_size, total_pages))
+        for start in range(0, total_pages, chunk_size)
+    ]
+    next_range = 0
+    in_flight = {}
+    ready = {}
+    next_start = 0
+
+    try:
+        while next_range < len(ranges) or in_flight:
+            while next_range < len(ranges) and len(in_flight) < max_in_flight:
+                start, end = ranges[next_range]
+                future = pool.submit(_extract_page_range, pdf_path, start, end)
+                in_flight[future] = start
+                next_range += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                ready[in_flight.pop(future)] = future.result()
+
+            # Entregar los bloques completos respetando el orden de páginas
+            while next_start in ready:
+                pages = ready.pop(next_start)
+                for page in pages:
+                    yield page
+                next_start += len(pages)
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _iter_extracted(pdf_content, reader, workers):
+    """Texto de cada página con pypdf, en el proceso actual o repartido en el pool"""
+    total_pages = len(reader.pages)
+    min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+    # En documentos pequeños el costo del pool supera la ganancia
+    if workers <= 1 or total_pages < min_pages:
+        yield from _iter_sequential(reader)
+        return
+
+    # Los workers abren el PDF desde disco en vez de recibir los bytes
+    if not isinstance(pdf_content, (bytes, bytearray)):
+        yield from _iter_parallel(pdf_content, total_pages, workers)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spool:
+        spool.write(pdf_content)
+        spool.flush()
+        yield from _iter_parallel(spool.name, total_pages, workers)
+
+
+def _iter_with_ocr(page_texts, reader, workers):
+    """
+    Completa con OCR las páginas que casi no tienen texto
+
+    Las imágenes de esas páginas se envían al pool (o se reconocen aquí si
+    workers <= 1) mientras la extracción del resto continúa; las páginas se
+    siguen entregando en orden. El texto reconocido se guarda por el hash de
+    las imágenes para no volver a reconocer la misma página.
+    """
+    cache = ocr.get_ocr_cache()
+    lang = ocr.get_language()
+    pool = _get_pool(workers) if workers > 1 else None
+    # Páginas en espera de entregarse: [número, texto, segundos, futuro del OCR, hash]
+    pending = deque()
+
+    def finish(entry):
+        page_num, text, elapsed, future, digest = entry
+        if future is None:
+            return page_num, text, elapsed
+        try:
+            recognized, ocr_seconds = future.result()
+        except Exception as e:
+            # Sin guardar en la caché, para reintentar la página en la próxima ejecución
+            print(f"Error en el OCR de la página {page_num}: {e}")
+            return page_num, text, elapsed
+        cache.set(digest, recognized)
+        return page_num, f"{text}\n{recognized}".strip(), elapsed + ocr_seconds
+
+    try:
+        for page_num, text, elapsed in page_texts:
+            entry = [page_num, text, elapsed, None, None]
+            images = ocr.page_images(reader.pages[page_num - 1]) if ocr.needs_ocr(text) else []
+            if images:
+                digest = ocr.page_hash(images)
+                recognized = cache.get(digest)
+                metrics.record_ocr(from_cache=recognized is not None)
+                if recognized is not None:
+                    entry[1] = f"{text}\n{recognized}".strip()
+                elif pool is not None:
+                    entry[3:] = [pool.submit(ocr.recognize_images, images, lang), digest]
+                else:
+                    future = Future()
+                    try:
+                        future.set_result(ocr.recognize_images(images, lang))
+                    except Exception as e:
+                        future.set_exception(e)
+                    entry[3:] = [future, digest]
+            pending.append(entry)
+
+            while pending and (pending[0][3] is None or pending[0][3].done()):
+                yield finish(pending.popleft())
+
+        while pending:
+            yield finish(pending.popleft())
+    finally:
+        for entry in pending:
+            if entry[3] is not None:
+                entry[3].cancel()
+
+
+def iter_page_texts(pdf_content, workers=None, reader=None):
+    """
+    Itera sobre el texto de cada página de un PDF
+
+    Args:
+        pdf_content: El contenido del PDF en bytes o la ruta del archivo
+        workers: Número de procesos a usar (opcional, default: PDF_WORKERS)
+        reader: PdfReader ya abierto sobre el mismo contenido (opcional)
+
+    Yields:
+        tuple: (número de página, texto extraído, segundos de extracción y OCR)
+    """
+    handle = None
+    if reader is None:
+        reader, handle = open_reader(pdf_content)
+
+    try:
+        if workers is None:
+            workers = _get_workers()
+
+        page_texts = _iter_extracted(pdf_content, reader, workers)
+        if ocr.ocr_enabled():
+            page_texts = _iter_with_ocr(page_texts, reader, workers)
+        yield from page_texts
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def search_page_texts(page_texts, search_terms, total_pages, stop_when_found=False, page_sink=None):
+    """
+    Busca los términos en una secuencia de páginas ya extraídas o en caché
+
+    Args:
+        page_texts: Iterable de tuplas (número de página, texto, segundos de extracción)
+        search_terms: Lista de textos a buscar o un TermMatcher ya compilado
+        total_pages: Número total de páginas del documento
+        stop_when_found: Detener la iteración en cuanto se localicen todos los términos
+        page_sink: Función opcional page_sink(número de página, texto) llamada por cada página
+
+    Returns:
+        dict: Páginas totales, páginas por término, páginas encontradas y tiempos de extracción y búsqueda por página
+    """
+    if isinstance(search_terms, TermMatcher):
+        matcher = search_terms
+    else:
+        matcher = TermMatcher(search_terms)
+
+    matches = {term: [] for term in matcher.terms}
+    page_timings = {}
+    match_timings = {}
+    started = time.perf_counter()
+
+    for page_num, text, elapsed in page_texts:
+        page_timings[page_num] = elapsed
+        if page_sink is not None:
+            page_sink(page_num, text)
+
+        match_started = time.perf_counter()
+        found_terms = matcher.find_terms(text)
+        match_timings[page_num] = time.perf_counter() - match_started
+        for term in found_terms:
+            matches[term].append(page_num)
+            print(f"'{term}' encontrado en la página {page_num}")
+
+        if stop_when_found and all(matches.values()):
+            break
+
+    found_pages = sorted({page for pages in matches.values() for page in pages})
+
+    return {
+        "total_pages": total_pages,
+        "pages_scanned": len(page_timings),
+        "matches": matches,
+        "found_pages": found_pages,
+        "found": len(found_pages) > 0,
+        "page_timings": page_timings,
+        "match_timings": match_timings,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def search_pdf(pdf_content, search_terms, stop_when_found=False, workers=None, page_sink=None):
+    """
+    Busca uno o varios términos en el texto de un PDF
+
+    Args:
+        pdf_content: El contenido del PDF en bytes o la ruta del archivo
+        search_terms: Lista de textos a buscar o un TermMatcher ya compilado
+        stop_when_found: Detener la extracción en cuanto se localicen todos los términos
+        workers: Número de procesos a usar (opcional)
+        page_sink: Función opcional page_sink(número de página, texto) llamada por cada página
+
+    Returns:
+        dict: Páginas totales, páginas por término, páginas encontradas y tiempos por página
+    """
+    reader, handle = open_reader(pdf_content)
+    page_texts = iter_page_texts(pdf_content, workers, reader)
+    try:
+        return search_page_texts(
+            page_texts, search_terms, len(reader.pages), stop_when_found, page_sink
+        )
+    finally:
+        page_texts.close()
+        if handle is not None:
+            handle.close()
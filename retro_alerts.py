@@ -0,0 +1,174 @@
+"""
+Alertas retroactivas cuando se agrega un término vigilado.
+
+Al agregar un término a SEARCH_TEXT o SUBSCRIPTIONS sólo se revisarían los
+diarios futuros. Este módulo recuerda qué términos conoce ya cada chat y, al
+detectar uno nuevo, lo busca en el índice de texto completo de los diarios ya
+procesados (sin volver a descargar ni leer PDFs). Cada chat recibe un solo
+resumen con todos los resultados anteriores de sus términos nuevos.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from gazette_cache import get_data_dir
+from matcher import normalize_text
+
+
+class TermTracker:
+    """Términos de cada chat que ya fueron revisados contra el historial"""
+
+    def __init__(self, state_path=None):
+        """
+        Args:
+            state_path: Archivo con los términos conocidos por chat (opcional)
+        """
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "known_terms.json")
+
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def new_terms(self, subscriptions):
+        """
+        Términos de cada chat que todavía no se han revisado en el historial
+
+        La primera vez (sin archivo de estado) todos los términos actuales se
+        toman como conocidos, para no enviar un resumen al desplegar.
+
+        Args:
+            subscriptions: Mapa chat_id -> lista de términos
+
+        Returns:
+            dict: Mapa chat_id -> términos nuevos
+        """
+        with self._lock:
+            if self._state is None:
+                self._state = {
+                    str(chat_id): sorted({normalize_text(term) for term in terms})
+                    for chat_id, terms in subscriptions.items()
+                }
+                self._save_state()
+                return {}
+
+            pending = {}
+            for chat_id, terms in subscriptions.items():
+                known = set(self._state.get(str(chat_id), []))
+                fresh = []
+                for term in terms:
+                    normalized = normalize_text(term)
+                    if normalized and normalized not in known and term not in fresh:
+                        fresh.append(term)
+                if fresh:
+                    pending[chat_id] = fresh
+            return pending
+
+    def mark_known(self, chat_id, terms):
+        """Registra términos de un chat como ya revisados"""
+        with self._lock:
+            if self._state is None:
+                self._state = {}
+            known = set(self._state.get(str(chat_id), []))
+            known.update(normalize_text(term) for term in terms)
+            self._state[str(chat_id)] = sorted(known)
+            self._save_state()
+
+
+def find_past_hits(search_index, term, limit):
+    """
+    Busca un término como frase exacta en el índice
+
+    Returns:
+        list: Resultados de SearchIndex.search ordenados por fecha del diario (más reciente primero)
+    """
+    hits = search_index.search(f'"{term}"', limit=limit)
+    return sorted(hits, key=lambda hit: (hit["gazette_date"] or "", hit["page"]), reverse=True)
+
+
+def format_digest(term_hits):
+    """
+    Construye el mensaje de resumen de resultados anteriores
+
+    Args:
+        term_hits: Mapa término -> resultados de find_past_hits
+
+    Returns:
+        str: Mensaje para Telegram
+    """
+    lines = ["📚 Resultados en diarios anteriores para los términos agregados"]
+    for term, hits in term_hits.items():
+        if not hits:
+            lines.append(f"'{term}' NO encontrado en diarios anteriores")
+            continue
+
+        by_gazette = {}
+        for hit in hits:
+            key = (hit["gazette_date"] or "sin fecha", hit["filename"])
+            by_gazette.setdefault(key, []).append(hit["page"])
+
+        lines.append(f"'{term}' encontrado en {len(by_gazette)} diario(s):")
+        for (gazette_date, filename), pages in by_gazette.items():
+            lines.append(f"  - {gazette_date} {filename}: páginas {sorted(pages)}")
+    return "\n".join(lines)
+
+
+def build_digests(subscriptions, search_index, tracker, limit=None):
+    """
+    Prepara un resumen por chat con los resultados anteriores de sus términos nuevos
+
+    Args:
+        subscriptions: Mapa chat_id -> lista de términos
+        search_index: SearchIndex con los diarios procesados
+        tracker: TermTracker con los términos ya revisados
+        limit: Resultados máximos por término (opcional, default: RETRO_ALERT_MAX_HITS)
+
+    Returns:
+        list: Tuplas (chat_id, términos nuevos, mensaje)
+    """
+    if limit is None:
+        limit = int(os.getenv("RETRO_ALERT_MAX_HITS", "50"))
+
+    digests = []
+    cached_hits = {}
+    for chat_id, terms in tracker.new_terms(subscriptions).items():
+        term_hits = {}
+        for term in terms:
+            # Un término agregado en varios chats se busca una sola vez
+            normalized = normalize_text(term)
+            if normalized not in cached_hits:
+                cached_hits[normalized] = find_past_hits(search_index, normalized, limit)
+            term_hits[term] = cached_hits[normalized]
+        digests.append((chat_id, terms, format_digest(term_hits)))
+    return digests
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_term_tracker():
+    """Devuelve el registro de términos compartido, creándolo si es necesario"""
+    global _tracker
+
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = TermTracker()
+        return _tracker
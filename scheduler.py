@@ -0,0 +1,305 @@
+"""
+Scheduler por eventos con horarios tipo cron.
+
+En lugar de despertar cada minuto para comparar la hora, el scheduler
+calcula la siguiente ejecución de todos los horarios configurados y duerme
+exactamente hasta ese momento. La última ejecución de cada horario se guarda
+en disco, de modo que si el servicio estuvo caído durante un horario (p. ej.
+por un reinicio en Render) la ejecución perdida se recupera al arrancar; lo
+mismo pasa con un horario que vence mientras corre una ejecución larga, que
+se recupera en cuanto ésta termina.
+Todas las horas se calculan en la zona horaria configurada.
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+from gazette_cache import get_data_dir
+
+# Rango permitido de cada campo: minuto, hora, día del mes, mes, día de la semana
+# (en el día de la semana tanto 0 como 7 son domingo)
+_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+# Intervalo máximo de espera antes de volver a comparar con el reloj del sistema
+_MAX_WAIT_SECONDS = 3600
+
+
+def _parse_field(field, low, high):
+    """Convierte un campo cron (*, 5, 1-5, */15, 1,3,5) en el conjunto de valores"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Paso inválido en '{field}'")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Valor fuera de rango en '{field}' ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Horario con sintaxis cron de cinco campos: minuto hora día mes día-semana"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expresión cron inválida (se esperan 5 campos): '{expression}'")
+
+        self.expression = expression
+        parsed = [_parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELD_RANGES)]
+        self.minutes = sorted(parsed[0])
+        self.hours = sorted(parsed[1])
+        self.days = parsed[2]
+        self.months = parsed[3]
+        self.weekdays = {weekday % 7 for weekday in parsed[4]}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        # Día de la semana cron: 0 = domingo
+        weekday = (day.weekday() + 1) % 7
+        day_ok = day.day in self.days
+        weekday_ok = weekday in self.weekdays
+        # Igual que cron: si ambos campos están restringidos basta con uno
+        if not self._any_day and not self._any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment, tz):
+        """
+        Calcula la siguiente ejecución estrictamente posterior a un momento
+
+        Args:
+            moment: datetime con zona horaria
+            tz: Zona horaria de pytz en la que se interpreta el horario
+
+        Returns:
+            datetime: Siguiente ejecución en la zona horaria indicada
+        """
+        local = moment.astimezone(tz).replace(tzinfo=None, second=0, microsecond=0)
+        start = local + timedelta(minutes=1)
+        day = start.date()
+
+        # Cuatro años cubren cualquier combinación válida (incluido el 29 de febrero)
+        for _ in range(366 * 4 + 1):
+            if self._matches_day(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime(day.year, day.month, day.day, hour, minute)
+                        if candidate < start:
+                            continue
+                        try:
+                            return tz.localize(candidate, is_dst=None)
+                        except pytz.NonExistentTimeError:
+                            # Hora saltada por el cambio de horario
+                            continue
+                        except pytz.AmbiguousTimeError:
+                            # Hora repetida: se usa la primera ocurrencia
+                            return tz.localize(candidate, is_dst=True)
+            day += timedelta(days=1)
+
+        raise ValueError(f"El horario '{self.expression}' nunca se cumple")
+
+
+def load_schedules_from_env():
+    """
+    Lee los horarios configurados
+
+    SCHEDULES acepta expresiones cron separadas por punto y coma. Si no está
+    definida se usan SCHEDULE_HOUR_1/SCHEDULE_MINUTE_1 y SCHEDULE_HOUR_2/SCHEDULE_MINUTE_2.
+
+    Returns:
+        list: Expresiones cron
+    """
+    raw = os.getenv("SCHEDULES", "").strip()
+    if raw:
+        return [expression.strip() for expression in raw.split(";") if expression.strip()]
+
+    return [
+        f"{int(os.getenv('SCHEDULE_MINUTE_1', '30'))} {int(os.getenv('SCHEDULE_HOUR_1', '7'))} * * *",
+        f"{int(os.getenv('SCHEDULE_MINUTE_2', '0'))} {int(os.getenv('SCHEDULE_HOUR_2', '12'))} * * *",
+    ]
+
+
+class Scheduler:
+    """Ejecuta una tarea en cada horario configurado, durmiendo hasta el siguiente"""
+
+    def __init__(self, task, expressions, timezone=None, state_path=None, jitter_seconds=None, catchup_hours=None,
+                 claim=None):
+        """
+        Args:
+            task: Función sin argumentos a ejecutar
+            expressions: Lista de expresiones cron
+            timezone: Nombre de la zona horaria (opcional, default: TIMEZONE)
+            state_path: Archivo con la última ejecución de cada horario (opcional)
+            jitter_seconds: Retraso aleatorio máximo antes de cada ejecución (opcional)
+            catchup_hours: Antigüedad máxima de una ejecución perdida para recuperarla (opcional)
+            claim: Función que recibe la clave de una ejecución (horarios y momento) y devuelve
+                   False si otra réplica ya la tomó (opcional, ver coordination.py)
+        """
+        if timezone is None:
+            timezone = os.getenv("TIMEZONE", "America/Merida")
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "scheduler_state.json")
+        if jitter_seconds is None:
+            jitter_seconds = float(os.getenv("SCHEDULE_JITTER_SECONDS", "0"))
+        if catchup_hours is None:
+            catchup_hours = float(os.getenv("SCHEDULE_CATCHUP_HOURS", "12"))
+
+        self.task = task
+        self.claim = claim
+        self.schedules = [CronSchedule(expression) for expression in expressions]
+        self.timezone = timezone
+        self.tz = pytz.timezone(timezone)
+        self.state_path = state_path
+        self.jitter_seconds = jitter_seconds
+        self.catchup = timedelta(hours=catchup_hours)
+        self._stop = threading.Event()
+        self._state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _last_run(self, schedule):
+        value = self._state.get(schedule.expression)
+        return datetime.fromisoformat(value) if value else None
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def next_runs(self, now=None):
+        """
+        Siguiente ejecución de cada horario
+
+        Returns:
+            list: Tuplas (CronSchedule, datetime)
+        """
+        if now is None:
+            now = self.now()
+        return [(schedule, schedule.next_after(now, self.tz)) for schedule in self.schedules]
+
+    def missed_runs(self, now=None):
+        """
+        Horarios cuya última ejecución registrada quedó atrás de un horario ya vencido
+
+        Sólo se recuperan las ejecuciones perdidas dentro de SCHEDULE_CATCHUP_HOURS.
+
+        Returns:
+            list: Tuplas (CronSchedule, datetime de la ejecución perdida más reciente)
+        """
+        if now is None:
+            now = self.now()
+
+        missed = []
+        for schedule in self.schedules:
+            last_run = self._last_run(schedule)
+            if last_run is None:
+                continue
+
+            # Sólo interesa la ejecución vencida más reciente dentro de la ventana
+            due = None
+            candidate = schedule.next_after(max(last_run, now - self.catchup), self.tz)
+            while candidate <= now:
+                due = candidate
+                candidate = schedule.next_after(candidate, self.tz)
+
+            if due is not None:
+                missed.append((schedule, due))
+        return missed
+
+    def _record(self, schedules, moment):
+        for schedule in schedules:
+            self._state[schedule.expression] = moment.isoformat()
+        self._save_state()
+
+    def _run_task(self, schedules, due):
+        timezone_name = self.timezone.split("/")[-1]
+        expressions = ", ".join(schedule.expression for schedule in schedules)
+        # La clave depende sólo del horario, no del retraso aleatorio, así que es la misma en todas las réplicas
+        if self.claim is not None and not self.claim(f"{expressions}@{due.isoformat()}"):
+            print(f"La ejecución programada de las {due:%H:%M} ({expressions}) ya la tomó otra réplica, se omite")
+            self._record(schedules, due)
+            return
+        print(f"Ejecutando reporte programado ({expressions}) a las {due:%H:%M} hora de {timezone_name} ({self.now()})")
+        try:
+            self.task()
+        except Exception as e:
+            print(f"Error en la ejecución programada: {e}")
+        finally:
+            self._record(schedules, due)
+
+    def _sleep_until(self, moment):
+        """Duerme hasta un momento dado; devuelve False si se pidió detener el scheduler"""
+        while not self._stop.is_set():
+            remaining = (moment - self.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            # Se vuelve a consultar el reloj periódicamente por si cambia la hora del sistema
+            self._stop.wait(min(remaining, _MAX_WAIT_SECONDS))
+        return False
+
+    def run_forever(self):
+        """Ciclo principal: recupera ejecuciones perdidas y duerme hasta el siguiente horario"""
+        # Sin estado previo, los horarios empiezan a contar desde ahora
+        pending = [schedule for schedule in self.schedules if self._last_run(schedule) is None]
+        if pending:
+            self._record(pending, self.now())
+
+        while not self._stop.is_set():
+            # Al arrancar y después de cada ejecución: los horarios que vencieron mientras
+            # el servicio estaba caído o la tarea seguía corriendo se recuperan con la misma ventana
+            missed = self.missed_runs()
+            if missed:
+                print(f"Recuperando {len(missed)} ejecución(es) programada(s) perdida(s)")
+                self._run_task([schedule for schedule, _ in missed], max(due for _, due in missed))
+                continue
+
+            runs = self.next_runs()
+            due = min(moment for _, moment in runs)
+            due_schedules = [schedule for schedule, moment in runs if moment == due]
+            print(f"Siguiente ejecución programada: {due.isoformat()}")
+
+            if not self._sleep_until(due):
+                break
+
+            if self.jitter_seconds > 0:
+                if self._stop.wait(random.uniform(0, self.jitter_seconds)):
+                    break
+
+            self._run_task(due_schedules, due)
+
+    def stop(self):
+        """Detiene el ciclo del scheduler"""
+        self._stop.set()
@@ -0,0 +1,197 @@
+"""
+Índice de texto completo de todos los diarios procesados.
+
+El texto de cada página se guarda en una tabla SQLite FTS5 (sin acentos ni
+distinción de mayúsculas) junto con la fecha del diario, el PDF y el número de
+página. El índice se alimenta en cada ejecución con los PDFs que aún no estén
+indexados, de modo que preguntas como "¿apareció este nombre en los últimos dos
+años?" se responden en milisegundos sin volver a descargar nada.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from gazette_cache import get_data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    url TEXT,
+    filename TEXT,
+    gazette_date TEXT,
+    fecha_consulta TEXT,
+    total_pages INTEGER,
+    indexed_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    body,
+    sha256 UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def build_query(text):
+    """
+    Convierte el texto de búsqueda en una consulta FTS5 segura
+
+    Cada palabra se busca como término literal (todas deben aparecer en la
+    página); el texto entre comillas dobles se busca como frase exacta.
+
+    Returns:
+        str: Consulta FTS5, o cadena vacía si no hay términos
+    """
+    parts = []
+    for number, chunk in enumerate(text.split('"')):
+        if number % 2:
+            # Dentro de comillas: frase exacta
+            words = chunk.split()
+            if words:
+                parts.append('"' + " ".join(words) + '"')
+        else:
+            parts.extend('"' + word + '"' for word in chunk.split())
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """Índice FTS5 de las páginas de los PDFs procesados"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Archivo de la base de datos (opcional, default: SEARCH_INDEX_PATH o DATA_DIR/search_index.db)
+        """
+        if path is None:
+            path = os.getenv("SEARCH_INDEX_PATH") or os.path.join(get_data_dir(), "search_index.db")
+
+        self.path = path
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Una conexión por operación: el índice se usa desde varios hilos
+        return sqlite3.connect(self.path, timeout=30)
+
+    def is_indexed(self, sha256):
+        """Indica si un PDF ya está en el índice"""
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT 1 FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+        finally:
+            connection.close()
+        return row is not None
+
+    def add_document(self, sha256, page_texts, url=None, filename=None, gazette_date=None, fecha_consulta=None):
+        """
+        Agrega (o reemplaza) el texto de todas las páginas de un PDF
+
+        Args:
+            sha256: Hash del contenido del PDF
+            page_texts: Iterable de tuplas (número de página, texto)
+            url: URL del PDF (opcional)
+            filename: Nombre del archivo (opcional)
+            gazette_date: Fecha del diario en formato AAAA-MM-DD (opcional)
+            fecha_consulta: Fecha publicada en la página del diario (opcional)
+
+        Returns:
+            int: Número de páginas indexadas
+        """
+        with self._write_lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,))
+                    total_pages = 0
+                    for page_num, text in page_texts:
+                        connection.execute(
+                            "INSERT INTO pages (body, sha256, page) VALUES (?, ?, ?)",
+                            (text, sha256, page_num),
+                        )
+                        total_pages = page_num
+                    connection.execute(
+                        "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (sha256, url, filename, gazette_date, fecha_consulta, total_pages, time.time()),
+                    )
+            finally:
+                connection.close()
+        return total_pages
+
+    def search(self, text, limit=20, since=None):
+        """
+        Busca páginas que contengan el texto, ordenadas por relevancia (BM25)
+
+        Args:
+            text: Palabras o "frase exacta" a buscar
+            limit: Número máximo de resultados
+            since: Fecha mínima del diario en formato AAAA-MM-DD (opcional)
+
+        Returns:
+            list: Diccionarios con fecha, PDF, página, fragmento y puntuación
+        """
+        query = build_query(text)
+        if not query:
+            return []
+
+        sql = (
+            "SELECT d.gazette_date, d.fecha_consulta, d.filename, d.url, p.page,"
+            " snippet(pages, 0, '[', ']', '…', 16), bm25(pages)"
+            " FROM pages p JOIN documents d ON d.sha256 = p.sha256"
+            " WHERE pages MATCH ?"
+        )
+        params = [query]
+        if since:
+            sql += " AND d.gazette_date >= ?"
+            params.append(since)
+        sql += " ORDER BY bm25(pages) LIMIT ?"
+        params.append(limit)
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+        return [
+            {
+                "gazette_date": gazette_date,
+                "fecha_consulta": fecha_consulta,
+                "filename": filename,
+                "url": url,
+                "page": page,
+                "snippet": snippet,
+                # BM25 en SQLite es negativo: más negativo es más relevante
+                "score": round(-score, 4),
+            }
+            for gazette_date, fecha_consulta, filename, url, page, snippet, score in rows
+        ]
+
+    def stats(self):
+        """Número de PDFs y páginas indexadas"""
+        connection = self._connect()
+        try:
+            documents, pages = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(total_pages), 0) FROM documents"
+            ).fetchone()
+        finally:
+            connection.close()
+        return {"documents": documents, "pages": pages}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Devuelve el índice compartido, creándolo si es necesario"""
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
@@ -0,0 +1,169 @@
+"""
+Fuentes de diarios oficiales vigiladas desde un mismo despliegue.
+
+Cada fuente describe un sitio: la URL de su página del diario, los
+selectores del título con la fecha y de los enlaces a los PDFs, y sus
+propios horarios. El pipeline (descarga condicional, búsqueda en los PDFs,
+huellas y envío a los suscriptores) es el mismo para todas; lo que cambia
+por fuente se lee de aquí.
+
+GAZETTE_SOURCES acepta un JSON con la lista de fuentes:
+
+    [{"name": "yucatan", "base_url": "https://www.yucatan.gob.mx",
+      "index_path": "/gobierno/diario_oficial.php"},
+     {"name": "dof", "label": "DOF", "base_url": "https://www.dof.gob.mx",
+      "index_path": "/index.php", "title_selector": "span.fecha",
+      "pdf_selector": "a.pdf", "schedules": ["0 9 * * 1-5"]}]
+
+Sin GAZETTE_SOURCES hay una sola fuente, "yucatan", armada con BASE_URL,
+DIARIO_URL_PATH, INDEX_TITLE_SELECTOR, INDEX_PDF_SELECTOR y los horarios
+generales (el comportamiento anterior). La primera fuente es la principal:
+es la que usan el modo de vigilancia, el backfill y el comando /hoy.
+"""
+
+import json
+import os
+import re
+
+from index_parser import DEFAULT_PDF_SELECTOR, DEFAULT_TITLE_SELECTOR, parse_selector
+from scheduler import load_schedules_from_env
+
+# Fuente del despliegue original: conserva los nombres de archivo y de estado de siempre
+DEFAULT_SOURCE = "yucatan"
+
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+
+class GazetteSource:
+    """Un diario oficial: dónde está su página, cómo leerla y cuándo consultarla"""
+
+    def __init__(self, name, base_url, index_path, title_selector=None, pdf_selector=None,
+                 schedules=None, label=None):
+        """
+        Args:
+            name: Identificador de la fuente (minúsculas, números, - y _)
+            base_url: URL base del sitio (para resolver los enlaces relativos)
+            index_path: Ruta de la página del diario dentro del sitio
+            title_selector: Selector del título con la fecha (opcional, default: el del diario de Yucatán)
+            pdf_selector: Selector de los enlaces a los PDFs (opcional, default: "a.pdf")
+            schedules: Expresiones cron propias de la fuente (opcional, default: los horarios generales)
+            label: Nombre que se antepone a los mensajes (opcional, sin prefijo si es None)
+        """
+        if not _NAME_RE.match(name or ""):
+            raise ValueError(f"Nombre de fuente inválido (minúsculas, números, - y _): {name!r}")
+        if not base_url or not index_path:
+            raise ValueError(f"La fuente {name} necesita base_url e index_path")
+
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.index_path = index_path
+        self.title_selector = title_selector or DEFAULT_TITLE_SELECTOR
+        self.pdf_selector = pdf_selector or DEFAULT_PDF_SELECTOR
+        # Los selectores se validan al cargar la configuración, no en el primer reporte
+        self.selectors = (parse_selector(self.title_selector), parse_selector(self.pdf_selector))
+        self.schedules = list(schedules) if schedules else load_schedules_from_env()
+        self.label = label
+
+    @property
+    def index_url(self):
+        """URL de la página del diario de la fuente"""
+        return f"{self.base_url}{self.index_path}"
+
+    @property
+    def filename_prefix(self):
+        """Prefijo de los nombres de los PDFs enviados"""
+        return "diario_oficial" if self.name == DEFAULT_SOURCE else self.name
+
+    def state_name(self, filename):
+        """
+        Nombre del archivo de estado de la fuente en DATA_DIR
+
+        La fuente original conserva el nombre de siempre, así que agregar
+        fuentes no pierde la huella ni los horarios ya guardados.
+        """
+        if self.name == DEFAULT_SOURCE:
+            return filename
+        stem, extension = os.path.splitext(filename)
+        return f"{stem}_{self.name}{extension}"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "label": self.label,
+            "index_url": self.index_url,
+            "title_selector": self.title_selector,
+            "pdf_selector": self.pdf_selector,
+        }
+
+
+def default_source():
+    """Fuente única configurada con BASE_URL, DIARIO_URL_PATH y los selectores INDEX_*"""
+    return GazetteSource(
+        DEFAULT_SOURCE,
+        os.getenv("BASE_URL", "https://www.yucatan.gob.mx"),
+        os.getenv("DIARIO_URL_PATH", "/gobierno/diario_oficial.php"),
+        title_selector=os.getenv("INDEX_TITLE_SELECTOR", DEFAULT_TITLE_SELECTOR),
+        pdf_selector=os.getenv("INDEX_PDF_SELECTOR", DEFAULT_PDF_SELECTOR),
+    )
+
+
+def load_sources():
+    """
+    Lee las fuentes configuradas en GAZETTE_SOURCES
+
+    Una entrada inválida se omite con un aviso; si no queda ninguna se usa
+    la fuente única de BASE_URL y DIARIO_URL_PATH.
+
+    Returns:
+        list: GazetteSource en el orden configurado (la primera es la principal)
+    """
+    raw = os.getenv("GAZETTE_SOURCES", "").strip()
+    if not raw:
+        return [default_source()]
+
+    try:
+        configured = json.loads(raw)
+    except ValueError as e:
+        print(f"GAZETTE_SOURCES no es un JSON válido: {e}")
+        configured = []
+    if not isinstance(configured, list):
+        print("GAZETTE_SOURCES debe ser una lista de fuentes")
+        configured = []
+
+    sources = []
+    for entry in configured:
+        try:
+            source = GazetteSource(
+                entry.get("name"),
+                entry.get("base_url"),
+                entry.get("index_path"),
+                title_selector=entry.get("title_selector"),
+                pdf_selector=entry.get("pdf_selector"),
+                schedules=entry.get("schedules"),
+                label=entry.get("label", entry.get("name")),
+            )
+        except (AttributeError, ValueError) as e:
+            print(f"Fuente omitida en GAZETTE_SOURCES: {e}")
+            continue
+        if any(known.name == source.name for known in sources):
+            print(f"Fuente repetida en GAZETTE_SOURCES: {source.name}")
+            continue
+        sources.append(source)
+
+    return sources or [default_source()]
+
+
+def get_source(name=None):
+    """
+    Busca una fuente configurada por nombre
+
+    Args:
+        name: Nombre de la fuente (opcional, default: la principal)
+
+    Returns:
+        GazetteSource: La fuente, o None si no hay ninguna con ese nombre
+    """
+    sources = load_sources()
+    if name is None:
+        return sources[0]
+    return next((source for source in sources if source.name == name), None)
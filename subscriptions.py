@@ -0,0 +1,98 @@
+"""
+Suscripciones hechas desde Telegram con /suscribir y /desuscribir.
+
+Se guardan en DATA_DIR/subscriptions.json y se combinan con las configuradas
+en SEARCH_TEXT y SUBSCRIPTIONS (ver matcher.load_subscriptions).
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from gazette_cache import get_data_dir
+from matcher import normalize_text
+
+
+class SubscriptionStore:
+    """Términos vigilados por cada chat, agregados desde Telegram"""
+
+    def __init__(self, state_path=None):
+        """
+        Args:
+            state_path: Archivo de las suscripciones (opcional, default: DATA_DIR/subscriptions.json)
+        """
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "subscriptions.json")
+
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._subscriptions = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._subscriptions, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def all(self):
+        """Copia del mapa chat_id -> términos"""
+        with self._lock:
+            return {chat_id: list(terms) for chat_id, terms in self._subscriptions.items()}
+
+    def add(self, chat_id, term):
+        """
+        Agrega un término a un chat
+
+        Returns:
+            bool: False si el chat ya vigilaba ese término
+        """
+        with self._lock:
+            terms = self._subscriptions.setdefault(str(chat_id), [])
+            if any(normalize_text(existing) == normalize_text(term) for existing in terms):
+                return False
+            terms.append(term)
+            self._save_state()
+            return True
+
+    def remove(self, chat_id, term):
+        """
+        Quita un término de un chat
+
+        Returns:
+            bool: False si el chat no vigilaba ese término
+        """
+        with self._lock:
+            terms = self._subscriptions.get(str(chat_id), [])
+            remaining = [existing for existing in terms if normalize_text(existing) != normalize_text(term)]
+            if len(remaining) == len(terms):
+                return False
+            if remaining:
+                self._subscriptions[str(chat_id)] = remaining
+            else:
+                del self._subscriptions[str(chat_id)]
+            self._save_state()
+            return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_subscription_store():
+    """Devuelve las suscripciones compartidas, cargándolas si es necesario"""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = SubscriptionStore()
+        return _store
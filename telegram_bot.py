@@ -1,14 +1,37 @@
-from bs4 import BeautifulSoup
-import requests
-import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import hashlib
+import hmac
 import os
+import time
 from datetime import datetime
 import pytz
 from urllib.parse import urljoin
-from pypdf import PdfReader
+from pdf_search import search_pdf, search_page_texts
+from gazette_cache import get_cache, get_data_dir
+import coordination
+import http_client
+import metrics
+from matcher import TermMatcher, get_watched_terms, load_subscriptions
+from jobs import JobManager, stage
+from scheduler import Scheduler
+from watcher import GazetteWatcher, page_fingerprint
+from index_parser import extract_index
+from fingerprints import build_fingerprint, describe_diff, diff_fingerprints, get_fingerprint_store, latest_fingerprint, reusable_result, text_hash
+from search_index import get_search_index
+from retro_alerts import build_digests, get_term_tracker
+from pdf_excerpt import excerpt_filename, excerpt_pages, prepare_document
+from file_ids import document_key, get_file_id_store
+from delivery import deliver_all, escape_markdown, get_telegram_api
+from backfill import Backfill, date_range, dated_url, parse_date, summarize_edition
+from subscriptions import get_subscription_store
+from sources import get_source, load_sources
+from commands import CommandHandler, TelegramPoller, save_last_edition
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 
 # Cargar variables de entorno
@@ -21,63 +44,249 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Trabajos en segundo plano de /run-report y /send-pdf
+job_manager = JobManager()
+
+# Horarios de ejecución del reporte (tipo cron, en la zona horaria configurada):
+# uno por fuente; scheduler es el de la fuente principal
+scheduler = None
+schedulers = {}
+
 
-def bot_send_text(bot_message):
+def _telegram_target(chat_id=None):
+    """Obtiene el token del bot y el chat destino, validando la configuración"""
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    bot_chatID = os.getenv("TELEGRAM_CHAT_ID")
+    bot_chatID = chat_id or os.getenv("TELEGRAM_CHAT_ID")
     
     if not bot_token or not bot_chatID:
         raise ValueError("TELEGRAM_BOT_TOKEN y TELEGRAM_CHAT_ID deben estar configurados en el archivo .env")
+
+    return bot_token, bot_chatID
+
+
+def _telegram_api_url():
+    """URL base de la API de Telegram (TELEGRAM_API_URL, p. ej. un servidor local de Bot API)"""
+    return os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+
+def _send_text_request(bot_message, chat_id=None):
+    bot_token, bot_chatID = _telegram_target(chat_id)
+
+    url = f"{_telegram_api_url()}/bot{bot_token}/sendMessage"
+
+    # El texto se envía en el cuerpo del POST y escapado para que los "_" de
+    # los nombres de archivo no se interpreten como Markdown
+    data = {
+        'chat_id': bot_chatID,
+        'parse_mode': 'Markdown',
+        'text': escape_markdown(bot_message)
+    }
+
+    return url, bot_chatID, data
+
+
+def bot_send_text(bot_message, chat_id=None):
+    """
+    Envía un mensaje de texto al chat de Telegram
+
+    Args:
+        bot_message: Texto del mensaje
+        chat_id: Chat destino (opcional, default: TELEGRAM_CHAT_ID)
+
+    Returns:
+        dict: Respuesta de la API de Telegram
+    """
+    url, bot_chatID, data = _send_text_request(bot_message, chat_id)
+
+    return get_telegram_api().call(url, bot_chatID, data)
+
+
+def _send_document_request(pdf_content, filename, caption="", chat_id=None, file_id=None):
+    bot_token, bot_chatID = _telegram_target(chat_id)
     
-    send_text = (
-        "https://api.telegram.org/bot"
-        + bot_token
-        + "/sendMessage?chat_id="
-        + bot_chatID
-        + "&parse_mode=Markdown&text="
-        + bot_message
-    )
+    url = f"{_telegram_api_url()}/bot{bot_token}/sendDocument"
+    
+    data = {
+        'chat_id': bot_chatID,
+        'caption': caption
+    }
+
+    # Un archivo ya subido se reenvía por su file_id, sin volver a subirlo
+    if file_id:
+        data['document'] = file_id
+        return url, bot_chatID, None, data
 
-    response = requests.get(send_text)
+    files = {
+        'document': (filename, pdf_content, 'application/pdf')
+    }
 
-    return response.json()
+    return url, bot_chatID, files, data
 
 
-def bot_send_document(pdf_content, filename, caption=""):
+def bot_send_document(pdf_content, filename, caption="", chat_id=None, file_id=None):
     """
     Envía un documento PDF al chat de Telegram
     
     Args:
-        pdf_content: El contenido del PDF en bytes
+        pdf_content: El contenido del PDF en bytes o un archivo abierto (p. ej. un extracto)
         filename: Nombre del archivo PDF
         caption: Descripción opcional del documento
+        chat_id: Chat destino (opcional, default: TELEGRAM_CHAT_ID)
+        file_id: file_id de Telegram de un archivo ya subido (opcional, se ignora pdf_content)
     
     Returns:
         dict: Respuesta de la API de Telegram
     """
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    bot_chatID = os.getenv("TELEGRAM_CHAT_ID")
-    
-    if not bot_token or not bot_chatID:
-        raise ValueError("TELEGRAM_BOT_TOKEN y TELEGRAM_CHAT_ID deben estar configurados en el archivo .env")
-    
-    url = f"https://api.telegram.org/bot{bot_token}/sendDocument"
+    url, bot_chatID, files, data = _send_document_request(pdf_content, filename, caption, chat_id, file_id)
     
-    files = {
-        'document': (filename, pdf_content, 'application/pdf')
+    return get_telegram_api().call(url, bot_chatID, data, files)
+
+
+def search_cached_pdf(cache, full_url, sha256, pdf_content, matcher):
+    """
+    Busca los términos reutilizando el texto extraído guardado en la caché
+
+    Si el texto de las páginas no está en caché se extrae del PDF y se guarda
+    página por página mientras se busca.
+
+    Returns:
+        dict: Resultado de search_page_texts con la bandera from_cache y el hash del texto de cada página
+    """
+    page_hashes = []
+
+    def record_hash(page_num, text):
+        page_hashes.append(text_hash(text))
+
+    entry = cache.get_entry(full_url)
+    if cache.has_pages(sha256) and entry and entry.get("total_pages"):
+        page_texts = ((page_num, text, 0.0) for page_num, text in cache.iter_pages(sha256))
+        search_result = search_page_texts(page_texts, matcher, entry["total_pages"], page_sink=record_hash)
+        search_result["from_cache"] = True
+        search_result["page_hashes"] = page_hashes
+        return search_result
+
+    writer = cache.page_writer(sha256)
+
+    def store_page(page_num, text):
+        writer.write(page_num, text)
+        record_hash(page_num, text)
+
+    try:
+        search_result = search_pdf(pdf_content, matcher, page_sink=store_page)
+    except Exception:
+        writer.discard()
+        raise
+    writer.commit()
+    cache.set_total_pages(full_url, search_result["total_pages"])
+    search_result["from_cache"] = False
+    search_result["page_hashes"] = page_hashes
+    return search_result
+
+
+def reuse_search_result(known):
+    """Resultado de búsqueda de un PDF sin cambios, tomado de la huella del reporte anterior"""
+    found_pages = sorted({page for pages in known["matches"].values() for page in pages})
+    return {
+        "total_pages": known["total_pages"],
+        "matches": known["matches"],
+        "found_pages": found_pages,
+        "page_timings": {},
+        "match_timings": {},
+        "page_hashes": known["page_hashes"],
+        "from_cache": True,
+        "elapsed": 0.0,
     }
-    
-    data = {
-        'chat_id': bot_chatID,
-        'caption': caption
+
+
+def resolve_pdf_url(pdf_link, base_url):
+    """Si el enlace es relativo, convertirlo a absoluto"""
+    if pdf_link.startswith("/") or not pdf_link.startswith("http"):
+        return urljoin(base_url, pdf_link)
+    return pdf_link
+
+
+def search_downloaded_pdf(cache, full_url, download, pdf_link, filename=None, previous=None):
+    """
+    Busca los términos vigilados en un PDF ya descargado (trabajo de CPU)
+
+    Args:
+        cache: GazetteCache donde está guardado el PDF
+        full_url: URL absoluta del PDF
+        download: Resultado de http_client.fetch (con el contenido en memoria o la ruta del archivo)
+        pdf_link: El enlace original del PDF
+        filename: Nombre del archivo (opcional, solo para logging)
+        previous: Huella del reporte anterior; si el PDF y los términos no cambiaron se reutiliza su resultado
+
+    Returns:
+        tuple: (información del PDF, mensaje con el resultado de la búsqueda)
+    """
+    pdf_content = download["content"]
+    pdf_path = download.get("path")
+    sha256 = download["sha256"]
+
+    # Generar nombre del archivo si no se proporciona
+    if not filename:
+        filename = pdf_link.split("/")[-1]
+        if not filename.endswith(".pdf"):
+            filename += ".pdf"
+
+    # Buscar todos los términos vigilados en una sola pasada por página
+    matcher = TermMatcher(get_watched_terms())
+    search_text = ", ".join(matcher.terms)
+    known = reusable_result(previous, full_url, sha256, matcher.terms)
+    if known is not None:
+        search_result = reuse_search_result(known)
+    else:
+        pdf_source = pdf_content if pdf_content is not None else pdf_path
+        search_result = search_cached_pdf(cache, full_url, sha256, pdf_source, matcher)
+    total_pages = search_result["total_pages"]
+    found_pages = search_result["found_pages"]
+
+    page_timings = search_result["page_timings"]
+    if known is not None:
+        print(f"PDF sin cambios desde el último reporte, se reutiliza su resultado ({total_pages} página(s))")
+    else:
+        metrics.record_pages(page_timings, search_result["match_timings"], search_result["from_cache"])
+        if search_result["from_cache"]:
+            print(f"Texto de {total_pages} página(s) leído de la caché ({search_result['elapsed']:.2f}s)")
+        elif page_timings:
+            slowest_page = max(page_timings, key=page_timings.get)
+            print(
+                f"Extracción de texto: {search_result['elapsed']:.2f}s para {len(page_timings)} página(s)"
+                f" - página más lenta: {slowest_page} ({page_timings[slowest_page]:.2f}s)"
+            )
+
+    result = {
+        "total_pages": total_pages,
+        "search_text": search_text,
+        "matches": search_result["matches"],
+        "found_pages": found_pages,
+        "found": len(found_pages) > 0,
+        "pdf_content": pdf_content,
+        "pdf_path": pdf_path,
+        "sha256": sha256,
+        "url": full_url,
+        "filename": filename,
+        "page_timings": page_timings,
+        "page_hashes": search_result["page_hashes"]
     }
-    
-    response = requests.post(url, files=files, data=data)
-    
-    return response.json()
 
+    print(f"PDF leído {'en memoria' if pdf_content is not None else 'desde la caché en disco'} - Total de páginas: {total_pages}")
+    if found_pages:
+        return (
+            result,
+            f"Texto '{search_text}' encontrado en {len(found_pages)} página(s): {found_pages}",
+        )
+
+    return (result, f"Texto '{search_text}' NO encontrado en el PDF")
+
+
+def pdf_streaming():
+    """Si los PDFs se descargan directo a la caché en disco en lugar de a memoria (PDF_STREAMING)"""
+    return os.getenv("PDF_STREAMING", "false").lower() == "true"
 
-def download_pdf(pdf_link, base_url, filename=None):
+
+def download_pdf(pdf_link, base_url, filename=None, previous=None):
     """
     Descarga un PDF, lo lee en memoria y busca texto específico
 
@@ -85,168 +294,862 @@ def download_pdf(pdf_link, base_url, filename=None):
         pdf_link: El enlace del PDF (puede ser relativo o absoluto)
         base_url: La URL base del sitio web
         filename: Nombre del archivo (opcional, solo para logging)
+        previous: Huella del reporte anterior para reutilizar el resultado si el PDF no cambió (opcional)
 
     Returns:
         dict: Información del PDF incluyendo páginas totales y resultados de búsqueda, o None si hay error
     """
+    cache = get_cache()
+    download = None
     try:
-        # Si el enlace es relativo, convertirlo a absoluto
-        if pdf_link.startswith("/") or not pdf_link.startswith("http"):
-            full_url = urljoin(base_url, pdf_link)
-        else:
-            full_url = pdf_link
-
-        # Descargar el PDF
-        response = requests.get(full_url)
-        response.raise_for_status()  # Lanza excepción si hay error HTTP
-
-        # Generar nombre del archivo si no se proporciona
-        if not filename:
-            filename = pdf_link.split("/")[-1]
-            if not filename.endswith(".pdf"):
-                filename += ".pdf"
-
-        # Leer el PDF directamente desde memoria
-        from io import BytesIO
-
-        pdf_stream = BytesIO(response.content)
-        reader = PdfReader(pdf_stream)
-        total_pages = len(reader.pages)
-
-        # Buscar texto en el contenido del PDF
-        search_text = os.getenv("SEARCH_TEXT", "koyoc novelo")
-        found_pages = []
-        full_text = ""
-
-        for page_num, page in enumerate(reader.pages, 1):
-            try:
-                page_text = page.extract_text().lower()
-                full_text += page_text + "\n"
-
-                if search_text.lower() in page_text:
-                    found_pages.append(page_num)
-                    print(f"'{search_text}' encontrado en la página {page_num}")
-            except Exception as e:
-                print(f"Error extrayendo texto de la página {page_num}: {e}")
-
-        result = {
-            "total_pages": total_pages,
-            "search_text": search_text,
-            "found_pages": found_pages,
-            "found": len(found_pages) > 0,
-            "pdf_content": response.content,
-            "filename": filename
-        }
+        full_url = resolve_pdf_url(pdf_link, base_url)
 
-        print(f"PDF leído en memoria - Total de páginas: {total_pages}")
-        if found_pages:
-            return (
-                result,
-                f"Texto '{search_text}' encontrado en {len(found_pages)} página(s): {found_pages}",
-            )
+        # Descargar el PDF (petición condicional si ya está en la caché)
+        with stage("pdf_download"):
+            download = http_client.fetch(full_url, cache, stream=pdf_streaming())
 
-        return (result, f"Texto '{search_text}' NO encontrado en el PDF")
+        with stage("pdf_search"):
+            return search_downloaded_pdf(cache, full_url, download, pdf_link, filename, previous)
 
     except Exception as e:
         print(f"Error descargando PDF: {e}")
+        _release_download(cache, download)
         return None
 
 
-def diario_scraping():
-    base_url = os.getenv("BASE_URL", "https://www.yucatan.gob.mx")
-    diario_path = os.getenv("DIARIO_URL_PATH", "/gobierno/diario_oficial.php")
-    url = requests.get(f"{base_url}{diario_path}")
-    # url = requests.get(f'{base_url}{diario_path}?f=2025-10-9')
+async def download_pdf_async(pdf_link, base_url, filename=None):
+    """
+    Versión asíncrona de download_pdf
+
+    La descarga usa el cliente HTTP asíncrono y la extracción de texto (CPU)
+    se ejecuta fuera del event loop.
+    """
+    cache = get_cache()
+    download = None
+    try:
+        full_url = resolve_pdf_url(pdf_link, base_url)
+
+        with stage("pdf_download"):
+            download = await http_client.fetch_async(full_url, cache, stream=pdf_streaming())
+
+        with stage("pdf_search"):
+            return await asyncio.to_thread(
+                search_downloaded_pdf, cache, full_url, download, pdf_link, filename
+            )
+
+    except Exception as e:
+        print(f"Error descargando PDF: {e}")
+        _release_download(cache, download)
+        return None
+
+
+def _release_download(cache, download):
+    # Un PDF descargado a archivo que no llega a la edición se libera de inmediato
+    if download is not None and download.get("path"):
+        cache.unpin(download["path"])
+
+
+def hold_edition(edition):
+    """Fija en la caché los PDFs descargados a archivo de una edición (un pin más por cada uno)"""
+    if edition is None:
+        return
+    cache = get_cache()
+    for pdf in edition["pdfs"]:
+        if pdf.get("pdf_path"):
+            cache.pin(pdf["pdf_path"])
+
+
+def release_edition(edition):
+    """
+    Libera los PDFs de una edición cuando ya se enviaron
+
+    Con PDF_STREAMING cada PDF queda fijado en la caché desde que se descarga
+    (ver http_client.fetch) para que el desalojo no lo borre antes de subirlo
+    a Telegram; quien procesa la edición la libera al terminar.
+    """
+    if edition is None:
+        return
+    cache = get_cache()
+    for pdf in edition["pdfs"]:
+        if pdf.get("pdf_path"):
+            cache.unpin(pdf["pdf_path"])
+
+
+def format_edition_report(edition, terms=None):
+    """
+    Construye el mensaje de resultado de una edición para un conjunto de términos
+
+    Args:
+        edition: Resultado consolidado de diario_scraping (fecha y PDFs procesados)
+        terms: Términos a reportar (opcional, default: todos los buscados)
+
+    Returns:
+        str: Mensaje con el estado de cada término en cada PDF
+    """
+    if terms is None:
+        terms = edition["terms"]
+
+    found = any(pdf["matches"].get(term) for pdf in edition["pdfs"] for term in terms)
+    status = "✅" if found else "❌"
+    timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
+
+    pdf_reports = []
+    for pdf in edition["pdfs"]:
+        term_results = []
+        for term in terms:
+            if pdf["matches"].get(term):
+                term_results.append(f"'{term}' encontrado en páginas: {pdf['matches'][term]}")
+            else:
+                term_results.append(f"'{term}' NO encontrado")
+        pdf_reports.append(
+            f"PDF procesado: {pdf['filename']} - Total páginas: {pdf['total_pages']} - " + " - ".join(term_results)
+        )
+    for pdf_link in edition["errors"]:
+        pdf_reports.append(f"‼️ Error procesando PDF: {pdf_link}")
+
+    return (
+        f"{status} {source_prefix(edition)}{edition['fecha_consulta']} - Hora de ejecución ({timezone_name}): {edition['date_now']} - "
+        + " | ".join(pdf_reports)
+    )
+
+
+def subscriber_found_pages(pdf_data, terms):
+    """Páginas del PDF donde aparece alguno de los términos de un suscriptor"""
+    return sorted({page for term in terms for page in pdf_data["matches"].get(term, [])})
 
-    soup = BeautifulSoup(url.content, "html.parser")
-    fecha_consulta_pagina = soup.find("div", {"class": "titulo verde mt-2"}).text
+
+def source_prefix(page):
+    """Nombre de la fuente al inicio de los mensajes (vacío con la fuente única de siempre)"""
+    label = page.get("source_label")
+    return f"[{label}] " if label else ""
+
+
+def is_primary_source(source):
+    """Si la fuente es la principal (la primera configurada)"""
+    return source.name == load_sources()[0].name
+
+
+def parse_index_page(content, day=None, source=None):
+    """
+    Lee la fecha del diario y los enlaces de los PDFs de la página del diario oficial
+
+    Una edición puede tener varias secciones o suplementos, cada uno con su
+    propio enlace con clase "pdf". Si la página no trae el título con la fecha
+    se continúa con un texto genérico en lugar de fallar.
+
+    Args:
+        content: HTML de la página del diario
+        day: Fecha de la edición consultada (opcional, default: hoy)
+        source: GazetteSource de la página, con sus selectores (opcional, default: la principal)
+
+    Returns:
+        dict: fecha_consulta, date_now, gazette_date, pdf_links, filenames, pdf_link (el primero o None),
+              source y source_label
+    """
+    if source is None:
+        source = get_source()
+
+    # Sólo se leen el título y los enlaces (ver index_parser.py)
+    index = extract_index(content, selectors=source.selectors)
+    fecha_consulta_pagina = index["title"]
+    if fecha_consulta_pagina is None:
+        print(f"No se encontró el título con la fecha en la página de {source.name} ({source.title_selector})")
+        fecha_consulta_pagina = "Diario Oficial (fecha no disponible)"
     # Usar zona horaria configurada
     timezone = os.getenv("TIMEZONE", "America/Merida")
     merida_tz = pytz.timezone(timezone)
-    date_now = datetime.now(merida_tz).strftime("%d/%m/%Y %H:%M:%S %Z")
-
-    # Buscar el enlace del PDF
-    pdf_element = soup.find("a", {"class": "pdf"})
+    now = datetime.now(merida_tz)
 
-    if pdf_element:
-        pdf_link = pdf_element.get("href")
-        print(f"Enlace del PDF encontrado: {pdf_link}")
+    # Enlaces de los PDFs, sin repetir y en orden de aparición
+    pdf_links = index["pdf_links"]
 
-        # Generar nombre del archivo con fecha en zona horaria configurada
-        timezone = os.getenv("TIMEZONE", "America/Merida")
-        tz = pytz.timezone(timezone)
-        current_date = datetime.now(tz).strftime("%Y-%m-%d")
-        filename = f"diario_oficial_{current_date}.pdf"
-
-        # Leer el PDF y buscar texto
-        pdf_result, message = download_pdf(pdf_link, base_url, filename)
-
-        if pdf_result:
-            total_pages = pdf_result["total_pages"]
-            search_text = pdf_result["search_text"]
-            found_pages = pdf_result["found_pages"]
-
-            if pdf_result["found"]:
-                timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
-                format_result = (
-                    f"✅ {fecha_consulta_pagina} - Hora de ejecución ({timezone_name}): {date_now} - PDF procesado: {filename} - Total páginas: {total_pages} - '{search_text}' encontrado en páginas: {found_pages}"
-                    + " - "
-                    + message
-                )
-                return format_result, pdf_result  # Devolver también la información del PDF
-            else:
-                timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
-                format_result = (
-                    f"❌ {fecha_consulta_pagina} - Hora de ejecución ({timezone_name}): {date_now} - PDF procesado: {filename} - Total páginas: {total_pages} - '{search_text}' NO encontrado"
-                    + " - "
-                    + message
-                )
-        else:
-            timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
-            format_result = f"‼️ {fecha_consulta_pagina} - Hora de ejecución ({timezone_name}): {date_now} - Error procesando PDF"
+    # Nombre de los archivos con fecha en zona horaria configurada
+    current_date = day.isoformat() if day else now.strftime("%Y-%m-%d")
+    prefix = source.filename_prefix
+    if len(pdf_links) == 1:
+        filenames = [f"{prefix}_{current_date}.pdf"]
     else:
+        filenames = [f"{prefix}_{current_date}_{number}.pdf" for number in range(1, len(pdf_links) + 1)]
+
+    return {
+        "fecha_consulta": fecha_consulta_pagina,
+        "date_now": now.strftime("%d/%m/%Y %H:%M:%S %Z"),
+        "gazette_date": current_date,
+        "pdf_links": pdf_links,
+        "filenames": filenames,
+        "pdf_link": pdf_links[0] if pdf_links else None,
+        "source": source.name,
+        "source_label": source.label,
+    }
+
+
+def build_scraping_result(page, pdf_downloads):
+    """
+    Construye el mensaje final del scraping a partir de la página y de sus PDFs
+
+    Args:
+        page: Resultado de parse_index_page
+        pdf_downloads: Resultado de download_pdf por cada enlace (None si hubo error)
+
+    Returns:
+        tuple: (mensaje, edición con los PDFs procesados o None si no hay PDF para enviar)
+    """
+    fecha_consulta_pagina = source_prefix(page) + page["fecha_consulta"]
+    date_now = page["date_now"]
+    timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
+
+    if not page["pdf_links"]:
         print("No se encontró enlace de PDF con clase 'pdf'")
-        timezone_name = os.getenv("TIMEZONE", "America/Merida").split("/")[-1]
         format_result = f"⚠️ {fecha_consulta_pagina} - Hora de ejecución ({timezone_name}): {date_now} - No PDF encontrado"
+        return format_result, None
+
+    pdfs = []
+    messages = []
+    errors = []
+    for pdf_link, pdf_download in zip(page["pdf_links"], pdf_downloads):
+        if not pdf_download:
+            errors.append(pdf_link)
+            continue
+        pdf_result, message = pdf_download
+        pdfs.append(pdf_result)
+        messages.append(message)
+
+    if not pdfs:
+        format_result = f"‼️ {fecha_consulta_pagina} - Hora de ejecución ({timezone_name}): {date_now} - Error procesando PDF"
+        return format_result, None
+
+    edition = {
+        "fecha_consulta": page["fecha_consulta"],
+        "date_now": date_now,
+        "gazette_date": page["gazette_date"],
+        "source": page["source"],
+        "source_label": page["source_label"],
+        "pdfs": pdfs,
+        "errors": errors,
+        "terms": list(pdfs[0]["matches"]),
+        "search_text": pdfs[0]["search_text"],
+        "found": any(pdf["found"] for pdf in pdfs),
+        "index_fingerprint": page_fingerprint(page),
+    }
+    format_result = format_edition_report(edition) + " - " + " | ".join(messages)
+
+    return format_result, edition  # Devolver también la información de los PDFs
+
+
+def index_edition(edition):
+    """
+    Agrega al índice de búsqueda los PDFs de la edición que aún no estén indexados
+
+    El texto se lee de la caché de páginas, así que no se vuelve a extraer.
+    Un error del índice no interrumpe el reporte.
+    """
+    if edition is None:
+        return
+
+    cache = get_cache()
+    try:
+        search_index = get_search_index()
+        for pdf in edition["pdfs"]:
+            if search_index.is_indexed(pdf["sha256"]) or not cache.has_pages(pdf["sha256"]):
+                continue
+            total_pages = search_index.add_document(
+                pdf["sha256"],
+                cache.iter_pages(pdf["sha256"]),
+                url=pdf["url"],
+                filename=pdf["filename"],
+                gazette_date=edition["gazette_date"],
+                fecha_consulta=edition["fecha_consulta"].strip()
+            )
+            print(f"PDF agregado al índice de búsqueda: {pdf['filename']} ({total_pages} páginas)")
+    except Exception as e:
+        print(f"Error actualizando el índice de búsqueda: {e}")
+
+
+def remember_edition(edition):
+    """Guarda el resumen de la edición actual para responder el comando /hoy"""
+    if edition is None:
+        return
+    try:
+        save_last_edition(edition)
+    except Exception as e:
+        print(f"Error guardando el resumen de la edición: {e}")
+
+
+def _pdf_download_concurrency(pdf_links):
+    return max(1, min(len(pdf_links), int(os.getenv("PDF_DOWNLOAD_CONCURRENCY", "4"))))
+
+
+def download_pdfs(page, base_url, previous=None):
+    """
+    Descarga y procesa todos los PDFs de la edición con un pool acotado de hilos
+
+    Args:
+        page: Resultado de parse_index_page
+        base_url: La URL base del sitio web
+        previous: Huella del reporte anterior (opcional, ver download_pdf)
+
+    Returns:
+        list: Resultado de download_pdf por cada enlace, en el mismo orden
+    """
+    for pdf_link in page["pdf_links"]:
+        print(f"Enlace del PDF encontrado: {pdf_link}")
+
+    with ThreadPoolExecutor(max_workers=_pdf_download_concurrency(page["pdf_links"])) as executor:
+        # Cada hilo recibe una copia del contexto para que sus etapas cuenten en la ejecución actual
+        futures = [
+            executor.submit(contextvars.copy_context().run, download_pdf, pdf_link, base_url, filename, previous)
+            for pdf_link, filename in zip(page["pdf_links"], page["filenames"])
+        ]
+        return [future.result() for future in futures]
+
+
+async def download_pdfs_async(page, base_url):
+    """Versión asíncrona de download_pdfs con concurrencia acotada por un semáforo"""
+    semaphore = asyncio.Semaphore(_pdf_download_concurrency(page["pdf_links"]))
+
+    async def download(pdf_link, filename):
+        async with semaphore:
+            print(f"Enlace del PDF encontrado: {pdf_link}")
+            return await download_pdf_async(pdf_link, base_url, filename)
+
+    return await asyncio.gather(*(
+        download(pdf_link, filename) for pdf_link, filename in zip(page["pdf_links"], page["filenames"])
+    ))
+
+
+def diario_scraping(day=None, previous=None, source=None):
+    """
+    Descarga la página del diario, procesa sus PDFs y construye el mensaje
+
+    Args:
+        day: Fecha de la edición a consultar (opcional, default: la edición actual)
+        previous: Huella del reporte anterior; los PDFs sin cambios no se vuelven a leer (opcional)
+        source: GazetteSource a consultar (opcional, default: la principal)
+    """
+    if source is None:
+        source = get_source()
+    diario_url = source.index_url
+    if day:
+        diario_url = dated_url(diario_url, day)
+
+    # Petición condicional: si la página no cambió se usa la copia en caché
+    with stage("index_fetch"):
+        index_page = http_client.fetch(diario_url, get_cache(), extension="html")
+
+    with stage("index_parse"):
+        page = parse_index_page(index_page["content"], day, source)
+
+    # Leer los PDFs y buscar texto
+    pdf_downloads = download_pdfs(page, source.base_url, previous) if page["pdf_links"] else []
+
+    result, edition = build_scraping_result(page, pdf_downloads)
+    with stage("index_update"):
+        index_edition(edition)
+        if day is None and is_primary_source(source):
+            remember_edition(edition)
+    return result, edition
+
+
+async def diario_scraping_async(day=None, source=None):
+    """Versión asíncrona de diario_scraping que no bloquea el event loop"""
+    if source is None:
+        source = get_source()
+    diario_url = source.index_url
+    if day:
+        diario_url = dated_url(diario_url, day)
+
+    with stage("index_fetch"):
+        index_page = await http_client.fetch_async(diario_url, get_cache(), extension="html")
+
+    with stage("index_parse"):
+        page = await asyncio.to_thread(parse_index_page, index_page["content"], day, source)
+
+    pdf_downloads = await download_pdfs_async(page, source.base_url) if page["pdf_links"] else []
+
+    result, edition = build_scraping_result(page, pdf_downloads)
+    with stage("index_update"):
+        await asyncio.to_thread(index_edition, edition)
+        if day is None and is_primary_source(source):
+            await asyncio.to_thread(remember_edition, edition)
+    return result, edition
+
+
+def _excerpt_caption(pdf_data, pages, caption):
+    if pages:
+        return caption + f" - Extracto con las páginas {pages} de {pdf_data['total_pages']}"
+    return caption
+
+
+def _close_upload(content):
+    # Los extractos son archivos temporales; el PDF completo son bytes o, con
+    # PDF_STREAMING, el archivo de la caché abierto para subirlo
+    if hasattr(content, "close"):
+        content.close()
+
+
+def _uploaded_file_id(response):
+    """file_id del documento en la respuesta de sendDocument"""
+    return response.get("result", {}).get("document", {}).get("file_id")
+
+
+def _cached_file_id(key):
+    if os.getenv("REUSE_TELEGRAM_FILE_IDS", "true").lower() != "true":
+        return None
+    return get_file_id_store().get(key)
+
+
+def send_pdf_document(pdf_data, found_pages, caption, chat_id=None):
+    """
+    Envía un PDF (o el extracto de sus páginas) a un chat
+
+    Si el mismo documento ya se subió antes se reenvía por su file_id de
+    Telegram en lugar de volver a subir el archivo.
+
+    Args:
+        pdf_data: Información del PDF
+        found_pages: Páginas con coincidencias para este chat
+        caption: Descripción del documento
+        chat_id: Chat destino (opcional, default: TELEGRAM_CHAT_ID)
+
+    Returns:
+        str: Nombre del archivo enviado
+    """
+    pages = excerpt_pages(pdf_data, found_pages)
+    key = document_key(pdf_data["sha256"], pages)
+    file_id = _cached_file_id(key)
+    if file_id:
+        with stage("telegram_send"):
+            response = bot_send_document(None, None, _excerpt_caption(pdf_data, pages, caption), chat_id, file_id=file_id)
+        if response.get("ok"):
+            return excerpt_filename(pdf_data["filename"]) if pages else pdf_data["filename"]
+        print(f"Telegram rechazó el file_id guardado, se vuelve a subir el archivo: {response.get('description')}")
+        get_file_id_store().discard(key)
+
+    with stage("pdf_excerpt"):
+        content, filename, pages = prepare_document(pdf_data, pages)
+    try:
+        with stage("telegram_send"):
+            response = bot_send_document(content, filename, _excerpt_caption(pdf_data, pages, caption), chat_id)
+    finally:
+        _close_upload(content)
+
+    if not response.get("ok"):
+        raise RuntimeError(response.get("description", "Telegram rechazó el documento"))
+
+    file_id = _uploaded_file_id(response)
+    if file_id:
+        get_file_id_store().set(document_key(pdf_data["sha256"], pages), file_id)
+    return filename
+
+
+def _new_match_pages(diff, terms, url):
+    return sorted({page for term in terms for page in diff["new_matches"].get(term, {}).get(url, [])})
+
+
+def plan_delivery(result, edition, send_pdf=True, diff=None, fingerprint=None):
+    """
+    Prepara el mensaje (y los PDFs, si aplica) para cada suscriptor
+
+    Con diff (la misma edición que el reporte anterior), cada chat recibe
+    sólo los cambios que le corresponden: PDFs o páginas nuevas y coincidencias
+    nuevas de sus términos; los PDFs se envían sólo si tienen coincidencias
+    nuevas. Los chats sin cambios no reciben nada.
+
+    Args:
+        result: Mensaje general devuelto por diario_scraping
+        edition: Edición con los PDFs procesados (o None si no hay PDF para enviar)
+        send_pdf: Si se deben enviar los PDFs a los chats con coincidencias
+        diff: Cambios respecto al reporte anterior (opcional, ver fingerprints.diff_fingerprints)
+        fingerprint: Huella de esta ejecución, necesaria con diff
+
+    Returns:
+        list: Diccionarios con chat_id, message y documents (PDF, páginas encontradas y caption a enviar)
+    """
+    update = diff is not None and not diff["new_edition"]
+    subscriptions = load_subscriptions()
+    if not subscriptions:
+        # Sin chats configurados bot_send_text reporta la configuración faltante
+        subscriptions = {None: get_watched_terms()}
+
+    plan = []
+    for chat_id, terms in subscriptions.items():
+        message = format_edition_report(edition, terms) if edition else result
+        if update:
+            changes = describe_diff(diff, fingerprint, terms)
+            if not changes:
+                continue
+            message = f"🔄 Cambios desde el último reporte:\n{changes}\n\n{message}"
+
+        documents = []
+        for pdf_data in (edition["pdfs"] if edition and send_pdf else []):
+            chat_pages = subscriber_found_pages(pdf_data, terms)
+            if not chat_pages:
+                continue
+            if update and not _new_match_pages(diff, terms, pdf_data["url"]):
+                continue
+            found_terms = [term for term in terms if pdf_data["matches"].get(term)]
+            caption = f"📄 {source_prefix(edition)}PDF del Diario Oficial - Texto '{', '.join(found_terms)}' encontrado en páginas: {chat_pages}"
+            documents.append({"pdf": pdf_data, "pages": chat_pages, "caption": caption})
+
+        plan.append({"chat_id": chat_id, "message": message, "documents": documents})
+    return plan
+
+
+def deliver_report(result, edition, send_pdf=True, dedupe=True, diff=None, fingerprint=None):
+    """
+    Envía el resultado a cada suscriptor, reportando sólo sus propios términos
+
+    Los chats se atienden en paralelo respetando los límites de Telegram. Con
+    dedupe, un mismo reporte o PDF no se envía dos veces al mismo chat dentro
+    de TELEGRAM_DEDUP_SECONDS (p. ej. si el horario y el modo de vigilancia
+    procesan la misma edición).
+
+    Args:
+        result: Mensaje general devuelto por diario_scraping
+        edition: Edición con los PDFs procesados (o None si no hay PDF para enviar)
+        send_pdf: Si se deben enviar los PDFs a los chats con coincidencias
+        dedupe: Omitir los envíos repetidos recientemente (False en los envíos manuales)
+        diff: Cambios respecto al reporte anterior, para enviar sólo lo nuevo (opcional)
+        fingerprint: Huella de esta ejecución (con diff)
+
+    Returns:
+        dict: PDFs enviados, errores de envío de PDFs y de mensajes por chat y
+            envíos omitidos por duplicados
+    """
+    delivery = {"pdf_sent": [], "pdf_errors": {}, "text_errors": {}, "deduplicated": 0}
+    telegram = get_telegram_api()
+    lock = threading.Lock()
+
+    def send_message(chat_id, message):
+        # La hora de ejecución no cuenta para saber si el reporte es el mismo
+        key = f"text:{chat_id}:{message.replace(edition['date_now'], '') if edition else message}"
+        if dedupe and not telegram.claim(key):
+            with lock:
+                delivery["deduplicated"] += 1
+            return
+        try:
+            response = bot_send_text(message, chat_id)
+        except Exception as e:
+            telegram.release(key)
+            with lock:
+                delivery["text_errors"][chat_id] = str(e)
+            raise
+        if not response.get("ok"):
+            telegram.release(key)
+            with lock:
+                delivery["text_errors"][chat_id] = response.get("description", "Telegram rechazó el mensaje")
+
+    def send_document(chat_id, document):
+        pdf_data = document["pdf"]
+        key = f"document:{chat_id}:{pdf_data['sha256']}:{document['pages']}"
+        if dedupe and not telegram.claim(key):
+            with lock:
+                delivery["deduplicated"] += 1
+            return
+        try:
+            filename = send_pdf_document(pdf_data, document["pages"], document["caption"], chat_id)
+            with lock:
+                delivery["pdf_sent"].append((chat_id, filename))
+            print(f"PDF enviado exitosamente: {filename}")
+        except Exception as e:
+            telegram.release(key)
+            print(f"Error enviando PDF: {e}")
+            with lock:
+                delivery["pdf_errors"][chat_id] = str(e)
+            bot_send_text(f"⚠️ Error enviando PDF: {str(e)}", chat_id)
+
+    tasks = {}
+    for item in plan_delivery(result, edition, send_pdf, diff, fingerprint):
+        chat_id = item["chat_id"]
+        chat_tasks = tasks.setdefault(chat_id, [])
+        chat_tasks.append(lambda chat_id=chat_id, message=item["message"]: send_message(chat_id, message))
+        for document in item["documents"]:
+            chat_tasks.append(lambda chat_id=chat_id, document=document: send_document(chat_id, document))
+
+    with stage("telegram_send"):
+        results = deliver_all(tasks)
+
+    for chat_id, chat_results in results.items():
+        for error in chat_results:
+            if isinstance(error, Exception):
+                print(f"Error enviando al chat {chat_id}: {error}")
+
+    return delivery
+
+
+async def deliver_report_async(result, edition, send_pdf=True, dedupe=True):
+    """Versión para los endpoints de FastAPI: el envío corre fuera del event loop"""
+    return await asyncio.to_thread(deliver_report, result, edition, send_pdf, dedupe)
+
+
+def backfill_edition(day):
+    """
+    Procesa la edición de una fecha pasada para el backfill (sin enviar mensajes)
+
+    Returns:
+        dict: Resumen persistible de la edición
+    """
+    result, edition = diario_scraping(day)
+    if edition is None:
+        if "No PDF encontrado" in result:
+            return {"status": "no_pdf"}
+        raise RuntimeError(result)
+    # El backfill no envía los PDFs: se liberan en cuanto se resume la edición
+    release_edition(edition)
+    return summarize_edition(edition)
+
+
+def run_backfill(start, end, concurrency=None, delay_seconds=None):
+    """
+    Busca los términos vigilados en las ediciones de un rango de fechas
+
+    Args:
+        start: Primera fecha (date)
+        end: Última fecha (date, incluida)
+        concurrency: Ediciones procesadas a la vez (opcional)
+        delay_seconds: Intervalo mínimo entre ediciones (opcional)
+
+    Returns:
+        dict: Resumen del backfill con las fechas donde hubo coincidencias
+    """
+    backfill = Backfill(backfill_edition, get_watched_terms(), concurrency, delay_seconds)
+    return backfill.run(start, end)
+
+
+# Evita enviar dos veces el mismo resumen si varias fuentes reportan a la vez
+retro_alerts_lock = threading.Lock()
 
-    return format_result, None  # Devolver None cuando no hay PDF para enviar
+
+def send_retroactive_alerts():
+    """
+    Envía a cada chat un resumen de los diarios anteriores donde aparecen sus términos nuevos
+
+    Los términos se buscan en el índice de texto completo, sin descargar PDFs.
+    """
+    if os.getenv("RETRO_ALERTS", "true").lower() != "true":
+        return
+
+    with retro_alerts_lock:
+        _send_retroactive_alerts()
+
+
+def _send_retroactive_alerts():
+    tracker = get_term_tracker()
+    try:
+        digests = build_digests(load_subscriptions(), get_search_index(), tracker)
+    except Exception as e:
+        print(f"Error buscando términos nuevos en el índice: {e}")
+        return
+
+    for chat_id, terms, message in digests:
+        print(f"Enviando resultados anteriores de {len(terms)} término(s) nuevo(s) al chat {chat_id}")
+        try:
+            bot_send_text(message, chat_id)
+        except Exception as e:
+            print(f"Error enviando resultados anteriores: {e}")
+            continue
+        tracker.mark_known(chat_id, terms)
+
+
+# Pool compartido donde corren los reportes de todas las fuentes
+_source_executor = None
+_source_executor_lock = threading.Lock()
+
+
+def get_source_executor():
+    """Pool de hilos de los reportes por fuente (SOURCE_CONCURRENCY a la vez)"""
+    global _source_executor
+
+    with _source_executor_lock:
+        if _source_executor is None:
+            _source_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(os.getenv("SOURCE_CONCURRENCY", "4"))),
+                thread_name_prefix="source-report",
+            )
+        return _source_executor
+
+
+def run_source_report(source):
+    """Ejecuta el reporte de una fuente en el pool compartido y espera a que termine"""
+    return get_source_executor().submit(report_source, source).result()
 
 
 def report():
-    """Ejecuta el reporte de scraping y envía el resultado al bot de Telegram"""
-    result, pdf_data = diario_scraping()
+    """Ejecuta el reporte de todas las fuentes a la vez y envía los resultados al bot de Telegram"""
+    sources = load_sources()
+    futures = [get_source_executor().submit(report_source, source) for source in sources]
+
+    # Todas las fuentes terminan aunque alguna falle; el primer error se propaga al final
+    errors = []
+    for source, future in zip(sources, futures):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error en el reporte de {source.name}: {e}")
+            errors.append(e)
+    if errors:
+        raise errors[0]
+
+
+def report_source(source):
+    """
+    Ejecuta el reporte de scraping de una fuente y envía el resultado al bot de Telegram
+
+    Con varias réplicas sólo la que toma el lease de la fuente ejecuta el
+    reporte; las demás lo omiten (ver coordination.py).
+    """
+    with coordination.Lease(f"report:{source.name}") as lease:
+        if not lease.acquired:
+            print(f"El reporte de {source.name} ya se está ejecutando en otra réplica, se omite")
+            return
+        with metrics.track_run("report", source=source.name):
+            _report(source)
+
+
+def report_summary(source, result, edition):
+    """Resumen del reporte que se publica para las demás réplicas (GET /report/latest)"""
+    timezone = pytz.timezone(os.getenv("TIMEZONE", "America/Merida"))
+    return {
+        "source": source.name,
+        "node": coordination.node_id(),
+        "finished_at": datetime.now(timezone).isoformat(),
+        "result": result,
+        "edition": summarize_edition(edition) if edition else None,
+    }
+
+
+def _report(source):
+    send_retroactive_alerts()
+
+    # La huella del reporte anterior evita volver a leer los PDFs sin cambios; con
+    # varias réplicas se usa la más reciente entre la local y la publicada
+    fingerprints = get_fingerprint_store(source)
+    previous = latest_fingerprint(fingerprints.load(), coordination.latest_result(f"fingerprint:{source.name}"))
+    result, edition = diario_scraping(previous=previous, source=source)
+    try:
+        _deliver_source_report(source, fingerprints, previous, result, edition)
+    finally:
+        release_edition(edition)
+
+
+def _deliver_source_report(source, fingerprints, previous, result, edition):
     print(result)
     
-    # Envía el resultado al bot de Telegram
-    bot_send_text(result)
-    
     # Verificar si se debe enviar el PDF automáticamente
     send_pdf = os.getenv("SEND_PDF_WHEN_FOUND", "true").lower() == "true"
+
+    fingerprint = diff = None
+    if edition is not None:
+        fingerprint = build_fingerprint(edition)
+        if os.getenv("REPORT_ONLY_CHANGES", "true").lower() == "true":
+            diff = diff_fingerprints(previous, fingerprint)
+            if not diff["changed"]:
+                print(f"Sin cambios desde el último reporte de {source.name}, no se envían mensajes")
+                return
     
-    # Si se encontró el texto, hay datos del PDF y está habilitado el envío automático
-    if pdf_data and pdf_data["found"] and send_pdf:
-        try:
-            caption = f"📄 PDF del Diario Oficial - Texto '{pdf_data['search_text']}' encontrado en páginas: {pdf_data['found_pages']}"
-            bot_send_document(
-                pdf_content=pdf_data["pdf_content"],
-                filename=pdf_data["filename"],
-                caption=caption
-            )
-            print(f"PDF enviado exitosamente: {pdf_data['filename']}")
-        except Exception as e:
-            print(f"Error enviando PDF: {e}")
-            bot_send_text(f"⚠️ Error enviando PDF: {str(e)}")
-    elif pdf_data and pdf_data["found"] and not send_pdf:
-        print(f"Texto encontrado pero envío de PDF deshabilitado. Archivo: {pdf_data['filename']}")
+    # Envía el resultado a cada suscriptor (y los PDFs donde se encontraron sus términos)
+    delivery = deliver_report(result, edition, send_pdf, diff=diff, fingerprint=fingerprint)
+
+    coordination.publish_result(f"report:{source.name}", report_summary(source, result, edition))
+
+    # Con errores de envío se conserva la huella anterior para reintentar en el siguiente reporte
+    failed_chats = sorted(set(delivery["pdf_errors"]) | set(delivery["text_errors"]), key=str)
+    if failed_chats:
+        print(f"Errores de envío de {source.name} a {', '.join(map(str, failed_chats))}; se conserva la huella anterior")
+    elif fingerprint is not None:
+        fingerprints.save(fingerprint)
+        coordination.publish_result(f"fingerprint:{source.name}", fingerprint)
+
+    if edition and edition["found"] and not send_pdf:
+        filenames = ", ".join(pdf["filename"] for pdf in edition["pdfs"] if pdf["found"])
+        print(f"Texto encontrado pero envío de PDF deshabilitado. Archivo(s): {filenames}")
+
+
+_command_handler = None
+_command_handler_lock = threading.Lock()
+
+
+def get_command_handler():
+    """Devuelve el manejador de comandos de Telegram, creándolo si es necesario"""
+    global _command_handler
+
+    with _command_handler_lock:
+        if _command_handler is None:
+            _command_handler = CommandHandler(get_search_index(), get_subscription_store(), load_subscriptions)
+        return _command_handler
+
+
+def handle_telegram_update(update):
+    """Responde un comando recibido por Telegram (webhook o long polling)"""
+    reply = get_command_handler().handle_update(update)
+    if reply is None:
+        return
+
+    print(f"Comando /{reply['command']} del chat {reply['chat_id']}")
+    bot_send_text(reply["text"], reply["chat_id"])
+
+    # Un término recién suscrito recibe de inmediato sus resultados anteriores
+    if reply["command"] == "suscribir":
+        send_retroactive_alerts()
+
+
+def _telegram_bot_url():
+    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not bot_token:
+        raise ValueError("TELEGRAM_BOT_TOKEN debe estar configurado en el archivo .env")
+    return f"{_telegram_api_url()}/bot{bot_token}"
+
+
+def webhook_secret():
+    """
+    Token secreto que Telegram envía en cada update del webhook
+
+    TELEGRAM_WEBHOOK_SECRET, o uno derivado de TELEGRAM_BOT_TOKEN: es igual
+    en todas las réplicas y nadie sin el token del bot puede calcularlo, así
+    que el webhook nunca queda abierto a cualquier POST.
+
+    Returns:
+        str: El token, o None si no hay secreto ni token del bot
+    """
+    secret = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    if secret:
+        return secret
+    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not bot_token:
+        return None
+    return hmac.new(bot_token.encode(), b"telegram-webhook", hashlib.sha256).hexdigest()
+
+
+def set_telegram_webhook(webhook_url):
+    """Registra la URL pública a la que Telegram enviará los mensajes del bot (siempre con token secreto)"""
+    data = {
+        "url": webhook_url,
+        "allowed_updates": '["message", "edited_message"]',
+        "secret_token": webhook_secret(),
+    }
+
+    response = http_client.request("POST", f"{_telegram_bot_url()}/setWebhook", data=data)
+    body = response.json()
+    if not body.get("ok"):
+        raise RuntimeError(body.get("description", "setWebhook falló"))
 
 
 # Endpoints de FastAPI
 @app.get("/health")
 async def health_check():
-    """Endpoint de health check"""
+    """Endpoint de health check (liveness): responde en cuanto el servidor acepta conexiones"""
     return {"status": "healthy", "service": "telegram-bot"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 cuando terminó el arranque en segundo plano (reporte inicial incluido), 503 mientras tanto"""
+    status = warmup_status()
+    if status["status"] != "ready":
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
 @app.get("/")
 async def root():
     """Endpoint raíz con información de la API"""
@@ -255,44 +1158,119 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "run_report": "/run-report",
             "send_pdf": "/send-pdf",
+            "latest_report": "/report/latest",
+            "jobs": "/jobs/{job_id}",
             "status": "/status"
         }
     }
 
 
-@app.post("/run-report")
-async def run_report_endpoint():
-    """Ejecuta manualmente el reporte de scraping"""
+def current_gazette_key():
+    """Clave del diario del día (fecha en la zona horaria configurada)"""
+    timezone = os.getenv("TIMEZONE", "America/Merida")
+    return datetime.now(pytz.timezone(timezone)).strftime("%Y-%m-%d")
+
+
+async def scrape_gazette(gazette_key, source=None):
+    """
+    Scraping del diario compartido entre los trabajos simultáneos del mismo día (y de la misma fuente)
+
+    Cada trabajo recibe la edición con sus PDFs fijados en la caché y debe
+    liberarlos con release_edition al terminar.
+    """
+    key = f"scrape:{gazette_key}"
+    # El trabajo que inicia el scraping se queda con los pins de la descarga; los que se suman agregan los suyos
+    joined = job_manager.is_shared(key)
+    result, edition = await job_manager.shared(key, lambda: diario_scraping_async(source=source))
+    if joined:
+        hold_edition(edition)
+    return result, edition
+
+
+def resolve_source(name):
+    """
+    Fuente pedida en un endpoint y clave de sus trabajos
+
+    Returns:
+        tuple: (GazetteSource o None para la principal, clave del diario del día o None)
+    """
+    if name is None:
+        return None, None
+    source = get_source(name)
+    if source is None:
+        raise HTTPException(status_code=404, detail=f"Fuente no configurada: {name}")
+    if is_primary_source(source):
+        return None, None
+    return source, f"{source.name}:{current_gazette_key()}"
+
+
+async def submit_job(kind, factory, wait=False, key=None):
+    """
+    Encola un trabajo para el diario del día y devuelve su ID
+
+    Args:
+        kind: Tipo de trabajo
+        factory: Función que recibe la clave del diario y devuelve la corrutina
+        wait: Esperar a que termine y devolver su resultado
+        key: Clave del trabajo (opcional, default: la fecha del diario del día)
+
+    Returns:
+        dict: ID y estado del trabajo, o su resultado si wait es True
+    """
+    gazette_key = key or current_gazette_key()
+    job, coalesced = job_manager.submit(kind, gazette_key, lambda: factory(gazette_key))
+
+    if wait:
+        await asyncio.shield(job.task)
+        if job.result is not None:
+            return job.result
+        return {"status": "error", "message": job.error, "job_id": job.id}
+
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "coalesced": coalesced,
+        "job_url": f"/jobs/{job.id}"
+    }
+
+
+async def run_report_job(gazette_key, source=None):
+    """Ejecuta el reporte de scraping y lo envía a los suscriptores"""
     try:
-        result, pdf_data = diario_scraping()
-        bot_send_text(result)
+        await asyncio.to_thread(send_retroactive_alerts)
+        result, edition = await scrape_gazette(gazette_key, source)
+        # Un reporte pedido a mano siempre se envía, aunque sea igual al último
+        try:
+            delivery = await deliver_report_async(result, edition, dedupe=False)
+        finally:
+            release_edition(edition)
         
-        # Si se encontró el texto y hay datos del PDF, enviar el PDF también
-        if pdf_data and pdf_data["found"]:
-            try:
-                caption = f"📄 PDF del Diario Oficial - Texto '{pdf_data['search_text']}' encontrado en páginas: {pdf_data['found_pages']}"
-                bot_send_document(
-                    pdf_content=pdf_data["pdf_content"],
-                    filename=pdf_data["filename"],
-                    caption=caption
-                )
-                return {
-                    "status": "success",
-                    "message": "Reporte ejecutado exitosamente y PDF enviado",
-                    "result": result,
-                    "pdf_sent": True,
-                    "pdf_filename": pdf_data["filename"]
-                }
-            except Exception as e:
-                bot_send_text(f"⚠️ Error enviando PDF: {str(e)}")
-                return {
-                    "status": "partial_success",
-                    "message": "Reporte ejecutado pero error enviando PDF",
-                    "result": result,
-                    "pdf_error": str(e)
-                }
+        # Si se encontró el texto y hay datos de los PDFs, los PDFs también se enviaron
+        if delivery["pdf_errors"]:
+            return {
+                "status": "partial_success",
+                "message": "Reporte ejecutado pero error enviando PDF",
+                "result": result,
+                "pdf_error": "; ".join(delivery["pdf_errors"].values())
+            }
+        elif delivery["text_errors"]:
+            return {
+                "status": "partial_success",
+                "message": "Reporte ejecutado pero error enviando mensajes",
+                "result": result,
+                "text_error": "; ".join(delivery["text_errors"].values())
+            }
+        elif delivery["pdf_sent"]:
+            return {
+                "status": "success",
+                "message": "Reporte ejecutado exitosamente y PDF enviado",
+                "result": result,
+                "pdf_sent": True,
+                "pdf_filename": ", ".join(sorted({filename for _, filename in delivery["pdf_sent"]}))
+            }
         else:
             return {
                 "status": "success",
@@ -307,47 +1285,187 @@ async def run_report_endpoint():
         }
 
 
-@app.post("/send-pdf")
-async def send_pdf_endpoint():
-    """Descarga y envía manualmente el PDF del día al chat de Telegram"""
+async def send_pdf_job(gazette_key, source=None):
+    """Descarga y envía los PDFs del día al chat de Telegram"""
     try:
-        result, pdf_data = diario_scraping()
-        
-        if pdf_data and pdf_data.get("pdf_content"):
-            try:
+        result, edition = await scrape_gazette(gazette_key, source)
+        try:
+            return await _send_edition_pdfs(edition)
+        finally:
+            release_edition(edition)
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error procesando solicitud: {str(e)}"
+        }
+
+
+async def _send_edition_pdfs(edition):
+    """Envía al chat los PDFs de una edición ya descargada"""
+    if edition and edition["pdfs"]:
+        try:
+            for pdf_data in edition["pdfs"]:
                 # Determinar el caption basado en si se encontró el texto o no
                 if pdf_data["found"]:
-                    caption = f"📄 PDF del Diario Oficial - Texto '{pdf_data['search_text']}' encontrado en páginas: {pdf_data['found_pages']}"
+                    caption = f"📄 {source_prefix(edition)}PDF del Diario Oficial - Texto '{pdf_data['search_text']}' encontrado en páginas: {pdf_data['found_pages']}"
                 else:
-                    caption = f"📄 PDF del Diario Oficial - Envío manual (Texto '{pdf_data['search_text']}' no encontrado)"
+                    caption = f"📄 {source_prefix(edition)}PDF del Diario Oficial - Envío manual (Texto '{pdf_data['search_text']}' no encontrado)"
                 
-                bot_send_document(
-                    pdf_content=pdf_data["pdf_content"],
-                    filename=pdf_data["filename"],
-                    caption=caption
-                )
-                return {
-                    "status": "success",
-                    "message": "PDF enviado exitosamente",
-                    "filename": pdf_data["filename"],
-                    "text_found": pdf_data["found"],
-                    "found_pages": pdf_data.get("found_pages", [])
-                }
-            except Exception as e:
-                return {
-                    "status": "error",
-                    "message": f"Error enviando PDF: {str(e)}"
-                }
-        else:
+                with stage("telegram_send"):
+                    await asyncio.to_thread(send_pdf_document, pdf_data, pdf_data["found_pages"], caption)
+            return {
+                "status": "success",
+                "message": "PDF enviado exitosamente",
+                "filename": ", ".join(pdf["filename"] for pdf in edition["pdfs"]),
+                "text_found": edition["found"],
+                "found_pages": {pdf["filename"]: pdf["found_pages"] for pdf in edition["pdfs"]}
+            }
+        except Exception as e:
             return {
                 "status": "error",
-                "message": "No se pudo obtener el PDF del sitio web"
+                "message": f"Error enviando PDF: {str(e)}"
             }
-    except Exception as e:
+    else:
         return {
             "status": "error",
-            "message": f"Error procesando solicitud: {str(e)}"
+            "message": "No se pudo obtener el PDF del sitio web"
+        }
+
+
+async def run_with_report_lease(source, job):
+    """
+    Ejecuta un trabajo manual con el lease del reporte de la fuente en las réplicas api
+
+    Una réplica api no ejecuta los reportes programados, pero un trabajo manual
+    descarga y envía igual que ellos: con el lease no se cruza con el reporte
+    de un worker. Si otro lo tiene, se responde con el último reporte publicado
+    en lugar de repetir el envío. En un worker el trabajo corre sin lease.
+
+    Args:
+        source: Fuente del trabajo (None para la principal)
+        job: Función sin argumentos que devuelve la corrutina del trabajo
+
+    Returns:
+        dict: Resultado del trabajo, o el último reporte publicado si la fuente está ocupada
+    """
+    if node_role() != "api":
+        return await job()
+
+    name = (source or get_source()).name
+    lease = coordination.Lease(f"report:{name}")
+    if not await asyncio.to_thread(lease.acquire):
+        return {
+            "status": "running_elsewhere",
+            "message": f"El reporte de {name} se está ejecutando en otra réplica",
+            "latest": await asyncio.to_thread(coordination.latest_result, f"report:{name}")
         }
+    try:
+        return await job()
+    finally:
+        await asyncio.to_thread(lease.release)
+
+
+@app.post("/run-report")
+async def run_report_endpoint(wait: bool = False, source: str = None):
+    """Encola manualmente el reporte de scraping (de la fuente principal o de la indicada) y devuelve el ID del trabajo"""
+    gazette_source, key = resolve_source(source)
+    return await submit_job(
+        "run-report",
+        lambda key: run_with_report_lease(gazette_source, lambda: run_report_job(key, gazette_source)),
+        wait,
+        key=key
+    )
+
+
+@app.post("/send-pdf")
+async def send_pdf_endpoint(wait: bool = False, source: str = None):
+    """Encola la descarga y envío manual del PDF del día (de la fuente principal o de la indicada) al chat de Telegram"""
+    gazette_source, key = resolve_source(source)
+    return await submit_job(
+        "send-pdf",
+        lambda key: run_with_report_lease(gazette_source, lambda: send_pdf_job(key, gazette_source)),
+        wait,
+        key=key
+    )
+
+
+@app.post("/backfill")
+async def backfill_endpoint(start: str, end: str, wait: bool = False):
+    """Encola la búsqueda de los términos vigilados en las ediciones de un rango de fechas"""
+    try:
+        start_date, end_date = parse_date(start), parse_date(end)
+        date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Rango de fechas inválido: {e}")
+
+    return await submit_job(
+        "backfill",
+        lambda key: asyncio.to_thread(run_backfill, start_date, end_date),
+        wait,
+        key=f"{start_date.isoformat()}:{end_date.isoformat()}"
+    )
+
+
+@app.get("/search")
+async def search_endpoint(q: str, limit: int = 20, since: str = None):
+    """Busca en el texto de todos los diarios procesados, ordenado por relevancia"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="La búsqueda no puede estar vacía")
+    if since:
+        try:
+            parse_date(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Fecha inválida (se espera AAAA-MM-DD): {since}")
+
+    started = time.perf_counter()
+    hits = await asyncio.to_thread(get_search_index().search, q, min(max(limit, 1), 100), since)
+    return {
+        "query": q,
+        "total": len(hits),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "hits": hits
+    }
+
+
+@app.post("/telegram/webhook")
+async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
+    """Recibe los mensajes del bot enviados por Telegram y responde sus comandos"""
+    # Sin secreto no hay forma de saber que el update viene de Telegram
+    secret = webhook_secret()
+    received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if secret is None or not hmac.compare_digest(received.encode(), secret.encode()):
+        raise HTTPException(status_code=403, detail="Token secreto inválido")
+
+    try:
+        update = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El cuerpo debe ser un update de Telegram en JSON")
+
+    # Se responde de inmediato; Telegram reintenta los updates si tardamos demasiado
+    background_tasks.add_task(handle_telegram_update, update)
+    return {"ok": True}
+
+
+@app.get("/report/latest")
+async def latest_report_endpoint(source: str = None):
+    """Último reporte de una fuente publicado por cualquier réplica, sin volver a descargar el diario"""
+    gazette_source = get_source(source)
+    if gazette_source is None:
+        raise HTTPException(status_code=404, detail=f"Fuente no configurada: {source}")
+
+    latest = await asyncio.to_thread(coordination.latest_result, f"report:{gazette_source.name}")
+    if latest is None:
+        raise HTTPException(status_code=404, detail=f"Todavía no hay un reporte de {gazette_source.name}")
+    return latest
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Consulta el estado, los tiempos por etapa y el resultado de un trabajo"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    return job.to_dict()
 
 
 @app.get("/status")
@@ -356,83 +1474,251 @@ async def get_status():
     timezone = os.getenv("TIMEZONE", "America/Merida")
     tz = pytz.timezone(timezone)
     current_time = datetime.now(tz)
+
+    schedules = {}
+    if scheduler is not None:
+        for number, (schedule, next_run) in enumerate(scheduler.next_runs(current_time), 1):
+            schedules[f"schedule_{number}"] = {
+                "cron": schedule.expression,
+                "next_run": next_run.isoformat()
+            }
     
-    return {
+    sources = {}
+    for source in load_sources():
+        source_scheduler = schedulers.get(source.name)
+        sources[source.name] = {
+            **source.to_dict(),
+            "next_runs": [
+                next_run.isoformat() for _, next_run in source_scheduler.next_runs(current_time)
+            ] if source_scheduler is not None else [],
+        }
+
+    status = {
         "status": "running",
         "current_time": current_time.isoformat(),
         "timezone": timezone,
-        "schedules": {
-            "schedule_1": f"{os.getenv('SCHEDULE_HOUR_1', '7')}:{os.getenv('SCHEDULE_MINUTE_1', '30')}",
-            "schedule_2": f"{os.getenv('SCHEDULE_HOUR_2', '12')}:{os.getenv('SCHEDULE_MINUTE_2', '0')}"
-        }
+        "schedules": schedules,
+        "sources": sources,
+        "node": {
+            "id": coordination.node_id(),
+            "role": node_role(),
+            "coordination": os.getenv("COORDINATION_BACKEND", "memory").lower()
+        },
+        "warmup": warmup_status(),
+        "delivery": get_telegram_api().metrics(),
+        **metrics.summary()
     }
 
+    if watcher is not None:
+        status["watch"] = {
+            "in_window": watcher.in_window(current_time),
+            "next_check_seconds": round(watcher.next_interval(current_time)),
+            "fingerprint": watcher.last_fingerprint
+        }
+
+    return status
 
-def should_run_at_merida_time(target_hour, target_minute):
-    """Verifica si es hora de ejecutar según la zona horaria de Mérida"""
-    merida_tz = pytz.timezone("America/Merida")
-    now_merida = datetime.now(merida_tz)
-    return now_merida.hour == target_hour and now_merida.minute == target_minute
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas del pipeline en formato de texto de Prometheus"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-def run_scheduler():
-    """Ejecuta el scheduler en un hilo separado usando zona horaria configurada"""
-    last_run_schedule_1 = None
-    last_run_schedule_2 = None
-    
-    # Obtener configuración de horarios desde variables de entorno
-    schedule_hour_1 = int(os.getenv("SCHEDULE_HOUR_1", "7"))
-    schedule_minute_1 = int(os.getenv("SCHEDULE_MINUTE_1", "30"))
-    schedule_hour_2 = int(os.getenv("SCHEDULE_HOUR_2", "12"))
-    schedule_minute_2 = int(os.getenv("SCHEDULE_MINUTE_2", "0"))
-    timezone = os.getenv("TIMEZONE", "America/Merida")
 
-    while True:
-        tz = pytz.timezone(timezone)
-        now_tz = datetime.now(tz)
-        current_date = now_tz.strftime("%Y-%m-%d")
+# Hilos de los schedulers (uno por fuente)
+scheduler_threads = []
+
+# Vigilante de nuevas ediciones (sólo con WATCH_MODE=true)
+watcher = None
+watcher_thread = None
 
-        # Verificar primer horario configurado
-        if (
-            now_tz.hour == schedule_hour_1
-            and now_tz.minute == schedule_minute_1
-            and last_run_schedule_1 != current_date
-        ):
-            timezone_name = timezone.split("/")[-1]
-            print(f"Ejecutando reporte a las {schedule_hour_1:02d}:{schedule_minute_1:02d} hora de {timezone_name} ({now_tz})")
-            report()
-            last_run_schedule_1 = current_date
+# Long polling de los comandos de Telegram (sólo sin webhook y con TELEGRAM_POLLING=true)
+poller = None
+poller_thread = None
 
-        # Verificar segundo horario configurado
-        if (
-            now_tz.hour == schedule_hour_2
-            and now_tz.minute == schedule_minute_2
-            and last_run_schedule_2 != current_date
-        ):
-            timezone_name = timezone.split("/")[-1]
-            print(f"Ejecutando reporte a las {schedule_hour_2:02d}:{schedule_minute_2:02d} hora de {timezone_name} ({now_tz})")
-            report()
-            last_run_schedule_2 = current_date
+# Arranque en segundo plano (GET /ready): el servidor acepta conexiones de
+# inmediato y el calentamiento y el reporte inicial corren después
+warmup = {"status": "pending", "started_at": None, "finished_at": None, "steps": {}}
+warmup_lock = threading.Lock()
+warmup_task = None
+# Se activa al detener el servicio para no iniciar más etapas del arranque
+stopping = threading.Event()
 
-        time.sleep(60)  # Verificar cada minuto
 
+def warmup_status():
+    """Copia del estado del arranque para /ready y /status"""
+    with warmup_lock:
+        return {**warmup, "steps": {name: dict(step) for name, step in warmup["steps"].items()}}
 
-# Variable global para el hilo del scheduler
-scheduler_thread = None
+
+def node_role():
+    """
+    Papel de esta réplica (NODE_ROLE)
+
+    worker (default) ejecuta los reportes y atiende la API; api sólo atiende
+    la API y sirve los resultados publicados por los workers.
+    """
+    return os.getenv("NODE_ROLE", "worker").lower()
+
+
+def _import_heavy_modules():
+    # pypdf y el parser de la página se importan bajo demanda; cargarlos aquí
+    # evita que la primera ejecución pague su importación
+    import bs4  # noqa: F401
+    import pypdf  # noqa: F401
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        pass
+
+
+def start_scheduler():
+    """
+    Inicia un scheduler por fuente, cada uno en un hilo separado
+
+    Cada fuente sigue sus propios horarios; al vencer, su reporte corre en
+    el pool compartido de get_source_executor junto con el de las demás.
+    """
+    global scheduler
+
+    scheduler = None
+    schedulers.clear()
+    scheduler_threads.clear()
+    for source in load_sources():
+        source_scheduler = Scheduler(
+            lambda source=source: run_source_report(source),
+            source.schedules,
+            state_path=os.path.join(get_data_dir(), source.state_name("scheduler_state.json")),
+            claim=lambda key, source=source: coordination.claim(f"schedule:{source.name}:{key}"),
+        )
+        schedulers[source.name] = source_scheduler
+        if scheduler is None:
+            scheduler = source_scheduler
+        thread = threading.Thread(target=source_scheduler.run_forever, daemon=True, name=f"scheduler-{source.name}")
+        thread.start()
+        scheduler_threads.append(thread)
+    print(f"Scheduler iniciado en hilo separado para {len(schedulers)} fuente(s): {', '.join(schedulers)}")
+
+
+def start_watcher():
+    """Inicia el modo de vigilancia de nuevas ediciones (de la fuente principal) en un hilo separado"""
+    global watcher, watcher_thread
+
+    source = get_source()
+    watcher = GazetteWatcher(
+        source.index_url,
+        lambda content: parse_index_page(content, source=source),
+        lambda: run_source_report(source),
+    )
+    watcher_thread = threading.Thread(target=watcher.run_forever, daemon=True)
+    watcher_thread.start()
+    print("Modo de vigilancia iniciado en hilo separado")
+
+
+def register_telegram_webhook():
+    """Registra TELEGRAM_WEBHOOK_URL como webhook del bot (etapa del arranque)"""
+    webhook_url = os.getenv("TELEGRAM_WEBHOOK_URL")
+    if webhook_secret() is None:
+        raise ValueError("El webhook necesita TELEGRAM_BOT_TOKEN (y de preferencia TELEGRAM_WEBHOOK_SECRET)")
+    set_telegram_webhook(webhook_url)
+    print(f"Webhook de Telegram registrado en {webhook_url}")
+
+
+def _warmup_step(name, function):
+    """Ejecuta una etapa del arranque registrando su estado y duración; un error no detiene el arranque"""
+    with warmup_lock:
+        warmup["steps"][name] = {"status": "running", "seconds": None}
+
+    started = time.perf_counter()
+    step = {"status": "succeeded"}
+    try:
+        function()
+    except Exception as e:
+        print(f"Error en la etapa '{name}' del arranque: {e}")
+        step = {"status": "failed", "error": str(e)}
+
+    step["seconds"] = round(time.perf_counter() - started, 3)
+    with warmup_lock:
+        warmup["steps"][name] = step
+
+
+def warm_up():
+    """
+    Arranque del servicio fuera del hook de startup de FastAPI
+
+    Carga los módulos pesados, abre la caché y el índice de búsqueda, ejecuta
+    el reporte inicial y después inicia el scheduler y el vigilante, en el
+    mismo orden en que antes se hacía antes de aceptar conexiones. Con
+    NODE_ROLE=api sólo se preparan la caché y el índice.
+    """
+    with warmup_lock:
+        warmup["status"] = "warming_up"
+        warmup["started_at"] = datetime.now(pytz.utc).isoformat()
+
+    steps = [
+        ("imports", _import_heavy_modules),
+        ("cache", get_cache),
+        ("search_index", get_search_index),
+    ]
+    # setWebhook es una petición bloqueada a Telegram: se hace aquí y no en el hook de startup
+    if os.getenv("TELEGRAM_WEBHOOK_URL"):
+        steps.append(("telegram_webhook", register_telegram_webhook))
+    # Una réplica sólo de API no descarga diarios: sirve lo que publican los workers
+    if node_role() != "api":
+        steps += [
+            ("initial_report", report),
+            ("scheduler", start_scheduler),
+        ]
+        if os.getenv("WATCH_MODE", "false").lower() == "true":
+            steps.append(("watcher", start_watcher))
+
+    for name, function in steps:
+        if stopping.is_set():
+            break
+        if name == "initial_report":
+            print("Ejecutando reporte inicial en segundo plano")
+        _warmup_step(name, function)
+
+    with warmup_lock:
+        warmup["status"] = "stopped" if stopping.is_set() else "ready"
+        warmup["finished_at"] = datetime.now(pytz.utc).isoformat()
+    print(f"Arranque terminado: {warmup['status']}")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Evento que se ejecuta al iniciar la aplicación FastAPI"""
-    global scheduler_thread
-    
-    print("Ejecutando reporte al iniciar servicio FastAPI")
-    report()
-    
-    # Iniciar el scheduler en un hilo separado
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    print("Scheduler iniciado en hilo separado")
+    global poller, poller_thread, warmup_task
+
+    # El reporte inicial no bloquea el arranque: /health responde de inmediato
+    # y /ready indica cuándo terminó el calentamiento
+    stopping.clear()
+    warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+    # Comandos de Telegram: webhook si hay URL pública (se registra en warm_up), si no long polling (opcional)
+    if os.getenv("TELEGRAM_WEBHOOK_URL"):
+        return
+    if os.getenv("TELEGRAM_POLLING", "false").lower() == "true":
+        if not os.getenv("TELEGRAM_BOT_TOKEN"):
+            print("TELEGRAM_POLLING=true pero falta TELEGRAM_BOT_TOKEN; no se reciben comandos de Telegram")
+            return
+        poller = TelegramPoller(_telegram_bot_url(), handle_telegram_update)
+        poller_thread = threading.Thread(target=poller.run_forever, daemon=True)
+        poller_thread.start()
+        print("Recepción de comandos de Telegram (long polling) iniciada en hilo separado")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene el arranque, el scheduler, el vigilante y el long polling, y cierra las conexiones del cliente HTTP asíncrono"""
+    stopping.set()
+    for source_scheduler in schedulers.values():
+        source_scheduler.stop()
+    if watcher is not None:
+        watcher.stop()
+    if poller is not None:
+        poller.stop()
+    await http_client.close_async_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+"""
+Pruebas de la búsqueda retroactiva en ediciones pasadas (backfill.py)
+"""
+
+from datetime import date
+
+import pytest
+
+from backfill import Backfill, date_range, dated_url
+
+
+def test_date_range_y_url():
+    days = date_range(date(2025, 2, 27), date(2025, 3, 2))
+    assert [day.isoformat() for day in days] == ["2025-02-27", "2025-02-28", "2025-03-01", "2025-03-02"]
+    assert dated_url("https://sitio/diario.php", date(2025, 10, 9)) == "https://sitio/diario.php?f=2025-10-9"
+    with pytest.raises(ValueError):
+        date_range(date(2025, 3, 2), date(2025, 3, 1))
+
+
+def test_backfill_reanudable(tmp_path):
+    """Las fechas ya revisadas no se repiten; las que fallaron o les faltan términos sí"""
+    calls = []
+
+    def scrape_day(day):
+        calls.append(day)
+        if day.day == 2 and len(calls) <= 3:
+            raise RuntimeError("timeout")
+        if day.day == 3:
+            return {"status": "no_pdf"}
+        return {
+            "status": "found",
+            "fecha_consulta": day.isoformat(),
+            "pdfs": [{"filename": "a.pdf", "sha256": "x", "total_pages": 2, "matches": {"perez": [2]}}],
+            "errors": [],
+        }
+
+    state_path = str(tmp_path / "backfill.json")
+    start, end = date(2025, 10, 1), date(2025, 10, 3)
+
+    first = Backfill(scrape_day, ["perez"], concurrency=2, delay_seconds=0, state_path=state_path).run(start, end)
+    assert (first["processed"], first["errors"]) == (3, 1)
+    assert list(first["found"]) == ["2025-10-01"]
+    assert first["found"]["2025-10-01"] == {"perez": [{"filename": "a.pdf", "pages": [2]}]}
+
+    # Al reanudar sólo se repite la fecha que falló
+    second = Backfill(scrape_day, ["perez"], delay_seconds=0, state_path=state_path).run(start, end)
+    assert (second["processed"], second["skipped"], second["errors"]) == (1, 2, 0)
+    assert list(second["found"]) == ["2025-10-01", "2025-10-02"]
+
+    # Un término nuevo obliga a revisar todas las fechas otra vez
+    third = Backfill(scrape_day, ["perez", "koyoc"], delay_seconds=0, state_path=state_path).run(start, end)
+    assert third["processed"] == 3
+    assert len(calls) == 7
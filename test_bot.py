@@ -1,110 +1,382 @@
-#!/usr/bin/env python3
 """
-Script de prueba para verificar que el bot funciona correctamente
-antes del despliegue en Render.com
+Pruebas del bot de punta a punta contra un sitio local (sin red)
+
+El servidor de benchmarks/server.py sustituye al sitio del diario oficial y
+sirve la página del diario y PDFs sintéticos.
 """
 
-import requests
-import subprocess
-import time
+import json
+import os
 import threading
-from telegram_bot import diario_scraping, bot_send_text, start_health_server
+import time
 
-def test_scraping():
-    """Prueba la función de scraping"""
-    print("🧪 Probando función de scraping...")
-    try:
-        result = diario_scraping()
-        print(f"✅ Scraping exitoso: {result[:100]}...")
-        return True
-    except Exception as e:
-        print(f"❌ Error en scraping: {e}")
-        return False
+import pytest
+from fastapi.testclient import TestClient
 
-def test_health_endpoint():
-    """Prueba el endpoint de salud"""
-    print("🧪 Probando endpoint de salud...")
-    
-    # Iniciar servidor en hilo separado
-    server_thread = threading.Thread(target=start_health_server, daemon=True)
-    server_thread.start()
-    
-    # Esperar un poco para que el servidor inicie
-    time.sleep(2)
-    
-    try:
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ Endpoint de salud funcionando correctamente")
-            print(f"Respuesta: {response.text}")
-            return True
-        else:
-            print(f"❌ Endpoint devolvió código: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Error probando endpoint: {e}")
-        return False
-
-def test_docker_build():
-    """Prueba la construcción de Docker"""
-    print("🧪 Probando construcción de Docker...")
+import coordination
+import delivery
+import fingerprints
+import gazette_cache
+import search_index
+import subscriptions
+import telegram_bot
+from benchmarks.fixtures import build_gazette_pdf, edition_routes
+from benchmarks.server import GazetteServer
+from pdf_excerpt import prepare_document
+
+DIARIO_PATH = "/gobierno/diario_oficial.php"
+
+
+@pytest.fixture
+def gazette_site(monkeypatch, tmp_path):
+    """Edición con dos secciones; el término aparece en la página 3 de la primera"""
+    pdfs = [build_gazette_pdf(5, hits={3: "KOYOC NOVELO OLIVER"}), build_gazette_pdf(4, seed=1)]
+    routes = edition_routes(DIARIO_PATH, "Mérida, Yuc., Lunes 13 de octubre de 2025", pdfs)
+
+    with GazetteServer(routes) as server:
+        monkeypatch.setenv("BASE_URL", server.base_url)
+        monkeypatch.setenv("DIARIO_URL_PATH", DIARIO_PATH)
+        monkeypatch.setenv("DATA_DIR", str(tmp_path))
+        monkeypatch.setenv("SEARCH_TEXT", "koyoc novelo")
+        monkeypatch.setenv("TELEGRAM_CHAT_ID", "1")
+        monkeypatch.delenv("SUBSCRIPTIONS", raising=False)
+        # Caché, índice y estado nuevos dentro de tmp_path
+        monkeypatch.setattr(gazette_cache, "_cache", None)
+        monkeypatch.setattr(search_index, "_index", None)
+        monkeypatch.setattr(subscriptions, "_store", None)
+        monkeypatch.setattr(fingerprints, "_stores", {})
+        monkeypatch.setattr(delivery, "_api", None)
+        monkeypatch.setattr(coordination, "_store", None)
+        yield server
+
+
+def test_scraping(gazette_site):
+    """Procesa la edición completa y la segunda vez usa las copias en caché (304)"""
+    result, edition = telegram_bot.diario_scraping()
+
+    assert "Lunes 13 de octubre de 2025" in result
+    assert edition["found"] is True
+    assert [pdf["found_pages"] for pdf in edition["pdfs"]] == [[3], []]
+    assert [pdf["total_pages"] for pdf in edition["pdfs"]] == [5, 4]
+    assert search_index.get_search_index().search("koyoc novelo")[0]["page"] == 3
+
+    _, again = telegram_bot.diario_scraping()
+    assert [pdf["found_pages"] for pdf in again["pdfs"]] == [[3], []]
+    assert [status for _, status in gazette_site.requests[-3:]] == [304, 304, 304]
+
+
+def test_download_pdf(gazette_site):
+    """Descarga un PDF suelto y busca los términos vigilados"""
+    pdf_path = next(path for path in gazette_site.routes if path.endswith(".pdf"))
+
+    pdf_data, message = telegram_bot.download_pdf(pdf_path, gazette_site.base_url, "diario.pdf")
+
+    assert pdf_data["found_pages"] == [3]
+    assert pdf_data["filename"] == "diario.pdf"
+    assert "encontrado en 1 página(s): [3]" in message
+
+
+def test_download_pdf_streaming(gazette_site, monkeypatch):
+    """Con PDF_STREAMING el PDF queda en disco y se sube desde un archivo abierto"""
+    monkeypatch.setenv("PDF_STREAMING", "true")
+    pdf_path = next(path for path in gazette_site.routes if path.endswith(".pdf"))
+
+    pdf_data, _ = telegram_bot.download_pdf(pdf_path, gazette_site.base_url, "diario.pdf")
+
+    assert pdf_data["found_pages"] == [3]
+    assert pdf_data["pdf_content"] is None
+
+    content, filename, pages = prepare_document(pdf_data, None)
     try:
-        result = subprocess.run(
-            ["docker", "build", "-t", "telegram-bot-test", "."],
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        if result.returncode == 0:
-            print("✅ Imagen Docker construida exitosamente")
-            return True
-        else:
-            print(f"❌ Error construyendo Docker: {result.stderr}")
-            return False
-    except subprocess.TimeoutExpired:
-        print("❌ Timeout construyendo imagen Docker")
-        return False
-    except FileNotFoundError:
-        print("⚠️  Docker no encontrado, saltando prueba")
-        return True
-    except Exception as e:
-        print(f"❌ Error inesperado con Docker: {e}")
-        return False
-
-def main():
-    """Ejecutar todas las pruebas"""
-    print("🚀 Iniciando pruebas del bot de Telegram\n")
-    
-    tests = [
-        ("Scraping", test_scraping),
-        ("Endpoint de salud", test_health_endpoint),
-        ("Construcción Docker", test_docker_build)
+        assert content.read(5) == b"%PDF-"
+        assert (filename, pages) == ("diario.pdf", None)
+    finally:
+        content.close()
+
+    excerpt, _, pages = prepare_document(pdf_data, [3])
+    excerpt.close()
+    assert pages == [3]
+
+
+def test_report_streaming_cache_chica(gazette_site, monkeypatch):
+    """Un PDF más grande que CACHE_MAX_MB sigue en disco hasta enviarse y se desaloja al terminar el reporte"""
+    monkeypatch.setenv("PDF_STREAMING", "true")
+    monkeypatch.setenv("CACHE_MAX_MB", "0.001")
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    uploads = []
+
+    def send_document(pdf_content, filename, caption="", chat_id=None, file_id=None):
+        content = pdf_content.read() if hasattr(pdf_content, "read") else pdf_content
+        uploads.append((filename, content[:5]))
+        return {"ok": True, "result": {"document": {"file_id": f"id-{len(uploads)}"}}}
+
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: {"ok": True})
+    monkeypatch.setattr(telegram_bot, "bot_send_document", send_document)
+
+    telegram_bot.report()
+
+    assert len(uploads) == 1
+    assert uploads[0][1] == b"%PDF-"
+    cache = gazette_cache.get_cache()
+    assert cache._pinned == {}
+    assert not any(name.endswith(".pdf") for name in os.listdir(cache.directory))
+
+
+def test_report_solo_cambios(gazette_site, monkeypatch):
+    """Un reporte sin cambios no envía nada ni vuelve a leer los PDFs; uno con cambios envía sólo lo nuevo"""
+    sent = []
+    searched = []
+    search_cached_pdf = telegram_bot.search_cached_pdf
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: sent.append(("text", message)) or {"ok": True})
+    monkeypatch.setattr(
+        telegram_bot, "send_pdf_document",
+        lambda pdf_data, pages, caption, chat_id=None: sent.append(("pdf", pdf_data["filename"], pages)) or pdf_data["filename"]
+    )
+    monkeypatch.setattr(
+        telegram_bot, "search_cached_pdf", lambda *args: searched.append(args[1]) or search_cached_pdf(*args)
+    )
+
+    telegram_bot.report()
+    assert [item[0] for item in sent] == ["text", "pdf"]
+    assert len(searched) == 2
+
+    sent.clear()
+    searched.clear()
+    telegram_bot.report()
+    assert sent == []
+    assert searched == []
+
+    # El segundo PDF se corrige y ahora menciona el término en la página 2
+    second_path = sorted(path for path in gazette_site.routes if path.endswith(".pdf"))[1]
+    gazette_site.routes[second_path] = (
+        build_gazette_pdf(4, hits={2: "KOYOC NOVELO OLIVER"}, seed=1), "application/pdf"
+    )
+    telegram_bot.report()
+    assert len(searched) == 1
+    assert sent[0][0] == "text"
+    assert sent[0][1].startswith("🔄 Cambios desde el último reporte")
+    assert "'koyoc novelo' encontrado en diario_oficial_" in sent[0][1]
+    assert sent[1:] == [("pdf", sent[1][1], [2])]
+
+
+def test_report_error_de_texto(gazette_site, monkeypatch, tmp_path):
+    """Si falla el envío del mensaje la huella no se guarda y el siguiente reporte lo reintenta"""
+    sent = []
+    responses = [{"ok": False, "description": "Too Many Requests"}, {"ok": True}]
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: sent.append(message) or responses.pop(0))
+    monkeypatch.setattr(telegram_bot, "send_pdf_document", lambda pdf_data, pages, caption, chat_id=None: pdf_data["filename"])
+
+    telegram_bot.report()
+    assert len(sent) == 1
+    assert not (tmp_path / "last_run_fingerprint.json").exists()
+    assert coordination.latest_result("fingerprint:yucatan") is None
+
+    telegram_bot.report()
+    assert len(sent) == 2
+    assert (tmp_path / "last_run_fingerprint.json").exists()
+
+
+def test_report_varias_fuentes(gazette_site, monkeypatch, tmp_path):
+    """Un mismo proceso reporta dos diarios, cada uno con sus selectores, su prefijo y su propia huella"""
+    sent = []
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: sent.append(("text", message)) or {"ok": True})
+    monkeypatch.setattr(
+        telegram_bot, "send_pdf_document",
+        lambda pdf_data, pages, caption, chat_id=None: sent.append(("pdf", pdf_data["filename"], pages)) or pdf_data["filename"]
+    )
+    routes = edition_routes("/index.php", "DOF: 13/10/2025", [build_gazette_pdf(2, hits={1: "KOYOC NOVELO OLIVER"})])
+
+    with GazetteServer(routes) as dof:
+        monkeypatch.setenv("GAZETTE_SOURCES", json.dumps([
+            {"name": "yucatan", "base_url": gazette_site.base_url, "index_path": DIARIO_PATH},
+            {"name": "dof", "label": "DOF", "base_url": dof.base_url, "index_path": "/index.php",
+             "title_selector": "div.titulo"},
+        ]))
+        telegram_bot.report()
+
+        texts = sorted(item[1] for item in sent if item[0] == "text")
+        assert texts[0].startswith("✅ [DOF] DOF: 13/10/2025")
+        assert texts[1].startswith("✅ [yucatan] Mérida, Yuc., Lunes 13 de octubre de 2025")
+        filenames = sorted(item[1] for item in sent if item[0] == "pdf")
+        assert filenames[0].startswith("diario_oficial_") and filenames[1].startswith("dof_")
+        assert (tmp_path / "last_run_fingerprint.json").exists()
+        assert (tmp_path / "last_run_fingerprint_dof.json").exists()
+
+        sent.clear()
+        telegram_bot.report()
+        assert sent == []
+
+
+def test_report_otra_replica(gazette_site, monkeypatch):
+    """Si otra réplica tiene el lease de la fuente el reporte se omite; su resultado se sirve en /report/latest"""
+    sent = []
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: sent.append(message) or {"ok": True})
+    monkeypatch.setattr(telegram_bot, "send_pdf_document", lambda pdf_data, pages, caption, chat_id=None: pdf_data["filename"])
+    client = TestClient(telegram_bot.app)
+    store = coordination.get_store()
+
+    assert store.acquire("report:yucatan", "otra-replica", 60)
+    telegram_bot.report()
+    assert sent == []
+    assert gazette_site.requests == []
+    assert client.get("/report/latest").status_code == 404
+
+    store.release("report:yucatan", "otra-replica")
+    telegram_bot.report()
+    assert len(sent) == 1
+
+    latest = client.get("/report/latest").json()
+    assert latest["node"] == coordination.node_id()
+    assert latest["result"].startswith("✅ Mérida, Yuc., Lunes 13 de octubre de 2025")
+    assert latest["edition"]["pdfs"][0]["matches"] == {"koyoc novelo": [3]}
+    assert client.get("/report/latest", params={"source": "dof"}).status_code == 404
+
+
+def test_reporte_manual_en_replica_api(gazette_site, monkeypatch):
+    """En una réplica api el reporte manual toma el lease de la fuente; si un worker lo tiene responde con lo publicado"""
+    sent = []
+    monkeypatch.setenv("NODE_ROLE", "api")
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: sent.append(message) or {"ok": True})
+    monkeypatch.setattr(telegram_bot, "send_pdf_document", lambda pdf_data, pages, caption, chat_id=None: pdf_data["filename"])
+    client = TestClient(telegram_bot.app)
+    store = coordination.get_store()
+    published = {"source": "yucatan", "node": "worker-1", "result": "✅ publicado"}
+    coordination.publish_result("report:yucatan", published)
+
+    assert store.acquire("report:yucatan", "worker-1", 60)
+    for path in ("/run-report", "/send-pdf"):
+        response = client.post(path, params={"wait": True}).json()
+        assert response["status"] == "running_elsewhere"
+        assert response["latest"] == published
+    assert sent == []
+    assert gazette_site.requests == []
+
+    store.release("report:yucatan", "worker-1")
+    assert client.post("/run-report", params={"wait": True}).json()["status"] == "success"
+    assert len(sent) == 1
+    # El lease se libera al terminar el trabajo manual
+    assert store.acquire("report:yucatan", "worker-1", 60)
+
+
+def test_edicion_varios_pdfs(gazette_site, monkeypatch):
+    """Una edición con varias secciones conserva el orden de la página, reúne sus resultados y cada PDF tiene su archivo"""
+    monkeypatch.setenv("PDF_STREAMING", "true")
+    monkeypatch.setenv("RETRO_ALERTS", "false")
+    # La primera sección es la más larga, así que termina de leerse al último
+    pdfs = [
+        build_gazette_pdf(30, hits={20: "KOYOC NOVELO OLIVER"}),
+        build_gazette_pdf(2, seed=1),
+        build_gazette_pdf(3, hits={1: "KOYOC NOVELO OLIVER"}, seed=2),
+        build_gazette_pdf(2, seed=3),
+    ]
+    routes = edition_routes(DIARIO_PATH, "Mérida, Yuc., Lunes 13 de octubre de 2025", pdfs)
+    missing = sorted(path for path in routes if path.endswith(".pdf"))[3]
+    del routes[missing]
+    gazette_site.routes.clear()
+    gazette_site.routes.update(routes)
+
+    result, edition = telegram_bot.diario_scraping()
+
+    assert [pdf["filename"] for pdf in edition["pdfs"]] == [
+        f"diario_oficial_{edition['gazette_date']}_{number}.pdf" for number in (1, 2, 3)
     ]
-    
-    results = []
-    for name, test_func in tests:
-        print(f"\n--- {name} ---")
-        result = test_func()
-        results.append((name, result))
-    
-    print("\n" + "="*50)
-    print("📊 RESUMEN DE PRUEBAS")
-    print("="*50)
-    
-    all_passed = True
-    for name, passed in results:
-        status = "✅ PASS" if passed else "❌ FAIL"
-        print(f"{name}: {status}")
-        if not passed:
-            all_passed = False
-    
-    print("\n" + "="*50)
-    if all_passed:
-        print("🎉 ¡Todas las pruebas pasaron! El bot está listo para Render.com")
-    else:
-        print("⚠️  Algunas pruebas fallaron. Revisa los errores antes del despliegue.")
-    print("="*50)
-
-if __name__ == "__main__":
-    main()
+    assert [pdf["url"].rsplit("/", 1)[1] for pdf in edition["pdfs"]] == ["diario_1.pdf", "diario_2.pdf", "diario_3.pdf"]
+    assert [pdf["found_pages"] for pdf in edition["pdfs"]] == [[20], [], [1]]
+    assert [pdf["total_pages"] for pdf in edition["pdfs"]] == [30, 2, 3]
+    assert edition["found"] is True
+    assert edition["errors"] == [missing]
+
+    # Un mensaje con el resultado de cada sección, en el orden de la página
+    positions = [result.index(pdf["filename"]) for pdf in edition["pdfs"]]
+    assert positions == sorted(positions)
+    assert "encontrado en páginas: [20]" in result and "encontrado en páginas: [1]" in result
+
+    # Cada sección tiene su propio archivo en la caché con su contenido
+    paths = [pdf["pdf_path"] for pdf in edition["pdfs"]]
+    assert len(set(paths)) == 3
+    for path, content in zip(paths, pdfs):
+        with open(path, "rb") as f:
+            assert f.read() == content
+
+    telegram_bot.release_edition(edition)
+
+    # El reporte envía sólo las secciones con coincidencias, en orden
+    sent = []
+    monkeypatch.setattr(telegram_bot, "bot_send_text", lambda message, chat_id=None: {"ok": True})
+    monkeypatch.setattr(
+        telegram_bot, "send_pdf_document",
+        lambda pdf_data, pages, caption, chat_id=None: sent.append((pdf_data["filename"], pages)) or pdf_data["filename"]
+    )
+    telegram_bot.report()
+    assert sent == [(edition["pdfs"][0]["filename"], [20]), (edition["pdfs"][2]["filename"], [1])]
+
+
+def test_health_endpoint():
+    """El endpoint de salud responde sin ejecutar el reporte de inicio"""
+    response = TestClient(telegram_bot.app).get("/health")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_ready_endpoint(monkeypatch, tmp_path):
+    """El servidor responde mientras el reporte inicial corre en segundo plano; /ready espera a que termine"""
+    release = threading.Event()
+    monkeypatch.setattr(telegram_bot, "report", lambda: release.wait(5))
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    for name in ("WATCH_MODE", "TELEGRAM_WEBHOOK_URL", "TELEGRAM_POLLING"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(gazette_cache, "_cache", None)
+    monkeypatch.setattr(search_index, "_index", None)
+
+    with TestClient(telegram_bot.app) as client:
+        assert client.get("/health").status_code == 200
+
+        not_ready = client.get("/ready")
+        assert not_ready.status_code == 503
+        assert not_ready.json()["status"] in ("pending", "warming_up")
+
+        release.set()
+        deadline = time.monotonic() + 5
+        response = client.get("/ready")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get("/ready")
+
+    assert response.status_code == 200
+    steps = response.json()["steps"]
+    assert list(steps) == ["imports", "cache", "search_index", "initial_report", "scheduler"]
+    assert all(step["status"] == "succeeded" for step in steps.values())
+
+
+def test_webhook_token_secreto(monkeypatch):
+    """El webhook siempre exige el token secreto; sin TELEGRAM_WEBHOOK_SECRET se usa el derivado del token del bot"""
+    handled = []
+    monkeypatch.setattr(telegram_bot, "handle_telegram_update", handled.append)
+    monkeypatch.delenv("TELEGRAM_WEBHOOK_SECRET", raising=False)
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    client = TestClient(telegram_bot.app)
+    update = {"update_id": 1, "message": {"chat": {"id": 1}, "text": "/hoy"}}
+
+    # Sin secreto ni token del bot el webhook no acepta ningún update
+    assert client.post("/telegram/webhook", json=update).status_code == 403
+
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "123:abc")
+    secret = telegram_bot.webhook_secret()
+    assert client.post("/telegram/webhook", json=update).status_code == 403
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+    assert client.post("/telegram/webhook", json=update, headers=headers).status_code == 200
+    assert handled == [update]
+
+    registered = []
+    monkeypatch.setattr(
+        telegram_bot.http_client, "request",
+        lambda method, url, data=None, **kwargs: registered.append(data) or type("Response", (), {"json": lambda self: {"ok": True}})(),
+    )
+    telegram_bot.set_telegram_webhook("https://bot.example/telegram/webhook")
+    assert registered[0]["secret_token"] == secret
@@ -0,0 +1,115 @@
+"""
+Pruebas de los comandos de Telegram (commands.py)
+"""
+
+from commands import CommandHandler, load_last_edition, parse_command, save_last_edition
+from search_index import SearchIndex
+from subscriptions import SubscriptionStore
+
+
+def message(chat_id, text):
+    return {"update_id": 1, "message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def build_handler(tmp_path, configured=None, allowed_chats=("*",)):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    store = SubscriptionStore(str(tmp_path / "subscriptions.json"))
+
+    def load_subscriptions():
+        subscriptions = {chat_id: list(terms) for chat_id, terms in (configured or {}).items()}
+        for chat_id, terms in store.all().items():
+            subscriptions.setdefault(chat_id, []).extend(terms)
+        return subscriptions
+
+    handler = CommandHandler(index, store, load_subscriptions, str(tmp_path / "last_edition.json"), allowed_chats)
+    return handler, index, store
+
+
+def test_parse_command():
+    """Separa el comando (sin el @ del bot) de sus argumentos"""
+    assert parse_command("/buscar@MiBot  Pérez Koyoc ") == ("buscar", "Pérez Koyoc")
+    assert parse_command("/HOY") == ("hoy", "")
+    assert parse_command("hola") == (None, "")
+
+
+def test_suscribir_y_desuscribir(tmp_path):
+    """Las suscripciones desde Telegram se guardan y no se duplican"""
+    handler, _, store = build_handler(tmp_path, configured={"1": ["zapata"]})
+
+    reply = handler.handle_update(message(1, "/suscribir  Pérez   Koyoc"))
+    assert reply["chat_id"] == "1" and reply["command"] == "suscribir"
+    assert "Ahora vigilas 'Pérez Koyoc'" in reply["text"]
+    assert "Ya vigilas" in handler.handle_update(message(1, "/suscribir perez koyoc"))["text"]
+    assert "Ya vigilas" in handler.handle_update(message(1, "/suscribir zapata"))["text"]
+    assert "al menos 3" in handler.handle_update(message(1, "/suscribir a"))["text"]
+
+    assert "- zapata\n- Pérez Koyoc" in handler.handle_update(message(1, "/terminos"))["text"]
+    assert SubscriptionStore(str(tmp_path / "subscriptions.json")).all() == {"1": ["Pérez Koyoc"]}
+
+    # Los términos de la configuración del servidor no se quitan desde Telegram
+    assert "No vigilabas" in handler.handle_update(message(1, "/desuscribir zapata"))["text"]
+    assert "Ya no vigilas" in handler.handle_update(message(1, "/desuscribir PEREZ KOYOC"))["text"]
+    assert store.all() == {}
+
+    assert handler.handle_update({"update_id": 2, "message": {"chat": {"id": 1}, "text": "hola"}}) is None
+    assert "no reconocido" in handler.handle_update(message(1, "/borrar"))["text"]
+
+
+def test_chats_no_autorizados(tmp_path):
+    """Con TELEGRAM_ALLOWED_CHATS sólo se atienden los chats de la lista"""
+    handler, _, store = build_handler(tmp_path, allowed_chats=["1"])
+
+    assert "no está autorizado" in handler.handle_update(message(2, "/suscribir perez"))["text"]
+    assert store.all() == {}
+    assert "Comandos disponibles" in handler.handle_update(message(1, "/ayuda"))["text"]
+
+
+def test_chats_autorizados_por_defecto(tmp_path, monkeypatch):
+    """Sin TELEGRAM_ALLOWED_CHATS sólo responden los chats configurados; "*" abre el bot a cualquiera"""
+    monkeypatch.delenv("TELEGRAM_ALLOWED_CHATS", raising=False)
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "1")
+    monkeypatch.setenv("SUBSCRIPTIONS", '{"2": ["lopez"]}')
+    handler, _, store = build_handler(tmp_path, allowed_chats=None)
+
+    assert "Ahora vigilas" in handler.handle_update(message(1, "/suscribir perez"))["text"]
+    assert "Ahora vigilas" in handler.handle_update(message(2, "/suscribir gomez"))["text"]
+    assert "no está autorizado" in handler.handle_update(message(3, "/suscribir zapata"))["text"]
+    assert store.all() == {"1": ["perez"], "2": ["gomez"]}
+
+    monkeypatch.setenv("TELEGRAM_ALLOWED_CHATS", "*")
+    handler, _, _ = build_handler(tmp_path, allowed_chats=None)
+    assert "Ahora vigilas" in handler.handle_update(message(3, "/suscribir zapata"))["text"]
+
+
+def test_hoy_y_buscar(tmp_path):
+    """/hoy usa el resumen de la última edición y el índice para términos nuevos; /buscar usa el índice"""
+    handler, index, _ = build_handler(tmp_path, configured={"1": ["perez koyoc", "zapata", "Novelo"]})
+    assert "Todavía no se ha procesado" in handler.handle_update(message(1, "/hoy"))["text"]
+
+    index.add_document("a" * 64, [(1, "Avisos"), (2, "Notario José Pérez Koyoc"), (5, "Edicto Novelo")],
+                       filename="a.pdf", gazette_date="2025-10-09")
+    index.add_document("b" * 64, [(3, "Edicto Pérez Koyoc")], filename="b.pdf", gazette_date="2024-01-15")
+    edition = {
+        "fecha_consulta": "JUEVES 9 DE OCTUBRE DE 2025",
+        "date_now": "09/10/2025 07:00:00",
+        "gazette_date": "2025-10-09",
+        "terms": ["Pérez Koyoc", "zapata"],
+        "found": True,
+        "errors": [],
+        "pdfs": [{"filename": "a.pdf", "sha256": "a" * 64, "total_pages": 5, "found": True,
+                  "matches": {"Pérez Koyoc": [2], "zapata": []}}],
+    }
+    save_last_edition(edition, str(tmp_path / "last_edition.json"))
+    assert load_last_edition(str(tmp_path / "last_edition.json"))["terms"] == ["Pérez Koyoc", "zapata"]
+
+    text = handler.handle_update(message(1, "/hoy"))["text"]
+    assert "JUEVES 9 DE OCTUBRE DE 2025" in text
+    assert "✅ 'perez koyoc' encontrado en a.pdf páginas [2]" in text
+    assert "❌ 'zapata' NO encontrado" in text
+    # "Novelo" se suscribió después de revisar la edición: se encuentra en el índice
+    assert "✅ 'Novelo' encontrado en a.pdf páginas [5]" in text
+
+    text = handler.handle_update(message(1, "/buscar perez koyoc"))["text"]
+    assert text.startswith("🔎 2 resultado(s)")
+    assert "2025-10-09 a.pdf p. 2" in text and "2024-01-15 b.pdf p. 3" in text
+    assert "Uso: /buscar" in handler.handle_update(message(1, "/buscar"))["text"]
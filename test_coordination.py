@@ -0,0 +1,127 @@
+"""
+Pruebas de la coordinación entre réplicas (coordination.py)
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+import coordination
+from scheduler import Scheduler
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    """Dos réplicas con el mismo almacén: la misma instancia en memoria o el mismo archivo SQLite"""
+    if request.param == "memory":
+        store = coordination.MemoryStore()
+        return store, store
+    path = str(tmp_path / "coordination.db")
+    return coordination.SqliteStore(path), coordination.SqliteStore(path)
+
+
+def test_lease(stores):
+    """Sólo un dueño a la vez; el lease se renueva, se libera y, si se abandona, vence"""
+    first, second = stores
+
+    assert first.acquire("report:yucatan", "nodo-a", 60) is True
+    assert second.acquire("report:yucatan", "nodo-b", 60) is False
+    # Tomarlo otra vez no es válido ni para el mismo dueño: sólo se renueva
+    assert first.acquire("report:yucatan", "nodo-a", 60) is False
+    assert first.renew("report:yucatan", "nodo-a", 60) is True
+    assert second.renew("report:yucatan", "nodo-b", 60) is False
+
+    second.release("report:yucatan", "nodo-b")
+    assert second.acquire("report:yucatan", "nodo-b", 60) is False
+    first.release("report:yucatan", "nodo-a")
+    assert second.acquire("report:yucatan", "nodo-b", 0.05) is True
+
+    time.sleep(0.1)
+    assert second.renew("report:yucatan", "nodo-b", 60) is False
+    assert first.acquire("report:yucatan", "nodo-a", 60) is True
+
+
+def test_resultados(stores):
+    """Un resultado publicado por una réplica lo leen las demás hasta que vence"""
+    first, second = stores
+
+    first.put_result("report:yucatan", {"result": "✅ Lunes 13", "pdfs": [1, 2]})
+    first.put_result("temporal", "x", ttl=0.05)
+
+    assert second.get_result("report:yucatan") == {"result": "✅ Lunes 13", "pdfs": [1, 2]}
+    assert second.get_result("temporal") == "x"
+    time.sleep(0.1)
+    assert second.get_result("temporal") is None
+    assert second.get_result("otra") is None
+
+
+def test_lease_context_manager():
+    """Lease como context manager: se renueva mientras dura el bloque y se libera al salir"""
+    store = coordination.MemoryStore()
+
+    with coordination.Lease("report:dof", ttl=0.15, store=store, owner="nodo-a") as lease:
+        assert lease.acquired is True
+        with coordination.Lease("report:dof", store=store, owner="nodo-b") as other:
+            assert other.acquired is False
+        # Tras varias renovaciones el lease sigue siendo de nodo-a
+        time.sleep(0.4)
+        assert store.acquire("report:dof", "nodo-b", 1) is False
+
+    assert store.acquire("report:dof", "nodo-b", 1) is True
+
+
+def test_lease_dos_hilos(stores):
+    """Dos hilos del mismo nodo no tienen el lease a la vez; al terminar uno no se libera el del otro"""
+    store = stores[0]
+    holding = threading.Event()
+    finish = threading.Event()
+    outcome = {}
+
+    def long_report():
+        with coordination.Lease("report:yucatan", store=store) as lease:
+            outcome["first"] = lease.acquired
+            holding.set()
+            finish.wait(5)
+
+    thread = threading.Thread(target=long_report)
+    thread.start()
+    holding.wait(5)
+
+    # El vigilante del mismo proceso intenta el mismo reporte mientras el scheduler lo ejecuta
+    with coordination.Lease("report:yucatan", store=store) as other:
+        assert other.acquired is False
+    assert store.acquire("report:yucatan", "nodo-b", 60) is False
+
+    finish.set()
+    thread.join()
+    assert outcome["first"] is True
+    assert store.acquire("report:yucatan", "nodo-b", 60) is True
+
+
+def test_horario_una_sola_replica(tmp_path):
+    """Dos réplicas despiertan para el mismo horario; sólo la que lo reclama primero lo ejecuta"""
+    store = coordination.MemoryStore()
+    runs = []
+    due = pytz.timezone("America/Merida").localize(datetime(2025, 10, 13, 7, 30))
+
+    replicas = [
+        Scheduler(
+            lambda name=name: runs.append(name),
+            ["30 7 * * *"],
+            "America/Merida",
+            str(tmp_path / f"scheduler_{name}.json"),
+            0,
+            12,
+            claim=lambda key, name=name: store.acquire(f"schedule:yucatan:{key}", name, 60),
+        )
+        for name in ("nodo-a", "nodo-b")
+    ]
+    for replica in replicas:
+        replica._run_task(replica.schedules, due)
+
+    assert runs == ["nodo-a"]
+    # Ambas registran el horario, así que ninguna lo recupera como ejecución perdida
+    assert all(not replica.missed_runs(due) for replica in replicas)
@@ -0,0 +1,129 @@
+"""
+Pruebas del envío a Telegram con límites y reintentos (delivery.py)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+from delivery import TelegramAPI, deliver_all, escape_markdown
+
+
+def start_telegram(responses):
+    """Servidor local que imita a Telegram devolviendo las respuestas indicadas en orden"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            received.append(self.rfile.read(length))
+            status, body = responses.pop(0) if responses else (200, {"ok": True, "result": {}})
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def test_escape_markdown():
+    assert escape_markdown("diario_oficial_1.pdf *[x]* `y`") == "diario\\_oficial\\_1.pdf \\*\\[x]\\* \\`y\\`"
+
+
+def test_429_y_reintentos():
+    """Se respeta retry_after y se reintentan los 5xx; los errores 4xx no se reintentan"""
+    server, received = start_telegram([
+        (429, {"ok": False, "parameters": {"retry_after": 0.2}}),
+        (502, {"ok": False}),
+        (200, {"ok": True, "result": {"message_id": 1}}),
+        (400, {"ok": False, "description": "Bad Request: chat not found"}),
+    ])
+    url = f"http://127.0.0.1:{server.server_port}/sendMessage"
+    telegram = TelegramAPI(global_rate=0, chat_interval=0, max_retries=3, backoff=0.01)
+    try:
+        started = time.monotonic()
+        assert telegram.call(url, "1", {"text": "hola"})["ok"] is True
+        assert time.monotonic() - started >= 0.2
+        assert telegram.call(url, "2", {"text": "hola"})["ok"] is False
+    finally:
+        server.shutdown()
+
+    assert len(received) == 4
+    metrics = telegram.metrics()
+    assert (metrics["sent"], metrics["failed"], metrics["retried"], metrics["rate_limited"]) == (1, 1, 1, 1)
+
+
+def test_timeout_de_lectura_no_se_reintenta(monkeypatch):
+    """Un POST sin respuesta a tiempo no se repite (Telegram pudo recibirlo); un error de conexión sí"""
+    monkeypatch.setenv("HTTP_READ_TIMEOUT", "0.2")
+    # Sin los reintentos de conexión de la sesión, para contar sólo los de TelegramAPI
+    monkeypatch.setenv("HTTP_RETRIES", "0")
+    monkeypatch.setattr(http_client, "_session", None)
+    received = []
+
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            time.sleep(0.5)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    telegram = TelegramAPI(global_rate=0, chat_interval=0, max_retries=3, backoff=0.01)
+    try:
+        with pytest.raises(requests.ReadTimeout):
+            telegram.call(f"http://127.0.0.1:{server.server_port}/sendMessage", "1", {"text": "hola"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(received) == 1
+    assert (telegram.metrics()["failed"], telegram.metrics()["retried"]) == (1, 0)
+
+    # Puerto cerrado: la petición nunca salió y se reintenta
+    with pytest.raises(requests.ConnectionError):
+        telegram.call(f"http://127.0.0.1:{server.server_port}/sendMessage", "1", {"text": "hola"})
+    assert telegram.metrics()["retried"] == 3
+
+
+def test_deliver_all_y_deduplicacion():
+    """Los envíos de un chat van en orden y los de chats distintos en paralelo"""
+    order = []
+
+    def task(chat_id, number):
+        def run():
+            time.sleep(0.05)
+            order.append((chat_id, number))
+            if number == 2:
+                raise RuntimeError("falló")
+            return number
+        return run
+
+    started = time.monotonic()
+    results = deliver_all({chat: [task(chat, 1), task(chat, 2)] for chat in ("a", "b", "c")}, concurrency=3)
+    assert time.monotonic() - started < 0.25
+    assert [number for chat, number in order if chat == "a"] == [1, 2]
+    assert results["a"][0] == 1 and isinstance(results["a"][1], RuntimeError)
+
+    telegram = TelegramAPI(dedup_seconds=60)
+    assert telegram.claim("reporte:1") is True
+    assert telegram.claim("reporte:1") is False
+    telegram.release("reporte:1")
+    assert telegram.claim("reporte:1") is True
+    assert telegram.metrics()["deduplicated"] == 1
@@ -0,0 +1,25 @@
+"""
+Pruebas del registro de file_id de Telegram (file_ids.py)
+"""
+
+from file_ids import FileIdStore, document_key
+
+
+def test_document_key():
+    assert document_key("abc") == "abc"
+    assert document_key("abc", [1, 5, 6]) == "abc:1,5,6"
+
+
+def test_registro_persistente_y_acotado(tmp_path):
+    path = str(tmp_path / "file_ids.json")
+    store = FileIdStore(path, max_entries=2)
+    store.set("a", "file-a")
+    store.set("b", "file-b")
+    store.set("c", "file-c")
+
+    reloaded = FileIdStore(path, max_entries=2)
+    assert reloaded.get("a") is None
+    assert (reloaded.get("b"), reloaded.get("c")) == ("file-b", "file-c")
+
+    reloaded.discard("b")
+    assert FileIdStore(path).get("b") is None
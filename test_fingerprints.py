@@ -0,0 +1,57 @@
+"""
+Pruebas de las huellas y diferencias entre reportes (fingerprints.py)
+"""
+
+from fingerprints import FingerprintStore, describe_diff, diff_fingerprints, reusable_result
+
+
+def fingerprint(fecha, pdfs):
+    return {
+        "fecha_consulta": fecha,
+        "index_fingerprint": "x",
+        "terms": ["koyoc novelo"],
+        "pdfs": {
+            url: {"sha256": sha256, "filename": url.split("/")[-1], "total_pages": len(hashes),
+                  "page_hashes": hashes, "matches": {"koyoc novelo": pages}}
+            for url, (sha256, hashes, pages) in pdfs.items()
+        },
+    }
+
+
+def test_diff_fingerprints():
+    """Distingue edición nueva, PDF nuevo, páginas modificadas y coincidencias nuevas"""
+    morning = fingerprint("Lunes 13", {"/a.pdf": ("s1", ["h1", "h2", "h3"], [])})
+    same = fingerprint("Lunes 13", {"/a.pdf": ("s1", ["h1", "h2", "h3"], [])})
+    changed = fingerprint("Lunes 13", {
+        "/a.pdf": ("s2", ["h1", "h2b", "h3"], [2]),
+        "/b.pdf": ("s3", ["h4"], []),
+    })
+
+    assert diff_fingerprints(None, morning)["new_edition"] is True
+    assert diff_fingerprints(morning, same)["changed"] is False
+    assert diff_fingerprints(morning, fingerprint("Martes 14", {}))["new_edition"] is True
+
+    diff = diff_fingerprints(morning, changed)
+    assert diff["new_edition"] is False
+    assert diff["new_pdfs"] == ["/b.pdf"]
+    assert diff["new_pages"] == {"/a.pdf": [2]}
+    assert diff["new_matches"] == {"koyoc novelo": {"/a.pdf": [2]}}
+    assert describe_diff(diff, changed, ["koyoc novelo"]).splitlines() == [
+        "PDF nuevo: b.pdf",
+        "a.pdf cambió - páginas nuevas o modificadas: [2]",
+        "'koyoc novelo' encontrado en a.pdf, páginas nuevas: [2]",
+    ]
+    assert "koyoc" not in describe_diff(diff, changed, ["otro término"])
+
+
+def test_reusable_result(tmp_path):
+    """Un PDF se reutiliza sólo si su hash y los términos buscados no cambiaron"""
+    store = FingerprintStore(str(tmp_path / "huella.json"))
+    assert store.load() is None
+    store.save(fingerprint("Lunes 13", {"/a.pdf": ("s1", ["h1"], [1])}))
+    previous = store.load()
+
+    assert reusable_result(previous, "/a.pdf", "s1", ["koyoc novelo"])["matches"] == {"koyoc novelo": [1]}
+    assert reusable_result(previous, "/a.pdf", "s2", ["koyoc novelo"]) is None
+    assert reusable_result(previous, "/a.pdf", "s1", ["koyoc novelo", "otro"]) is None
+    assert reusable_result(None, "/a.pdf", "s1", ["koyoc novelo"]) is None
@@ -0,0 +1,69 @@
+"""
+Pruebas de la caché de diarios descargados (gazette_cache.py)
+"""
+
+import os
+import time
+
+from gazette_cache import GazetteCache
+
+
+def test_store_and_load(tmp_path):
+    """Guarda el PDF por hash y expone los encabezados condicionales"""
+    cache = GazetteCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+
+    sha256 = cache.store_pdf("https://x/a.pdf", b"%PDF-1", etag='"abc"', last_modified="Mon")
+
+    assert cache.load_pdf(sha256) == b"%PDF-1"
+    assert cache.conditional_headers("https://x/a.pdf") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon",
+    }
+    assert cache.conditional_headers("https://x/otro.pdf") == {}
+
+    # El índice sobrevive a un reinicio
+    reopened = GazetteCache(str(tmp_path))
+    assert reopened.get_entry("https://x/a.pdf")["sha256"] == sha256
+
+
+def test_page_writer(tmp_path):
+    """El texto por página se guarda comprimido y se lee en orden"""
+    cache = GazetteCache(str(tmp_path))
+    sha256 = cache.store_pdf("https://x/a.pdf", b"%PDF-1")
+
+    writer = cache.page_writer(sha256)
+    writer.write(1, "primera página")
+    writer.write(2, "segunda\npágina")
+    writer.commit()
+
+    assert cache.has_pages(sha256)
+    assert list(cache.iter_pages(sha256)) == [(1, "primera página"), (2, "segunda\npágina")]
+
+
+def test_page_writer_discard(tmp_path):
+    """Una extracción interrumpida no deja texto parcial en la caché"""
+    cache = GazetteCache(str(tmp_path))
+    writer = cache.page_writer("abc")
+    writer.write(1, "parcial")
+    writer.discard()
+
+    assert not cache.has_pages("abc")
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_lru_eviction(tmp_path):
+    """Desaloja primero el PDF usado hace más tiempo"""
+    cache = GazetteCache(str(tmp_path), max_bytes=2500)
+
+    old = cache.store_pdf("https://x/old.pdf", b"a" * 1000)
+    recent = cache.store_pdf("https://x/recent.pdf", b"b" * 1000)
+    past = time.time() - 60
+    os.utime(os.path.join(tmp_path, f"{recent}.pdf"), (past, past))
+    os.utime(os.path.join(tmp_path, f"{old}.pdf"), (past - 60, past - 60))
+    cache.load_pdf(recent)
+
+    cache.store_pdf("https://x/new.pdf", b"c" * 1000)
+
+    assert cache.load_pdf(old) is None
+    assert cache.load_pdf(recent) == b"b" * 1000
+    assert cache.get_entry("https://x/old.pdf") is None
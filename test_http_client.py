@@ -0,0 +1,262 @@
+"""
+Pruebas del cliente HTTP compartido (http_client.py)
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+import http_client
+from gazette_cache import GazetteCache
+
+
+def start_server(body, etag):
+    """Levanta un servidor local que responde 304 cuando el ETag coincide"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == etag:
+                requests_seen.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            requests_seen.append(200)
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests_seen
+
+
+def test_fetch_condicional(tmp_path):
+    """La segunda descarga recibe 304 y devuelve la copia de la caché"""
+    server, requests_seen = start_server(b"%PDF-contenido", '"v1"')
+    cache = GazetteCache(str(tmp_path))
+    url = f"http://127.0.0.1:{server.server_port}/diario.pdf"
+
+    try:
+        first = http_client.fetch(url, cache)
+        second = http_client.fetch(url, cache)
+    finally:
+        server.shutdown()
+
+    assert requests_seen == [200, 304]
+    assert first["not_modified"] is False
+    assert first["bytes"] == len(b"%PDF-contenido")
+    assert second["not_modified"] is True
+    assert second["bytes"] == 0
+    assert second["content"] == b"%PDF-contenido"
+    assert second["sha256"] == first["sha256"]
+
+
+def test_fetch_stream(tmp_path):
+    """En modo stream el PDF se escribe en la caché y se devuelve la ruta, no el contenido"""
+    server, requests_seen = start_server(b"%PDF-contenido" * 1000, '"v1"')
+    cache = GazetteCache(str(tmp_path))
+    url = f"http://127.0.0.1:{server.server_port}/diario.pdf"
+
+    try:
+        first = http_client.fetch(url, cache, stream=True)
+        second = http_client.fetch(url, cache, stream=True)
+    finally:
+        server.shutdown()
+
+    assert requests_seen == [200, 304]
+    assert first["content"] is None
+    assert first["bytes"] == len(b"%PDF-contenido") * 1000
+    with open(first["path"], "rb") as f:
+        assert f.read() == b"%PDF-contenido" * 1000
+    assert second["path"] == first["path"] == cache.content_path(url)
+    assert second["sha256"] == first["sha256"] == cache.get_entry(url)["sha256"]
+
+
+def test_fetch_sin_cache():
+    """Sin caché se hace una descarga normal"""
+    server, requests_seen = start_server(b"hola", '"v1"')
+
+    try:
+        result = http_client.fetch(f"http://127.0.0.1:{server.server_port}/", None)
+    finally:
+        server.shutdown()
+
+    assert requests_seen == [200]
+    assert result["content"] == b"hola"
+    assert result["sha256"] is None
+
+
+def test_rate_limiter():
+    """Las solicitudes desde varios hilos quedan separadas por el intervalo mínimo"""
+    limiter = http_client.RateLimiter(0.05)
+    started = []
+
+    def call():
+        limiter.wait()
+        started.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    started.sort()
+    assert started[2] - started[0] >= 0.09
+
+    # Una pausa (p. ej. por un 429) retrasa el siguiente turno
+    limiter.pause(0.1)
+    before = time.monotonic()
+    limiter.wait()
+    assert time.monotonic() - before >= 0.09
+
+
+def test_limite_por_host(monkeypatch):
+    """Las descargas a un mismo sitio desde varios hilos no pasan de HTTP_MAX_CONNECTIONS_PER_HOST"""
+    monkeypatch.setenv("HTTP_MAX_CONNECTIONS_PER_HOST", "2")
+    monkeypatch.setattr(http_client, "_host_slots", {})
+    server, _ = start_server(b"hola", '"v1"')
+    request = http_client.request
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def counting_request(*args, **kwargs):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        try:
+            time.sleep(0.05)
+            return request(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight.pop()
+
+    monkeypatch.setattr(http_client, "request", counting_request)
+    threads = [
+        threading.Thread(target=http_client.fetch, args=(f"http://127.0.0.1:{server.server_port}/{number}",))
+        for number in range(6)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+
+    assert len(peak) == 6
+    assert max(peak) == 2
+
+
+def run_with_transport(handler, coroutine_factory):
+    """Ejecuta una corrutina con el cliente asíncrono compartido sobre un transporte simulado"""
+    async def main():
+        http_client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        http_client._async_client_loop = asyncio.get_running_loop()
+        try:
+            return await coroutine_factory()
+        finally:
+            await http_client.close_async_client()
+
+    return asyncio.run(main())
+
+
+def conditional_handler(body, etag, seen):
+    """Responde 304 cuando el ETag coincide, como el sitio del diario"""
+    def handler(request):
+        if request.headers.get("If-None-Match") == etag:
+            seen.append(304)
+            return httpx.Response(304)
+        seen.append(200)
+        return httpx.Response(200, headers={"ETag": etag}, content=body)
+
+    return handler
+
+
+def test_fetch_async_condicional(tmp_path):
+    """La versión asíncrona también usa la copia en caché cuando el servidor responde 304"""
+    cache = GazetteCache(str(tmp_path))
+    seen = []
+    url = "http://diario.test/diario.pdf"
+
+    async def fetch_twice():
+        first = await http_client.fetch_async(url, cache)
+        second = await http_client.fetch_async(url, cache)
+        streamed = await http_client.fetch_async(url, cache, stream=True)
+        return first, second, streamed
+
+    first, second, streamed = run_with_transport(conditional_handler(b"%PDF-contenido", '"v1"', seen), fetch_twice)
+
+    assert seen == [200, 304, 304]
+    assert first["not_modified"] is False
+    assert second["not_modified"] is True
+    assert second["content"] == b"%PDF-contenido"
+    assert second["bytes"] == 0
+    assert streamed["not_modified"] is True
+    assert streamed["path"] == cache.content_path(url)
+    assert streamed["sha256"] == first["sha256"]
+
+
+def test_fetch_async_reintentos(tmp_path, monkeypatch):
+    """Las respuestas 5xx se reintentan con espera exponencial hasta HTTP_RETRIES, también en modo stream"""
+    monkeypatch.setenv("HTTP_RETRIES", "2")
+    monkeypatch.setenv("HTTP_BACKOFF", "0")
+    cache = GazetteCache(str(tmp_path))
+    statuses = {"/inestable.pdf": [503, 502, 200], "/caido.pdf": [503, 503, 503, 200], "/stream.pdf": [500, 200]}
+    seen = []
+
+    def handler(request):
+        status = statuses[request.url.path].pop(0)
+        seen.append((request.url.path, status))
+        return httpx.Response(status, content=b"%PDF-ok" if status == 200 else b"")
+
+    async def fetch_all():
+        recovered = await http_client.fetch_async("http://diario.test/inestable.pdf", cache)
+        streamed = await http_client.fetch_async("http://diario.test/stream.pdf", cache, stream=True)
+        try:
+            await http_client.fetch_async("http://diario.test/caido.pdf", cache)
+        except httpx.HTTPStatusError as e:
+            return recovered, streamed, e.response.status_code
+        return recovered, streamed, None
+
+    recovered, streamed, failed_status = run_with_transport(handler, fetch_all)
+
+    assert recovered["content"] == b"%PDF-ok"
+    assert streamed["bytes"] == len(b"%PDF-ok")
+    # Tres intentos (el original y dos reintentos) y se propaga el último error
+    assert failed_status == 503
+    assert [status for path, status in seen if path == "/caido.pdf"] == [503, 503, 503]
+
+
+def test_fetch_async_limite_por_host(tmp_path, monkeypatch):
+    """Las descargas asíncronas a un mismo sitio no pasan de HTTP_MAX_CONNECTIONS_PER_HOST"""
+    monkeypatch.setenv("HTTP_MAX_CONNECTIONS_PER_HOST", "2")
+    monkeypatch.setattr(http_client, "_async_host_slots_loop", None)
+    in_flight = []
+    peak = []
+
+    async def handler(request):
+        in_flight.append(request.url.host)
+        peak.append(in_flight.count(request.url.host))
+        await asyncio.sleep(0.02)
+        in_flight.remove(request.url.host)
+        return httpx.Response(200, content=b"hola")
+
+    async def fetch_all():
+        urls = [f"http://diario.test/{number}" for number in range(6)] + ["http://otro.test/0"]
+        return await asyncio.gather(*(http_client.fetch_async(url) for url in urls))
+
+    results = run_with_transport(handler, fetch_all)
+
+    assert [result["content"] for result in results] == [b"hola"] * 7
+    assert max(peak) == 2
@@ -0,0 +1,71 @@
+"""
+Pruebas de la lectura de la página del diario (index_parser.py)
+"""
+
+import pytest
+
+import index_parser
+from benchmarks.fixtures import index_html
+from telegram_bot import parse_index_page
+
+FECHA = "Mérida, Yuc., Lunes 13 de octubre de 2025"
+
+
+@pytest.mark.parametrize("parser", index_parser.PARSERS)
+def test_extractores(parser):
+    """Cada extractor lee la misma fecha y los mismos enlaces, sin repetir"""
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    html = index_html(FECHA, ["/a.pdf", "/b.pdf", "/a.pdf"])
+
+    result = index_parser.extract_index(html, parser)
+
+    assert result == {"title": FECHA, "pdf_links": ["/a.pdf", "/b.pdf"], "parser": parser}
+
+
+def test_selectores_configurables(monkeypatch):
+    """Los selectores se leen de INDEX_TITLE_SELECTOR e INDEX_PDF_SELECTOR"""
+    monkeypatch.setenv("INDEX_TITLE_SELECTOR", "h1.titulo")
+    monkeypatch.setenv("INDEX_PDF_SELECTOR", ".nav-link")
+
+    result = index_parser.extract_index(index_html(FECHA, []))
+
+    assert result["title"] == "Diario Oficial"
+    assert result["pdf_links"][0] == "/gobierno/index.php"
+
+    with pytest.raises(ValueError):
+        index_parser.parse_selector("div > a.pdf")
+
+
+def test_pagina_sin_titulo():
+    """Sin el título de la fecha la página se lee igual, con un texto genérico"""
+    html = index_html(FECHA, ["/a.pdf"]).replace(b"titulo verde mt-2", b"otro")
+
+    assert index_parser.extract_index(html)["title"] is None
+    page = parse_index_page(html)
+    assert page["fecha_consulta"] == "Diario Oficial (fecha no disponible)"
+    assert page["pdf_links"] == ["/a.pdf"]
+
+
+def test_pagina_vacia_un_solo_extractor(monkeypatch):
+    """Una página sin PDFs se devuelve tal cual; sólo un extractor que falla pasa al siguiente"""
+    calls = []
+    extract = index_parser._extract
+
+    def counting_extract(name, *args):
+        calls.append(name)
+        if name == "strainer":
+            raise ValueError("HTML inesperado")
+        return extract(name, *args)
+
+    monkeypatch.setattr(index_parser, "_extract", counting_extract)
+
+    result = index_parser.extract_index(index_html(FECHA, []), "html.parser")
+    assert result["pdf_links"] == []
+    assert calls == ["html.parser"]
+
+    calls.clear()
+    result = index_parser.extract_index(index_html(FECHA, ["/a.pdf"]), "strainer")
+    assert calls == ["strainer", "html.parser"]
+    assert result["parser"] == "html.parser"
+    assert result["pdf_links"] == ["/a.pdf"]
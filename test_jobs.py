@@ -0,0 +1,77 @@
+"""
+Pruebas de la cola de trabajos en segundo plano (jobs.py)
+"""
+
+import asyncio
+
+from jobs import JobManager, stage
+
+
+def test_submit_coalesce_y_etapas():
+    """Las solicitudes duplicadas en curso se unen al mismo trabajo"""
+    calls = []
+
+    async def work():
+        calls.append(1)
+        with stage("descarga"):
+            await asyncio.sleep(0.01)
+        return {"status": "success"}
+
+    async def main():
+        manager = JobManager(concurrency=2)
+        first, first_coalesced = manager.submit("run-report", "2025-10-09", work)
+        second, second_coalesced = manager.submit("run-report", "2025-10-09", work)
+        other, _ = manager.submit("run-report", "2025-10-10", work)
+        await asyncio.gather(first.task, other.task)
+        return manager, first, first_coalesced, second, second_coalesced, other
+
+    manager, first, first_coalesced, second, second_coalesced, other = asyncio.run(main())
+
+    assert second is first
+    assert (first_coalesced, second_coalesced) == (False, True)
+    assert other is not first
+    assert len(calls) == 2
+    assert first.status == "succeeded"
+    assert first.stages["descarga"] > 0
+    assert manager.get(first.id).to_dict()["result"] == {"status": "success"}
+
+
+def test_concurrencia_acotada_y_errores():
+    """No se ejecutan más trabajos a la vez que JOB_CONCURRENCY"""
+    running = []
+    peak = []
+
+    async def work():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        raise RuntimeError("falló")
+
+    async def main():
+        manager = JobManager(concurrency=1)
+        jobs = [manager.submit("send-pdf", str(day), work)[0] for day in range(3)]
+        await asyncio.gather(*(job.task for job in jobs))
+        return jobs
+
+    jobs = asyncio.run(main())
+
+    assert max(peak) == 1
+    assert all(job.status == "failed" and job.error == "falló" for job in jobs)
+
+
+def test_shared():
+    """Un cálculo compartido se ejecuta una sola vez para varios trabajos"""
+    calls = []
+
+    async def scrape():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    async def main():
+        manager = JobManager()
+        return await asyncio.gather(manager.shared("scrape", scrape), manager.shared("scrape", scrape))
+
+    assert asyncio.run(main()) == ["resultado", "resultado"]
+    assert len(calls) == 1
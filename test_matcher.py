@@ -0,0 +1,72 @@
+"""
+Pruebas del buscador de múltiples términos (matcher.py)
+"""
+
+from matcher import TermMatcher, load_subscriptions, get_watched_terms, normalize_text
+
+
+def test_normalize_text():
+    """Ignora acentos, mayúsculas y espacios repetidos o saltos de línea"""
+    assert normalize_text("  Koyoc   NOVELÓ\nPérez ") == "koyoc novelo perez"
+
+
+def test_find_terms_con_saltos_de_linea():
+    """Encuentra términos partidos por saltos de línea y con acentos"""
+    matcher = TermMatcher(["Koyoc  Novelo", "KONO850101HYNXXX01", "inexistente"])
+
+    found = matcher.find_terms("Se notifica a OLIVER KOYOC\nNOVELÓ con CURP kono850101hynxxx01.")
+
+    assert found == {"Koyoc  Novelo", "KONO850101HYNXXX01"}
+
+
+def test_find_terms_superpuestos():
+    """Reporta términos que son sufijo o prefijo de otros"""
+    matcher = TermMatcher(["he", "she", "hers", "his"])
+
+    assert matcher.find_terms("ushers") == {"he", "she", "hers"}
+
+
+def test_scan_pages():
+    """Construye el mapa término -> páginas"""
+    matcher = TermMatcher(["koyoc novelo", "perez"])
+    pages = [(1, "nada"), (2, "Koyoc Novelo"), (3, "PÉREZ y koyoc novelo")]
+
+    assert matcher.scan_pages(pages) == {"koyoc novelo": [2, 3], "perez": [3]}
+
+
+def test_load_subscriptions(monkeypatch):
+    """Combina SEARCH_TEXT del chat principal con SUBSCRIPTIONS"""
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "100")
+    monkeypatch.setenv("SEARCH_TEXT", "koyoc novelo, perez")
+    monkeypatch.setenv("SUBSCRIPTIONS", '{"100": ["lopez"], "200": "perez, gomez"}')
+
+    subscriptions = load_subscriptions()
+
+    assert subscriptions == {"100": ["koyoc novelo", "perez", "lopez"], "200": ["perez", "gomez"]}
+    assert get_watched_terms(subscriptions) == ["koyoc novelo", "perez", "lopez", "gomez"]
+
+
+def test_load_subscriptions_con_suscripciones_de_telegram(monkeypatch):
+    """Los términos agregados con /suscribir se suman a los configurados"""
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "100")
+    monkeypatch.setenv("SEARCH_TEXT", "perez")
+    monkeypatch.delenv("SUBSCRIPTIONS", raising=False)
+
+    subscriptions = load_subscriptions(stored={"100": ["perez", "lopez"], "300": ["gomez"]})
+
+    assert subscriptions == {"100": ["perez", "lopez"], "300": ["gomez"]}
+
+
+def test_terminos_repetidos_al_normalizar(monkeypatch):
+    """Términos que sólo difieren en mayúsculas, acentos o espacios se vigilan una vez y con la misma llave en cada chat"""
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "100")
+    monkeypatch.setenv("SEARCH_TEXT", "Ley, Pérez")
+    monkeypatch.setenv("SUBSCRIPTIONS", '{"200": ["ley ", "PEREZ", "lopez"]}')
+
+    subscriptions = load_subscriptions(stored={"100": ["LÓPEZ"]})
+    matcher = TermMatcher(get_watched_terms(subscriptions))
+
+    assert subscriptions == {"100": ["Ley", "Pérez", "lopez"], "200": ["Ley", "Pérez", "lopez"]}
+    assert matcher.terms == ["Ley", "Pérez", "lopez"]
+    assert TermMatcher(["Ley", "ley ", "LEY"]).terms == ["Ley"]
+    assert matcher.scan_pages([(1, "La ley de Perez")]) == {"Ley": [1], "Pérez": [1], "lopez": []}
@@ -0,0 +1,77 @@
+"""
+Pruebas de las métricas del pipeline (metrics.py)
+"""
+
+import contextvars
+import threading
+
+import metrics
+from jobs import stage
+
+
+def test_formato_prometheus():
+    """Contadores e histogramas se exponen en el formato de texto de Prometheus"""
+    registry = metrics.Registry()
+    counter = registry.counter("prueba_total", "Contador de prueba", ("kind",))
+    histogram = registry.histogram("prueba_seconds", "Histograma de prueba", ("stage",), buckets=(0.1, 1))
+    registry.add_collector(lambda: [("prueba_gauge", "gauge", "Valor calculado", [({"chat": '1"2'}, 2.5)])])
+
+    counter.inc(kind="pdf")
+    counter.inc(1024, kind="pdf")
+    histogram.observe(0.05, stage="index_fetch")
+    histogram.observe(0.5, stage="index_fetch")
+    histogram.observe(3, stage="index_fetch")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE prueba_total counter" in lines
+    assert 'prueba_total{kind="pdf"} 1025' in lines
+    assert "# TYPE prueba_seconds histogram" in lines
+    assert 'prueba_seconds_bucket{stage="index_fetch",le="0.1"} 1' in lines
+    assert 'prueba_seconds_bucket{stage="index_fetch",le="1"} 2' in lines
+    assert 'prueba_seconds_bucket{stage="index_fetch",le="+Inf"} 3' in lines
+    assert 'prueba_seconds_count{stage="index_fetch"} 3' in lines
+    assert 'prueba_seconds_sum{stage="index_fetch"} 3.55' in lines
+    assert 'prueba_gauge{chat="1\\"2"} 2.5' in lines
+
+
+def test_ultima_ejecucion():
+    """Las etapas, bytes y páginas de una ejecución (incluso en otros hilos) quedan en el resumen"""
+    def worker():
+        with stage("pdf_download"):
+            metrics.record_download("pdf", 2048, not_modified=False)
+        metrics.record_pages({1: 0.01, 2: 0.02}, {1: 0.001, 2: 0.001}, from_cache=False)
+
+    with metrics.track_run("prueba"):
+        with stage("index_fetch"):
+            metrics.record_download("html", 0, not_modified=True)
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(worker,))
+        thread.start()
+        thread.join()
+
+    # Fuera de la ejecución sólo se actualizan las métricas globales
+    metrics.record_download("pdf", 10, not_modified=False)
+
+    run = metrics.summary()["last_runs"]["prueba"]
+    assert run["status"] == "succeeded"
+    assert set(run["stages"]) == {"index_fetch", "pdf_download"}
+    assert run["bytes_downloaded"] == 2048
+    assert run["pages"] == 2
+    assert (run["http_cache_hits"], run["http_cache_misses"]) == (1, 1)
+    assert run["text_cache_misses"] == 1
+
+    text = metrics.registry.render()
+    assert 'gazette_runs_total{kind="prueba",status="succeeded"} 1' in text
+    assert 'gazette_stage_seconds_count{stage="pdf_download"}' in text
+
+
+def test_ultima_ejecucion_por_fuente():
+    """Los reportes de cada fuente conservan su propia última ejecución"""
+    with metrics.track_run("report", source="yucatan"):
+        metrics.record_download("pdf", 100, not_modified=False)
+    with metrics.track_run("report", source="dof"):
+        metrics.record_download("pdf", 5, not_modified=False)
+
+    last_runs = metrics.summary()["last_runs"]
+    assert last_runs["report:yucatan"]["bytes_downloaded"] == 100
+    assert last_runs["report:dof"]["bytes_downloaded"] == 5
+    assert last_runs["report:dof"]["source"] == "dof"
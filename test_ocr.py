@@ -0,0 +1,61 @@
+"""
+Pruebas del OCR de páginas escaneadas (ocr.py y su etapa en pdf_search.py)
+
+El motor de OCR se sustituye por una función falsa para no depender de
+tesseract en las pruebas.
+"""
+
+import pytest
+
+import ocr
+from benchmarks.fixtures import build_pdf
+from pdf_search import search_pdf
+
+
+@pytest.fixture
+def fake_engine(monkeypatch, tmp_path):
+    """OCR activado con un motor falso; las páginas sin texto tienen una imagen"""
+    calls = []
+
+    def recognize_images(images, lang):
+        calls.append((images, lang))
+        return "Se notifica a KOYOC NOVELO OLIVER", 0.5
+
+    monkeypatch.setenv("OCR_ENABLED", "true")
+    monkeypatch.setattr(ocr, "_engine_available", True)
+    monkeypatch.setattr(ocr, "_ocr_cache", ocr.OcrCache(str(tmp_path / "ocr")))
+    monkeypatch.setattr(ocr, "page_images", lambda page: [b"imagen escaneada"])
+    monkeypatch.setattr(ocr, "recognize_images", recognize_images)
+    return calls
+
+
+def test_needs_ocr(monkeypatch):
+    """Sólo las páginas con menos de OCR_MIN_CHARS caracteres pasan por OCR"""
+    monkeypatch.setenv("OCR_MIN_CHARS", "10")
+
+    assert ocr.needs_ocr("")
+    assert ocr.needs_ocr("  Página\n 3 ")
+    assert not ocr.needs_ocr("Se notifica a los interesados")
+
+
+def test_ocr_en_paginas_escaneadas(fake_engine):
+    """El texto reconocido se busca como el resto y cada página se reconoce una sola vez"""
+    pdf = build_pdf(["Aviso de licitación número 12 de la secretaría", "", "Edicto del juzgado primero civil"])
+
+    result = search_pdf(pdf, ["koyoc novelo"], workers=1)
+    again = search_pdf(pdf, ["koyoc novelo"], workers=1)
+
+    assert result["found_pages"] == again["found_pages"] == [2]
+    assert result["page_timings"][2] >= 0.5
+    assert len(fake_engine) == 1
+    assert fake_engine[0] == ([b"imagen escaneada"], "spa")
+
+
+def test_ocr_desactivado(fake_engine, monkeypatch):
+    """Sin OCR_ENABLED las páginas escaneadas se quedan sin texto"""
+    monkeypatch.setenv("OCR_ENABLED", "false")
+
+    result = search_pdf(build_pdf(["", "Edicto del juzgado"]), ["koyoc novelo"], workers=1)
+
+    assert result["found_pages"] == []
+    assert fake_engine == []
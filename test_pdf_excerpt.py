@@ -0,0 +1,44 @@
+"""
+Pruebas de los extractos con sólo las páginas encontradas (pdf_excerpt.py)
+"""
+
+from pypdf import PdfReader
+
+from benchmarks.fixtures import build_pdf
+from pdf_excerpt import build_excerpt, excerpt_filename, excerpt_pages, prepare_document, select_pages
+
+
+def test_select_pages():
+    assert select_pages([5], 10, context=0, cover=True) == [1, 5]
+    assert select_pages([2, 9], 10, context=1, cover=True) == [1, 2, 3, 8, 9, 10]
+    assert select_pages([5], 10, context=0, cover=False) == [5]
+
+
+def test_build_excerpt():
+    """El extracto conserva sólo las páginas pedidas, en orden"""
+    pdf = build_pdf([f"pagina {number}" for number in range(1, 11)])
+
+    with build_excerpt(pdf, [1, 7]) as excerpt:
+        reader = PdfReader(excerpt)
+        assert [page.extract_text() for page in reader.pages] == ["pagina 1", "pagina 7"]
+        assert [item.title for item in reader.outline] == ["Página 1", "Página 7"]
+
+
+def test_prepare_document(monkeypatch):
+    pdf_data = {"pdf_content": build_pdf(["a", "b", "c"]), "filename": "diario.pdf", "total_pages": 3}
+
+    # Sin la opción se envía el PDF completo
+    monkeypatch.delenv("SEND_ONLY_MATCHING_PAGES", raising=False)
+    assert excerpt_pages(pdf_data, [3]) is None
+    assert prepare_document(pdf_data, None) == (pdf_data["pdf_content"], "diario.pdf", None)
+
+    monkeypatch.setenv("SEND_ONLY_MATCHING_PAGES", "true")
+    monkeypatch.setenv("PDF_CONTEXT_PAGES", "0")
+    content, filename, pages = prepare_document(pdf_data, excerpt_pages(pdf_data, [3]))
+    assert (filename, pages) == (excerpt_filename("diario.pdf"), [1, 3])
+    assert len(PdfReader(content).pages) == 2
+    content.close()
+
+    # Si el extracto abarca todo el PDF se envía el original
+    monkeypatch.setenv("PDF_CONTEXT_PAGES", "1")
+    assert excerpt_pages(pdf_data, [2]) is None
@@ -0,0 +1,94 @@
+"""
+Pruebas del motor de búsqueda de texto en PDFs (pdf_search.py)
+"""
+
+import os
+
+import pytest
+
+import pdf_search
+from benchmarks.fixtures import build_pdf
+from pdf_search import iter_page_texts, search_pdf, shutdown_pool
+
+
+def test_search_pdf_secuencial():
+    """Encuentra los términos página por página sin usar el pool"""
+    pdf = build_pdf(["Aviso general", "Koyoc Novelo Oliver", "Otro aviso", "KOYOC NOVELO"])
+
+    result = search_pdf(pdf, ["koyoc novelo", "inexistente"], workers=1)
+
+    assert result["total_pages"] == 4
+    assert result["matches"] == {"koyoc novelo": [2, 4], "inexistente": []}
+    assert result["found_pages"] == [2, 4]
+    assert result["found"] is True
+    assert sorted(result["page_timings"]) == [1, 2, 3, 4]
+
+
+def test_search_pdf_corto_circuito():
+    """Con stop_when_found deja de extraer páginas cuando ya se encontraron todos los términos"""
+    pdf = build_pdf(["koyoc novelo"] + ["relleno"] * 9)
+
+    result = search_pdf(pdf, ["koyoc novelo"], stop_when_found=True, workers=1)
+
+    assert result["found_pages"] == [1]
+    assert result["pages_scanned"] == 1
+    assert result["total_pages"] == 10
+
+    # Por defecto se leen todas las páginas (los reportes las necesitan para la caché y el índice)
+    assert search_pdf(pdf, ["koyoc novelo"], workers=1)["pages_scanned"] == 10
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="requiere /proc")
+def test_lector_del_worker(tmp_path):
+    """El worker no deja el archivo abierto entre tareas"""
+    path = tmp_path / "diario.pdf"
+    path.write_bytes(build_pdf([f"pagina {number}" for number in range(1, 7)]))
+
+    def open_files():
+        fds = os.listdir("/proc/self/fd")
+        return [os.path.realpath(f"/proc/self/fd/{fd}") for fd in fds if os.path.exists(f"/proc/self/fd/{fd}")]
+
+    first = pdf_search._extract_page_range(str(path), 0, 3)
+    second = pdf_search._extract_page_range(str(path), 3, 6)
+
+    assert [page for page, _, _ in first + second] == [1, 2, 3, 4, 5, 6]
+    assert "pagina 5" in second[1][1]
+    assert str(path) not in open_files()
+
+    # Un archivo nuevo con la misma ruta (p. ej. otro temporal) se lee desde cero
+    path.write_bytes(build_pdf(["otra edicion"]))
+    assert "otra edicion" in pdf_search._extract_page_range(str(path), 0, 1)[0][1]
+    assert str(path) not in open_files()
+
+
+def test_iter_page_texts_paralelo(monkeypatch):
+    """El pool de procesos entrega las páginas en orden"""
+    monkeypatch.setenv("PDF_PARALLEL_MIN_PAGES", "1")
+    monkeypatch.setenv("PDF_PAGES_PER_TASK", "3")
+    pdf = build_pdf([f"pagina {number}" for number in range(1, 11)])
+
+    try:
+        pages = list(iter_page_texts(pdf, workers=2))
+    finally:
+        shutdown_pool()
+
+    assert [page_num for page_num, _, _ in pages] == list(range(1, 11))
+    assert "pagina 7" in pages[6][1]
+
+
+def test_pools_por_numero_de_workers(monkeypatch):
+    """Pedir otro número de workers no cierra el pool que otro hilo está usando"""
+    monkeypatch.setenv("PDF_PARALLEL_MIN_PAGES", "1")
+    monkeypatch.setenv("PDF_PAGES_PER_TASK", "1")
+    pdf = build_pdf([f"pagina {number}" for number in range(1, 21)])
+
+    try:
+        pages = iter_page_texts(pdf, workers=2)
+        first = next(pages)
+        other = list(iter_page_texts(pdf, workers=3))
+        rest = list(pages)
+    finally:
+        shutdown_pool()
+
+    assert [page_num for page_num, _, _ in [first] + rest] == list(range(1, 21))
+    assert [page_num for page_num, _, _ in other] == list(range(1, 21))
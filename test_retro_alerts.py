@@ -0,0 +1,33 @@
+"""
+Pruebas de las alertas retroactivas por términos nuevos (retro_alerts.py)
+"""
+
+from retro_alerts import TermTracker, build_digests
+from search_index import SearchIndex
+
+
+def test_resumen_de_terminos_nuevos(tmp_path):
+    """Sólo los términos agregados después del primer arranque generan un resumen"""
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add_document("a" * 64, [(1, "Avisos"), (2, "Notario José Pérez Koyoc")],
+                       filename="a.pdf", gazette_date="2025-10-09")
+    index.add_document("b" * 64, [(3, "Edicto Pérez Koyoc")], filename="b.pdf", gazette_date="2024-01-15")
+    tracker = TermTracker(str(tmp_path / "known.json"))
+
+    # Primer arranque: los términos actuales sólo establecen la referencia
+    assert build_digests({"1": ["koyoc novelo"]}, index, tracker) == []
+
+    subscriptions = {"1": ["koyoc novelo", "Pérez Koyoc", "zapata"], "2": ["perez koyoc"]}
+    digests = build_digests(subscriptions, index, tracker)
+    assert [(chat_id, terms) for chat_id, terms, _ in digests] == [("1", ["Pérez Koyoc", "zapata"]), ("2", ["perez koyoc"])]
+
+    message = digests[0][2]
+    assert "'Pérez Koyoc' encontrado en 2 diario(s):" in message
+    assert message.index("2025-10-09 a.pdf: páginas [2]") < message.index("2024-01-15 b.pdf: páginas [3]")
+    assert "'zapata' NO encontrado" in message
+
+    # Una vez enviados ya no se repiten, aunque cambien acentos o mayúsculas
+    for chat_id, terms, _ in digests:
+        tracker.mark_known(chat_id, terms)
+    reloaded = TermTracker(str(tmp_path / "known.json"))
+    assert build_digests({"1": ["PEREZ koyoc", "zapata"]}, index, reloaded) == []
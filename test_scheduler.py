@@ -0,0 +1,97 @@
+"""
+Pruebas del scheduler con horarios tipo cron (scheduler.py)
+"""
+
+from datetime import datetime
+
+import pytz
+
+from scheduler import CronSchedule, Scheduler, load_schedules_from_env
+
+MERIDA = pytz.timezone("America/Merida")
+
+
+def test_next_after_diario():
+    """La siguiente ejecución es hoy si aún no pasa la hora, si no mañana"""
+    schedule = CronSchedule("30 7 * * *")
+
+    before = MERIDA.localize(datetime(2025, 10, 9, 6, 0))
+    after = MERIDA.localize(datetime(2025, 10, 9, 7, 30))
+
+    assert schedule.next_after(before, MERIDA) == MERIDA.localize(datetime(2025, 10, 9, 7, 30))
+    assert schedule.next_after(after, MERIDA) == MERIDA.localize(datetime(2025, 10, 10, 7, 30))
+
+
+def test_next_after_rangos_y_dias_de_semana():
+    """Soporta listas, rangos, pasos y días de la semana (0 y 7 = domingo)"""
+    weekdays = CronSchedule("*/20 9-10 * * 1-5")
+    sunday = CronSchedule("0 8 * * 7")
+    friday = MERIDA.localize(datetime(2025, 10, 10, 10, 45))  # Viernes
+
+    assert weekdays.next_after(friday, MERIDA) == MERIDA.localize(datetime(2025, 10, 13, 9, 0))
+    assert sunday.next_after(friday, MERIDA) == MERIDA.localize(datetime(2025, 10, 12, 8, 0))
+
+
+def test_next_after_cambio_de_horario():
+    """Las horas que no existen por el cambio de horario se saltan"""
+    eastern = pytz.timezone("America/New_York")
+    schedule = CronSchedule("30 2 * * *")
+    moment = eastern.localize(datetime(2025, 3, 8, 12, 0))
+
+    assert schedule.next_after(moment, eastern) == eastern.localize(datetime(2025, 3, 10, 2, 30))
+
+
+def test_load_schedules_from_env(monkeypatch):
+    """Sin SCHEDULES se usan los dos horarios clásicos"""
+    monkeypatch.delenv("SCHEDULES", raising=False)
+    monkeypatch.setenv("SCHEDULE_HOUR_1", "8")
+    monkeypatch.setenv("SCHEDULE_MINUTE_1", "15")
+    assert load_schedules_from_env() == ["15 8 * * *", "0 12 * * *"]
+
+    monkeypatch.setenv("SCHEDULES", "0 7 * * 1-5; 0 18 * * *")
+    assert load_schedules_from_env() == ["0 7 * * 1-5", "0 18 * * *"]
+
+
+def test_missed_runs(tmp_path):
+    """Recupera la ejecución perdida más reciente dentro de la ventana"""
+    state_path = str(tmp_path / "state.json")
+    scheduler = Scheduler(lambda: None, ["30 7 * * *", "0 12 * * *"], "America/Merida", state_path, 0, 12)
+    scheduler._record(scheduler.schedules, MERIDA.localize(datetime(2025, 10, 9, 6, 0)))
+
+    missed = scheduler.missed_runs(MERIDA.localize(datetime(2025, 10, 9, 9, 0)))
+    assert [(schedule.expression, due.hour) for schedule, due in missed] == [("30 7 * * *", 7)]
+
+    # El estado persiste entre reinicios y lo perdido hace más de 12 horas se ignora
+    restarted = Scheduler(lambda: None, ["30 7 * * *"], "America/Merida", state_path, 0, 12)
+    assert restarted.missed_runs(MERIDA.localize(datetime(2025, 10, 11, 9, 0)))[0][1] == MERIDA.localize(
+        datetime(2025, 10, 11, 7, 30)
+    )
+    assert restarted.missed_runs(MERIDA.localize(datetime(2025, 10, 11, 20, 0))) == []
+
+
+def test_horario_durante_ejecucion_larga(tmp_path):
+    """Un horario que vence mientras corre una ejecución larga se ejecuta al terminar ésta"""
+    clock = [MERIDA.localize(datetime(2025, 10, 9, 7, 29, 59))]
+    runs = []
+
+    class FakeClockScheduler(Scheduler):
+        def now(self):
+            return clock[0]
+
+        def _sleep_until(self, moment):
+            clock[0] = max(clock[0], moment)
+            return not self._stop.is_set()
+
+    def task():
+        runs.append(clock[0].strftime("%H:%M"))
+        if len(runs) == 1:
+            # El reporte de las 7:30 tarda hasta las 7:50 y pasa el horario de las 7:45
+            clock[0] = MERIDA.localize(datetime(2025, 10, 9, 7, 50))
+        else:
+            scheduler.stop()
+
+    scheduler = FakeClockScheduler(task, ["30 7 * * *", "45 7 * * *"], "America/Merida", str(tmp_path / "state.json"), 0, 12)
+    scheduler.run_forever()
+
+    assert runs == ["07:30", "07:50"]
+    assert scheduler._last_run(scheduler.schedules[1]) == MERIDA.localize(datetime(2025, 10, 9, 7, 45))
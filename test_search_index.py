@@ -0,0 +1,51 @@
+"""
+Pruebas del índice de texto completo (search_index.py)
+"""
+
+from search_index import SearchIndex, build_query
+
+
+def make_index(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add_document(
+        "a" * 64,
+        [(1, "Acuerdo del Ejecutivo"), (2, "Se nombra a José Pérez Koyoc como notario"), (3, "Avisos")],
+        url="http://sitio/a.pdf", filename="a.pdf", gazette_date="2025-10-09", fecha_consulta="Jueves 9"
+    )
+    index.add_document(
+        "b" * 64,
+        [(1, "Edicto: Pérez Koyoc, Pérez Koyoc y otros")],
+        url="http://sitio/b.pdf", filename="b.pdf", gazette_date="2024-01-15", fecha_consulta="Lunes 15"
+    )
+    index.add_document("c" * 64, [(1, "Licitación"), (2, "Convocatoria"), (3, "Fe de erratas")], filename="c.pdf")
+    return index
+
+
+def test_build_query():
+    assert build_query('perez  "notario publico" 5') == '"perez" "notario publico" "5"'
+    assert build_query("   ") == ""
+
+
+def test_busqueda_sin_acentos_y_ordenada(tmp_path):
+    """Los resultados ignoran acentos y mayúsculas y se ordenan por relevancia"""
+    index = make_index(tmp_path)
+
+    hits = index.search("PEREZ koyoc")
+    assert [(hit["filename"], hit["page"]) for hit in hits] == [("b.pdf", 1), ("a.pdf", 2)]
+    assert "[Pérez]" in hits[1]["snippet"]
+    assert hits[0]["score"] > hits[1]["score"]
+
+    assert index.search('"koyoc como notario"')[0]["gazette_date"] == "2025-10-09"
+    assert [hit["filename"] for hit in index.search("perez", since="2025-01-01")] == ["a.pdf"]
+    # Los caracteres especiales de FTS5 no rompen la consulta
+    assert index.search("perez AND (") == []
+
+
+def test_reindexar_reemplaza(tmp_path):
+    index = make_index(tmp_path)
+    assert index.is_indexed("a" * 64)
+    assert not index.is_indexed("d" * 64)
+
+    index.add_document("a" * 64, [(1, "Otro texto")], filename="a.pdf", gazette_date="2025-10-09")
+    assert [hit["filename"] for hit in index.search("notario")] == []
+    assert index.stats() == {"documents": 3, "pages": 5}
@@ -0,0 +1,64 @@
+"""
+Pruebas de la configuración de las fuentes de diarios (sources.py)
+"""
+
+import json
+
+import pytest
+
+from sources import DEFAULT_SOURCE, GazetteSource, get_source, load_sources
+
+
+def test_fuente_unica_por_defecto(monkeypatch):
+    """Sin GAZETTE_SOURCES hay una sola fuente con BASE_URL, DIARIO_URL_PATH y los selectores INDEX_*"""
+    monkeypatch.delenv("GAZETTE_SOURCES", raising=False)
+    monkeypatch.setenv("BASE_URL", "http://diario.local")
+    monkeypatch.setenv("DIARIO_URL_PATH", "/diario.php")
+    monkeypatch.setenv("INDEX_PDF_SELECTOR", "a.documento")
+    monkeypatch.setenv("SCHEDULES", "0 8 * * *")
+
+    [source] = load_sources()
+
+    assert source.name == DEFAULT_SOURCE
+    assert source.index_url == "http://diario.local/diario.php"
+    assert source.selectors[1] == ("a", ["documento"])
+    assert source.schedules == ["0 8 * * *"]
+    assert source.label is None
+    assert source.filename_prefix == "diario_oficial"
+    assert source.state_name("last_run_fingerprint.json") == "last_run_fingerprint.json"
+
+
+def test_varias_fuentes(monkeypatch):
+    """GAZETTE_SOURCES define varias fuentes; las entradas inválidas o repetidas se omiten"""
+    monkeypatch.setenv("GAZETTE_SOURCES", json.dumps([
+        {"name": "dof", "label": "DOF", "base_url": "https://www.dof.gob.mx/", "index_path": "/index.php",
+         "title_selector": "span.fecha", "schedules": ["0 9 * * 1-5"]},
+        {"name": "campeche", "base_url": "https://periodicooficial.campeche.gob.mx", "index_path": "/"},
+        {"name": "Mal Nombre", "base_url": "https://x", "index_path": "/"},
+        {"name": "sin-url", "index_path": "/"},
+        {"name": "dof", "base_url": "https://otro", "index_path": "/"},
+        {"name": "selector", "base_url": "https://x", "index_path": "/", "pdf_selector": "div > a"},
+    ]))
+
+    sources = load_sources()
+
+    assert [source.name for source in sources] == ["dof", "campeche"]
+    dof, campeche = sources
+    assert dof.index_url == "https://www.dof.gob.mx/index.php"
+    assert dof.selectors[0] == ("span", ["fecha"])
+    assert dof.schedules == ["0 9 * * 1-5"]
+    assert dof.filename_prefix == "dof"
+    assert dof.state_name("scheduler_state.json") == "scheduler_state_dof.json"
+    assert campeche.label == "campeche"
+    assert get_source() is not None and get_source().name == "dof"
+    assert get_source("campeche").index_url == "https://periodicooficial.campeche.gob.mx/"
+    assert get_source("yucatan") is None
+
+
+def test_configuracion_invalida(monkeypatch):
+    """Un JSON inválido deja la fuente única de siempre"""
+    monkeypatch.setenv("GAZETTE_SOURCES", "[{")
+    assert [source.name for source in load_sources()] == [DEFAULT_SOURCE]
+
+    with pytest.raises(ValueError):
+        GazetteSource("dof", "https://www.dof.gob.mx", "")
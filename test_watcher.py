@@ -0,0 +1,93 @@
+"""
+Pruebas del modo de vigilancia de nuevas ediciones (watcher.py)
+"""
+
+from datetime import datetime, time
+
+import pytest
+import pytz
+
+import watcher as watcher_module
+from watcher import GazetteWatcher, parse_windows
+
+MERIDA = pytz.timezone("America/Merida")
+
+
+def make_watcher(tmp_path, on_change=lambda: None):
+    return GazetteWatcher(
+        "http://localhost/diario",
+        lambda content: {"fecha_consulta": "Lunes", "pdf_links": [content.decode()]},
+        on_change,
+        timezone="America/Merida",
+        windows=parse_windows("07:00-10:00, 22:00-01:00"),
+        dense_seconds=60,
+        sparse_seconds=1800,
+        state_path=str(tmp_path / "watch.json"),
+    )
+
+
+def test_parse_windows():
+    assert parse_windows("07:00-10:00,17:30-21:00") == [(time(7, 0), time(10, 0)), (time(17, 30), time(21, 0))]
+
+
+def test_intervalo_adaptativo(tmp_path):
+    """Denso dentro de las ventanas, espaciado fuera sin saltarse el inicio de una ventana"""
+    watcher = make_watcher(tmp_path)
+
+    assert watcher.next_interval(MERIDA.localize(datetime(2025, 10, 9, 8, 0))) == 60
+    assert watcher.next_interval(MERIDA.localize(datetime(2025, 10, 9, 23, 30))) == 60
+    assert watcher.next_interval(MERIDA.localize(datetime(2025, 10, 9, 12, 0))) == 1800
+    assert watcher.next_interval(MERIDA.localize(datetime(2025, 10, 9, 6, 50))) == 600
+
+
+def test_check_dispara_solo_con_cambios(tmp_path, monkeypatch):
+    """El pipeline sólo se ejecuta cuando cambia el enlace del PDF"""
+    responses = [
+        {"content": b"/a.pdf", "not_modified": False},
+        {"content": b"/a.pdf", "not_modified": True},
+        {"content": b"/a.pdf", "not_modified": False},
+        {"content": b"/b.pdf", "not_modified": False},
+    ]
+    monkeypatch.setattr(watcher_module, "get_cache", lambda: None)
+    monkeypatch.setattr(watcher_module.http_client, "fetch", lambda *args, **kwargs: responses.pop(0))
+    changes = []
+    watcher = make_watcher(tmp_path, lambda: changes.append(1))
+
+    assert [watcher.check() for _ in range(4)] == [False, False, False, True]
+    assert changes == [1]
+
+    # La huella se conserva entre reinicios
+    assert make_watcher(tmp_path).last_fingerprint == watcher.last_fingerprint
+
+
+def test_check_reintenta_si_falla_el_pipeline(tmp_path, monkeypatch):
+    """Si el pipeline falla la huella no se guarda y la siguiente consulta lo reintenta, aun con 304"""
+    responses = [
+        {"content": b"/a.pdf", "not_modified": False},
+        {"content": b"/b.pdf", "not_modified": False},
+        {"content": b"/b.pdf", "not_modified": True},
+        {"content": b"/b.pdf", "not_modified": True},
+    ]
+    monkeypatch.setattr(watcher_module, "get_cache", lambda: None)
+    monkeypatch.setattr(watcher_module.http_client, "fetch", lambda *args, **kwargs: responses.pop(0))
+    changes = []
+
+    def on_change():
+        changes.append(1)
+        if len(changes) == 1:
+            raise RuntimeError("Telegram no responde")
+
+    watcher = make_watcher(tmp_path, on_change)
+    assert watcher.check() is False
+    reference = watcher.last_fingerprint
+
+    with pytest.raises(RuntimeError):
+        watcher.check()
+    assert watcher.last_fingerprint == reference
+    assert make_watcher(tmp_path).last_fingerprint == reference
+
+    assert watcher.check() is True
+    assert changes == [1, 1]
+    assert watcher.last_fingerprint != reference
+    assert watcher.check() is False
+    assert changes == [1, 1]
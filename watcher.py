@@ -0,0 +1,182 @@
+"""
+Modo de vigilancia: detecta rápidamente nuevas ediciones del diario.
+
+El Diario Oficial a veces publica tarde o saca ediciones extra por la noche.
+En lugar de depender sólo de los horarios fijos, el vigilante consulta la
+página del diario con peticiones condicionales (una respuesta 304 cuesta unos
+cuantos bytes) a un intervalo adaptativo: frecuente dentro de las ventanas
+habituales de publicación y espaciado fuera de ellas. El pipeline del PDF se
+dispara sólo cuando cambia la huella de la página (fecha y enlace del PDF).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, time as dt_time, timedelta
+
+import pytz
+
+import http_client
+from gazette_cache import get_cache, get_data_dir
+
+
+def parse_windows(value):
+    """
+    Convierte "07:00-10:00,17:00-21:00" en una lista de ventanas (inicio, fin)
+
+    Returns:
+        list: Tuplas de datetime.time
+    """
+    windows = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_text, end_text = part.split("-", 1)
+        start = dt_time.fromisoformat(start_text.strip())
+        end = dt_time.fromisoformat(end_text.strip())
+        windows.append((start, end))
+    return windows
+
+
+def page_fingerprint(page):
+    """Huella de la página del diario: fecha publicada y enlaces de los PDFs"""
+    content = "\n".join([page["fecha_consulta"].strip()] + page["pdf_links"])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class GazetteWatcher:
+    """Consulta la página del diario a intervalo adaptativo y avisa cuando cambia"""
+
+    def __init__(self, index_url, parse_page, on_change, timezone=None, windows=None,
+                 dense_seconds=None, sparse_seconds=None, state_path=None):
+        """
+        Args:
+            index_url: URL de la página del diario oficial
+            parse_page: Función que recibe el HTML y devuelve fecha_consulta y pdf_links
+            on_change: Función a ejecutar cuando se detecta una edición nueva
+            timezone: Zona horaria de las ventanas (opcional, default: TIMEZONE)
+            windows: Ventanas de publicación (opcional, default: WATCH_WINDOWS)
+            dense_seconds: Intervalo dentro de las ventanas (opcional, default: WATCH_DENSE_SECONDS)
+            sparse_seconds: Intervalo fuera de las ventanas (opcional, default: WATCH_SPARSE_SECONDS)
+            state_path: Archivo con la última huella vista (opcional)
+        """
+        if timezone is None:
+            timezone = os.getenv("TIMEZONE", "America/Merida")
+        if windows is None:
+            windows = parse_windows(os.getenv("WATCH_WINDOWS", "07:00-10:00,17:00-21:00"))
+        if dense_seconds is None:
+            dense_seconds = float(os.getenv("WATCH_DENSE_SECONDS", "120"))
+        if sparse_seconds is None:
+            sparse_seconds = float(os.getenv("WATCH_SPARSE_SECONDS", "1800"))
+        if state_path is None:
+            state_path = os.path.join(get_data_dir(), "watch_state.json")
+
+        self.index_url = index_url
+        self.parse_page = parse_page
+        self.on_change = on_change
+        self.tz = pytz.timezone(timezone)
+        self.windows = windows
+        self.dense_seconds = dense_seconds
+        self.sparse_seconds = sparse_seconds
+        self.state_path = state_path
+        self.last_fingerprint = self._load_state().get("fingerprint")
+        # Edición detectada cuyo pipeline falló: se reintenta aunque la página responda 304
+        self._pending = False
+        self._stop = threading.Event()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.last_fingerprint}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def in_window(self, moment):
+        """Indica si un momento cae dentro de alguna ventana de publicación"""
+        current = moment.astimezone(self.tz).time()
+        for start, end in self.windows:
+            if start <= end and start <= current < end:
+                return True
+            # Ventana que cruza la medianoche (p. ej. 22:00-01:00)
+            if start > end and (current >= start or current < end):
+                return True
+        return False
+
+    def next_interval(self, moment=None):
+        """
+        Segundos hasta la siguiente consulta
+
+        Dentro de una ventana se usa el intervalo denso; fuera de ella el
+        espaciado, pero sin pasarse del inicio de la siguiente ventana.
+        """
+        if moment is None:
+            moment = datetime.now(self.tz)
+        moment = moment.astimezone(self.tz)
+
+        if self.in_window(moment):
+            return self.dense_seconds
+
+        interval = self.sparse_seconds
+        for start, _ in self.windows:
+            window_start = self.tz.localize(datetime.combine(moment.date(), start))
+            if window_start <= moment:
+                window_start = self.tz.localize(datetime.combine(moment.date() + timedelta(days=1), start))
+            interval = min(interval, (window_start - moment).total_seconds())
+        return max(interval, 1)
+
+    def check(self):
+        """
+        Consulta la página una vez y dispara el pipeline si cambió la huella
+
+        Returns:
+            bool: True si se detectó una edición nueva
+        """
+        index_page = http_client.fetch(self.index_url, get_cache(), extension="html")
+        if index_page["not_modified"] and self.last_fingerprint and not self._pending:
+            return False
+
+        page = self.parse_page(index_page["content"])
+        fingerprint = page_fingerprint(page)
+        if fingerprint == self.last_fingerprint:
+            self._pending = False
+            return False
+
+        # La primera huella sólo establece la referencia (el reporte inicial ya corrió)
+        if self.last_fingerprint is None:
+            self.last_fingerprint = fingerprint
+            self._save_state()
+            return False
+
+        print(f"Nueva edición detectada: {page['fecha_consulta'].strip()} - {len(page['pdf_links'])} PDF(s)")
+        if page["pdf_links"]:
+            # La huella se guarda sólo si el pipeline terminó; si falla, la siguiente consulta lo reintenta
+            self._pending = True
+            self.on_change()
+        self._pending = False
+        self.last_fingerprint = fingerprint
+        self._save_state()
+        return True
+
+    def run_forever(self):
+        """Ciclo principal del modo de vigilancia"""
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error consultando la página del diario: {e}")
+            self._stop.wait(self.next_interval())
+
+    def stop(self):
+        """Detiene el ciclo de vigilancia"""
+        self._stop.set()